@@ -0,0 +1,168 @@
+"""
+Compares the declaration parser against a full javalang parse on large generated sources.
+
+Each generated file is shaped like decompiled library code: a documented class with fields,
+initializers, nested types, an enum with constant bodies and many methods whose bodies hold
+loops, branches, try blocks, lambdas, anonymous classes and literals containing braces.
+Both parsers' output is converted and rendered, and any file on which they disagree is
+reported as a mismatch.
+
+    python benchmarks/declaration_parser.py -n 500 --methods 40
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import javalang.parse
+
+import generator
+from benchmarks.synthetic_jar import parse_count
+from utils import declaration_parser
+
+TYPES = ["int", "long", "String", "List<String>", "Map<String, Integer>", "Object[]", "T", "Optional<T>"]
+
+STATEMENTS = [
+    "int i{n} = a{m}.hashCode() * 31 + {n};",
+    "if (a{m} == null) {{ throw new IllegalArgumentException(\"a{m} {{ must not be null }}\"); }} else {{ count++; }}",
+    "for (int j = 0; j < {n}; j++) {{ builder.append('{{').append(j).append(\"}}\"); }}",
+    "try {{ Thread.sleep({n}L); }} catch (InterruptedException e) {{ Thread.currentThread().interrupt(); }} finally {{ done = true; }}",
+    "list.forEach(x -> {{ if (x.length() > {n}) {{ System.out.println(x); }} }});",
+    "Runnable r{n} = new Runnable() {{ @Override public void run() {{ values.put(\"{n}\", {n}); }} }};",
+    "switch (count % 3) {{ case 0: count += {n}; break; case 1: {{ count -= 1; break; }} default: count = 0; }}",
+    "// A comment with a stray brace }} in it",
+    "/* A block comment {{ spanning\n         * several lines }} */",
+    "String s{n} = String.format(\"%d{{%s}}\", {n}, a{m});",
+    "values.computeIfAbsent(\"k{n}\", k -> new ArrayList<>()).add(String.valueOf({n}));",
+    "while (count > {n}) {{ count = count >> 1; }}",
+]
+
+
+def generate_source(rng: random.Random, index: int, methods: int, statements: int) -> str:
+    """
+    Generates a large Java source file.
+
+    Args:
+        rng: The random number generator.
+        index: The index of the file, used in its names.
+        methods: The number of methods in the main class.
+        statements: The number of statements in each method body.
+
+    Returns:
+        The Java source.
+    """
+    lines = [
+        f"package bench.p{index % 10};",
+        "",
+        "import java.util.*;",
+        "import java.util.function.Function;",
+        "",
+        f"/** Generated class {index}. */",
+        f"public class Big{index}<T extends Comparable<T>> extends AbstractList<T> implements Function<String, T> {{",
+        "    /** The default name. */",
+        f"    public static final String NAME = \"big{{{index}}}\", OTHER = \";\";",
+        "    private final Map<String, List<String>> values = new HashMap<String, List<String>>() {{ put(\"a\", new ArrayList<>()); }};",
+        "    protected int count = 0, limit = Math.max(1, 2), last;",
+        "    protected boolean done;",
+        "    public final Function<String, Integer> length = s -> { return s.length(); };",
+        "    private final StringBuilder builder = new StringBuilder();",
+        "    private final List<String> list = Arrays.asList(\"x\", \"y\");",
+        "    static { System.setProperty(\"big\", \"}\"); }",
+        "",
+        f"    public Big{index}(int count) {{ this.count = count; }}",
+        "",
+    ]
+
+    for m in range(methods):
+        parameters = ", ".join(f"{rng.choice(TYPES)} a{p}" for p in range(rng.randint(1, 3)))
+        lines.append(f"    /** Method {m}. */")
+        lines.append(f"    public {rng.choice(TYPES)} method{m}({parameters}) throws Exception {{")
+        for n in range(statements):
+            lines.append("        " + rng.choice(STATEMENTS).format(n=n, m=0))
+        lines.append("        return null;")
+        lines.append("    }")
+        lines.append("")
+
+    lines.extend([
+        "    @Override public T apply(String s) { return null; }",
+        "    @Override public T get(int i) { return null; }",
+        "    @Override public int size() { return count; }",
+        "",
+        "    public enum Mode { FAST(1) { @Override int weight() { return 2; } }, SLOW(2); Mode(int w) { } int weight() { return 1; } }",
+        "",
+        "    public interface Listener { default void changed(Object o) { System.out.println(o); } void closed(); int LIMIT = 10; }",
+        "",
+        "    protected static class Entry<K, V> implements Map.Entry<K, V> {",
+        "        public K getKey() { return null; }",
+        "        public V getValue() { return null; }",
+        "        public V setValue(V v) { return v; }",
+        "    }",
+        "}",
+    ])
+    return "\n".join(lines) + "\n"
+
+
+def render(parse: Callable, source: str) -> str:
+    return generator.render_python_module(generator.convert_compilation_unit(parse(source)))
+
+
+def time_parser(parse: Callable, sources: List[str], repeat: int) -> float:
+    """Times converting every source with a parser, returning the fastest of several runs."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for source in sources:
+            generator.convert_compilation_unit(parse(source))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Compare the declaration parser against javalang on generated sources.")
+    arg_parser.add_argument("-n", "--files", type=parse_count, default=200, help="The number of files to generate, e.g. 500 or 1k.")
+    arg_parser.add_argument("--methods", type=int, default=30, help="The number of methods per file.")
+    arg_parser.add_argument("--statements", type=int, default=12, help="The number of statements per method body.")
+    arg_parser.add_argument("--seed", type=int, default=0, help="The seed used to generate the sources.")
+    arg_parser.add_argument("-r", "--repeat", type=int, default=1, help="The number of runs, the fastest of which is reported.")
+    arg_parser.add_argument("-o", "--output", help="The file to write the JSON result to, instead of stdout.")
+    args = arg_parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sources = [generate_source(rng, i, args.methods, args.statements) for i in range(args.files)]
+    size = sum(len(s.encode("utf-8")) for s in sources)
+
+    print(f"Verifying {len(sources)} files...", file=sys.stderr)
+    mismatches = sum(render(declaration_parser.parse, s) != render(javalang.parse.parse, s) for s in sources)
+
+    print("Timing javalang...", file=sys.stderr)
+    javalang_seconds = time_parser(javalang.parse.parse, sources, args.repeat)
+    print("Timing the declaration parser...", file=sys.stderr)
+    declaration_seconds = time_parser(declaration_parser.parse, sources, args.repeat)
+
+    result = {
+        "config": {"files": args.files, "methods": args.methods, "statements": args.statements, "seed": args.seed},
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "source_bytes": size,
+        "mismatches": mismatches,
+        "javalang": {"seconds": javalang_seconds, "bytes_per_second": size / javalang_seconds},
+        "declarations": {"seconds": declaration_seconds, "bytes_per_second": size / declaration_seconds},
+        "speedup": javalang_seconds / declaration_seconds,
+    }
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if mismatches:
+        sys.exit(1)
@@ -0,0 +1,100 @@
+"""
+Measures the throughput of the stub emitter, rendering and writing separately.
+
+A synthetic jar is collected with the bytecode frontend, then every module is rendered
+into a reused buffer, timing only the renderer, and the rendered modules are written with
+`stub_output.DirectoryWriter` in each layout and with each number of write workers,
+timing only the writer. Each measurement is the fastest of several runs, and throughput is
+reported in top-level class stubs per second, whatever the number of modules holding them.
+
+    python benchmarks/emitter.py -n 10k
+    python benchmarks/emitter.py -n 10k --workers 1 2 4 8
+"""
+
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generator
+from benchmarks.synthetic_jar import SyntheticSpec, add_spec_arguments, generate_jar, spec_from_args
+from utils import stub_output, tree
+
+
+def best_of(repeat: int, function: Callable[[], None]) -> float:
+    """Runs a function several times, returning the fastest wall time in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Measure the throughput of the stub renderer and writer.")
+    add_spec_arguments(arg_parser)
+    arg_parser.add_argument("-r", "--repeat", type=int, default=3, help="The number of runs, the fastest of which is reported.")
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="The numbers of write workers to measure.")
+    args = arg_parser.parse_args()
+
+    if args.repeat < 1:
+        raise Exception("The number of runs must be at least 1.")
+
+    spec: SyntheticSpec = spec_from_args(args)
+    work_dir = tempfile.mkdtemp(prefix="jash-bench-")
+    try:
+        jar = os.path.join(work_dir, "synthetic.jar")
+        print(f"Generating a synthetic jar of {spec.classes} classes...", file=sys.stderr)
+        generate_jar(spec, jar, None)
+
+        _, file_tree = tree.build_jar_file_tree(jar)
+        with zipfile.ZipFile(jar) as jar_file:
+            class_entries = generator.group_class_entries(jar_file.namelist())
+            for path, file in tree.iter_tree_files(file_tree):
+                generator.collect_class_data(jar_file, file, class_entries["/".join(path + [file])])
+        generator.propagate_java_data()
+
+        print(f"{'stage':<36}{'modules':>9}{'seconds':>10}{'stubs/s':>12}")
+        for layout in generator.OUTPUT_LAYOUTS:
+            modules = generator.plan_modules(layout)
+            stubs = sum(len(classes) for classes in modules.values())
+            sources: List[tuple] = []
+
+            def render() -> None:
+                sources.clear()
+                buffer = io.StringIO()
+                for name, classes in modules.items():
+                    buffer.seek(0)
+                    buffer.truncate()
+                    generator.render_python_module(classes, buffer)
+                    sources.append((name, buffer.getvalue()))
+
+            seconds = best_of(args.repeat, render)
+            print(f"{f'render ({layout})':<36}{len(modules):>9}{seconds:>9.3f}s{stubs / seconds:>12.0f}")
+
+            for workers in args.workers:
+                out_dir = os.path.join(work_dir, "stubs")
+
+                def write() -> None:
+                    with stub_output.DirectoryWriter(out_dir, workers=workers, layout=modules) as writer:
+                        for name, source in sources:
+                            writer.write(name, source)
+
+                # Clearing the previous output is not part of the measurement
+                timings = []
+                for _ in range(args.repeat):
+                    shutil.rmtree(out_dir, ignore_errors=True)
+                    timings.append(best_of(1, write))
+                seconds = min(timings)
+                stage = f"write ({layout}, {workers} worker{'s' if workers != 1 else ''})"
+                print(f"{stage:<36}{len(sources):>9}{seconds:>9.3f}s{stubs / seconds:>12.0f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,159 @@
+"""
+Measures the memory footprint of the parsed java model, before and after the model was slimmed down.
+
+Every class in a jar is read with the bytecode frontend and kept in `generator.java_data`,
+then the memory allocated for the model is divided by the number of classes. The same
+measurement is taken of a baseline revision, by default the last one before `JashType`
+became a flyweight, extracted with `git archive` and run in its own interpreter.
+
+    python benchmarks/model_memory.py third-party/jd-cli.jar
+    python benchmarks/model_memory.py third-party/jd-cli.jar --baseline HEAD~5
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import generator
+from java_model.jash_class import JashClass
+from java_model.jash_type import JashType
+from utils import tree
+from utils.class_reader import read_class
+
+# Reported metric -> its label
+METRICS = {
+    "classes": "classes",
+    "type_objects": "JashType objects",
+    "distinct_types": "distinct types",
+    "model_bytes": "model memory (bytes)",
+    "bytes_per_class": "bytes per class",
+    "seconds": "build time (s)",
+}
+
+
+def count_classes(jash_class: JashClass) -> int:
+    return 1 + sum(count_classes(m) for m in jash_class.body if isinstance(m, JashClass))
+
+
+def type_key(jash_type: JashType | None) -> tuple | None:
+    """Gets a key identifying the value of a type, equal for equal types whether or not they are shared."""
+    if jash_type is None:
+        return None
+    return (jash_type.name, type_key(jash_type.sub_type), type_key(jash_type.implements), tuple(jash_type.modifiers),
+            len(jash_type.dimensions), tuple(type_key(p) for p in jash_type.parameters))
+
+
+def measure(jar: str) -> dict:
+    """
+    Reads every class of a jar into `generator.java_data`, measuring the memory it takes.
+
+    Args:
+        jar: The jar to read.
+
+    Returns:
+        Each of `METRICS`.
+    """
+    _, file_tree = tree.build_jar_file_tree(jar)
+    with zipfile.ZipFile(jar) as jar_file:
+        class_entries = generator.group_class_entries(jar_file.namelist())
+        sources = {
+            file: [jar_file.read(e) for e in class_entries["/".join(path + [file])]]
+            for path, file in tree.iter_tree_files(file_tree)
+        }
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for file, datas in sources.items():
+        classes = generator.convert_class_files([read_class(d) for d in datas], file)
+        if classes:
+            generator.java_data[file] = classes
+    seconds = time.perf_counter() - start
+    gc.collect()
+    model_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    class_count = sum(count_classes(c) for classes in generator.java_data.values() for c in classes.values())
+    type_objects = [o for o in gc.get_objects() if isinstance(o, JashType)]
+    return {
+        "classes": class_count,
+        "type_objects": len(type_objects),
+        "distinct_types": len({type_key(o) for o in type_objects}),
+        "model_bytes": model_bytes,
+        "bytes_per_class": round(model_bytes / class_count),
+        "seconds": round(seconds, 2),
+    }
+
+
+def flyweight_baseline() -> str:
+    """Gets the last revision before `JashType` became a flyweight, the parent of the commit adding its registry."""
+    commits = subprocess.run(
+        ["git", "log", "--reverse", "--format=%H", "-S", "_registry", "--", "java_model/jash_type.py"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout.split()
+    if not commits:
+        raise Exception("No revision adding the JashType registry was found, give one with --baseline.")
+    return commits[0] + "^"
+
+
+def measure_revision(revision: str, jar: str) -> dict:
+    """
+    Measures the model of another revision, running this script against a copy of its tree.
+
+    Args:
+        revision: The git revision to measure.
+        jar: The jar to read.
+
+    Returns:
+        Each of `METRICS`, as measured in that revision.
+    """
+    with tempfile.TemporaryDirectory(prefix="jash-baseline-") as work_dir:
+        archive = subprocess.run(["git", "archive", revision], cwd=ROOT, capture_output=True, check=True).stdout
+        subprocess.run(["tar", "-x", "-C", work_dir], input=archive, check=True)
+        script = os.path.join(work_dir, "benchmarks", "model_memory.py")
+        os.makedirs(os.path.dirname(script), exist_ok=True)
+        with open(os.path.abspath(__file__), "rb") as src, open(script, "wb") as dst:
+            dst.write(src.read())
+        output = subprocess.run([sys.executable, script, os.path.abspath(jar), "--json"],
+                                capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Measure the memory footprint of the parsed java model.")
+    arg_parser.add_argument("jar", nargs="?", default=os.path.join(ROOT, "third-party", "jd-cli.jar"), help="The jar to read.")
+    arg_parser.add_argument("--baseline", help="The git revision to compare against. Defaults to the last revision before JashType became a flyweight.")
+    arg_parser.add_argument("--no-baseline", action="store_true", help="Only measure the current model.")
+    arg_parser.add_argument("--json", action="store_true", help="Only measure the current model, printing the result as JSON.")
+    args = arg_parser.parse_args()
+
+    if args.json:
+        print(json.dumps(measure(args.jar)))
+        sys.exit(0)
+
+    # Both models are measured in fresh interpreters, so that neither sees the other's allocations
+    current = json.loads(subprocess.run([sys.executable, os.path.abspath(__file__), args.jar, "--json"],
+                                        capture_output=True, text=True, check=True).stdout)
+    print(f"jar: {args.jar}")
+    if args.no_baseline:
+        for metric, label in METRICS.items():
+            print(f"{label:<24}{current[metric]:>14}")
+        sys.exit(0)
+
+    revision = args.baseline or flyweight_baseline()
+    baseline = measure_revision(revision, args.jar)
+    print(f"{'':<24}{'baseline':>14}{'current':>14}{'change':>10}")
+    for metric, label in METRICS.items():
+        change = f"{(current[metric] - baseline[metric]) / baseline[metric]:+.0%}" if baseline[metric] else ""
+        print(f"{label:<24}{baseline[metric]:>14}{current[metric]:>14}{change:>10}")
+    print(f"baseline revision: {revision}")
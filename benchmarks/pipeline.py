@@ -0,0 +1,216 @@
+"""
+Times each phase of the JASH pipeline on a synthetic jar.
+
+The phases mirror main.py: decompile, build_java_file_tree, filtering, collect_java_data,
+propagation and generate_python_files. With --bytecode, the file tree is read from the
+jar and classes are collected from their bytecode instead. When no Java installation is
+available, the decompile phase is skipped and the synthetic jar's own Java sources are used.
+
+Results are written as JSON. Given a --baseline result, every phase is compared against it
+and the script exits with a non-zero code if any phase regressed beyond the tolerance.
+
+    python benchmarks/pipeline.py -n 10k -o result.json
+    python benchmarks/pipeline.py -n 10k --baseline result.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from typing import Callable, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generator
+from benchmarks.synthetic_jar import SyntheticSpec, add_spec_arguments, generate_jar, spec_from_args
+from utils import fio, tree
+
+PHASES = ["decompile", "build_java_file_tree", "filtering", "collect_java_data", "propagation", "generate_python_files"]
+BYTECODE_PHASES = ["build_jar_file_tree", "filtering", "collect_class_data", "propagation", "generate_python_files"]
+
+# Phases faster than this, in seconds, are too noisy to be flagged as regressions
+MIN_REGRESSION_SECONDS = 0.01
+
+
+def java_available() -> bool:
+    """Whether a Java installation and jd-cli are available to decompile with."""
+    if not os.path.exists(fio.JD_CLI_PATH):
+        return False
+    try:
+        code, output = fio.run_command(["java", "-version"])
+    except OSError:
+        return False
+    return code == 0 and "version" in output.lower()
+
+
+def run_once(jar: str, source_dir: str, work_dir: str, args: argparse.Namespace, decompile: bool) -> Dict[str, Optional[float]]:
+    """
+    Runs every phase of the pipeline once.
+
+    Args:
+        jar: The synthetic jar.
+        source_dir: The synthetic jar's Java sources, used when not decompiling.
+        work_dir: A scratch directory for decompiled sources and generated stubs.
+        args: The parsed command line arguments.
+        decompile: Whether to decompile the jar rather than using its synthetic sources.
+
+    Returns:
+        The wall time of each phase in seconds, None for skipped phases.
+    """
+    generator.reset()
+    timings = {}
+
+    def timed(phase: str, function: Callable):
+        start = time.perf_counter()
+        result = function()
+        timings[phase] = time.perf_counter() - start
+        return result
+
+    out_dir = os.path.join(work_dir, "stubs")
+    shutil.rmtree(out_dir, ignore_errors=True)
+    excludes = tree.PatternTrie(args.exclude) if args.exclude else None
+
+    if args.bytecode:
+        _, file_tree = timed("build_jar_file_tree", lambda: tree.build_jar_file_tree(jar))
+        timed("filtering", lambda: tree.filter_tree(file_tree, None, excludes))
+
+        def collect():
+            with zipfile.ZipFile(jar) as jar_file:
+                class_entries = generator.group_class_entries(jar_file.namelist())
+                for path, file in tree.iter_tree_files(file_tree):
+                    generator.collect_class_data(jar_file, file, class_entries["/".join(path + [file])])
+        timed("collect_class_data", collect)
+    else:
+        if decompile:
+            decompiled = os.path.join(work_dir, "decompiled")
+            shutil.rmtree(decompiled, ignore_errors=True)
+            timed("decompile", lambda: fio.decompile_jar(jar, decompiled))
+            source_dir = decompiled
+        else:
+            timings["decompile"] = None
+
+        _, file_tree = timed("build_java_file_tree", lambda: tree.build_java_file_tree(source_dir))
+        timed("filtering", lambda: tree.filter_tree(file_tree, None, excludes))
+
+        def collect():
+            if args.jobs > 1:
+                generator.collect_java_data_parallel(tree.iter_tree_files(file_tree), source_dir, args.jobs)
+            else:
+                for path, file in tree.iter_tree_files(file_tree):
+                    generator.collect_java_data(file, source_dir, path)
+        timed("collect_java_data", collect)
+
+    timed("propagation", generator.propagate_java_data)
+    timed("generate_python_files", lambda: generator.generate_python_files(out_dir))
+    return timings
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> bool:
+    """
+    Prints a per-phase comparison of a result against a baseline.
+
+    Args:
+        result: The benchmark result.
+        baseline: The baseline result.
+        tolerance: The relative slowdown allowed before a phase counts as regressed.
+
+    Returns:
+        Whether any phase regressed.
+    """
+    if result["config"] != baseline["config"]:
+        print("Warning: the baseline was recorded with a different configuration.", file=sys.stderr)
+
+    regressed = False
+    print(f"{'phase':<24}{'baseline':>12}{'current':>12}{'change':>10}")
+    for phase, seconds in result["phases"].items():
+        before = baseline["phases"].get(phase)
+        if seconds is None or before is None:
+            print(f"{phase:<24}{'-':>12}{'-':>12}{'skipped':>10}")
+            continue
+
+        change = (seconds - before) / before if before else 0.0
+        flag = ""
+        if change > tolerance and seconds - before > MIN_REGRESSION_SECONDS:
+            flag = "  REGRESSED"
+            regressed = True
+        print(f"{phase:<24}{before:>11.3f}s{seconds:>11.3f}s{change:>+9.1%}{flag}")
+    return regressed
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Time each phase of the JASH pipeline on a synthetic jar.")
+    add_spec_arguments(arg_parser)
+    arg_parser.add_argument("-j", "--jobs", type=int, default=1, help="The number of processes used to collect java data.")
+    arg_parser.add_argument("-r", "--repeat", type=int, default=3, help="The number of runs, the fastest of which is reported per phase.")
+    arg_parser.add_argument("--bytecode", action="store_true", help="Benchmark the bytecode frontend instead of decompiling.")
+    arg_parser.add_argument("--no-decompile", action="store_true", help="Use the synthetic sources even if Java is available.")
+    arg_parser.add_argument("-ex", "--exclude", nargs="*", default=["bench.**.p0"], help="The exclude patterns used by the filtering phase.")
+    arg_parser.add_argument("-o", "--output", help="The file to write the JSON result to, instead of stdout.")
+    arg_parser.add_argument("--baseline", help="A previous JSON result to compare against.")
+    arg_parser.add_argument("--tolerance", type=float, default=0.1, help="The relative slowdown of a phase counted as a regression.")
+    args = arg_parser.parse_args()
+
+    if args.repeat < 1:
+        raise Exception("The number of runs must be at least 1.")
+
+    spec: SyntheticSpec = spec_from_args(args)
+    decompile = not args.bytecode and not args.no_decompile and java_available()
+
+    work_dir = tempfile.mkdtemp(prefix="jash-bench-")
+    try:
+        jar = os.path.join(work_dir, "synthetic.jar")
+        source_dir = os.path.join(work_dir, "sources")
+        print(f"Generating a synthetic jar of {spec.classes} classes...", file=sys.stderr)
+        generate_jar(spec, jar, None if args.bytecode else source_dir)
+
+        runs = []
+        for i in range(args.repeat):
+            print(f"Run {i + 1}/{args.repeat}...", file=sys.stderr)
+            runs.append(run_once(jar, source_dir, work_dir, args, decompile))
+
+        phases = {}
+        for phase in BYTECODE_PHASES if args.bytecode else PHASES:
+            samples = [run[phase] for run in runs if run.get(phase) is not None]
+            phases[phase] = min(samples) if samples else None
+
+        result = {
+            "config": {
+                **spec._asdict(),
+                "jobs": args.jobs,
+                "bytecode": args.bytecode,
+                "decompile": decompile,
+                "exclude": args.exclude,
+            },
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+            "counts": {
+                "files": len(generator.java_data),
+                "unresolved_references": sum(len(names) for _, _, names in generator.unknown_references.values()),
+            },
+            "repeat": args.repeat,
+            "phases": phases,
+            "total": sum(s for s in phases.values() if s is not None),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.tolerance):
+            sys.exit(1)
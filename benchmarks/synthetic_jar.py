@@ -0,0 +1,315 @@
+"""
+Generates synthetic jars of configurable size for benchmarking.
+
+Class files are written directly, without a Java compiler, together with the matching Java
+sources, so that the source frontend can be benchmarked even where no decompiler can run.
+"""
+
+import argparse
+import os
+import random
+import struct
+import sys
+import zipfile
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+ACC_PUBLIC = 0x0001
+ACC_SUPER = 0x0020
+
+OBJECT = "java/lang/Object"
+
+
+class SyntheticSpec(NamedTuple):
+    """The shape of a synthetic jar."""
+    classes: int = 1000
+    package_depth: int = 3
+    classes_per_package: int = 20
+    members_per_class: int = 10
+    generics_density: float = 0.3
+    seed: int = 0
+
+
+class SyntheticType(NamedTuple):
+    """A type used by a synthetic member, in both its Java source and class file forms."""
+    source: str
+    descriptor: str
+    signature: Optional[str] = None
+
+
+# Descriptor of a return type -> (Java return statement, bytecode, max stack) of a method body
+RETURNS = {
+    "V": ("", b"\xb1", 0),
+    "I": ("return 0;", b"\x03\xac", 1),
+    "Z": ("return false;", b"\x03\xac", 1),
+    "J": ("return 0L;", b"\x09\xad", 2),
+}
+REFERENCE_RETURN = ("return null;", b"\x01\xb0", 1)
+
+PRIMITIVES = [
+    SyntheticType("int", "I"),
+    SyntheticType("long", "J"),
+    SyntheticType("boolean", "Z"),
+    SyntheticType("String", "Ljava/lang/String;"),
+]
+
+
+class ConstantPool:
+    """A class file constant pool, deduplicating its entries."""
+
+    def __init__(self):
+        self.entries: List[bytes] = []
+        self.indices: Dict[bytes, int] = {}
+
+    def add(self, entry: bytes) -> int:
+        index = self.indices.get(entry)
+        if index is None:
+            self.entries.append(entry)
+            index = self.indices[entry] = len(self.entries)
+        return index
+
+    def utf8(self, value: str) -> int:
+        data = value.encode("utf-8")
+        return self.add(struct.pack(">BH", 1, len(data)) + data)
+
+    def class_ref(self, name: str) -> int:
+        return self.add(struct.pack(">BH", 7, self.utf8(name)))
+
+    def method_ref(self, owner: str, name: str, descriptor: str) -> int:
+        name_and_type = self.add(struct.pack(">BHH", 12, self.utf8(name), self.utf8(descriptor)))
+        return self.add(struct.pack(">BHH", 10, self.class_ref(owner), name_and_type))
+
+    def __bytes__(self) -> bytes:
+        return struct.pack(">H", len(self.entries) + 1) + b"".join(self.entries)
+
+
+class SyntheticClass:
+    """A single synthetic top-level class, rendered as both a class file and a Java source."""
+
+    def __init__(self, package: str, name: str, generic: bool, superclass: Optional[str]):
+        self.package = package
+        self.name = name
+        self.generic = generic
+        self.superclass = superclass
+        self.imports = set()
+        self.fields: List[Tuple[str, SyntheticType]] = []
+        self.methods: List[Tuple[str, SyntheticType, List[SyntheticType]]] = []
+
+    @property
+    def internal_name(self) -> str:
+        return f"{self.package.replace('.', '/')}/{self.name}"
+
+    def class_file(self) -> bytes:
+        pool = ConstantPool()
+        this_index = pool.class_ref(self.internal_name)
+        super_name = self.superclass.replace(".", "/") if self.superclass else OBJECT
+        super_index = pool.class_ref(super_name)
+
+        def attribute(name: str, data: bytes) -> bytes:
+            return struct.pack(">HI", pool.utf8(name), len(data)) + data
+
+        def signature(value: Optional[str]) -> List[bytes]:
+            return [attribute("Signature", struct.pack(">H", pool.utf8(value)))] if value else []
+
+        def member(name: str, descriptor: str, attributes: List[bytes]) -> bytes:
+            header = struct.pack(">HHHH", ACC_PUBLIC, pool.utf8(name), pool.utf8(descriptor), len(attributes))
+            return header + b"".join(attributes)
+
+        def code(max_stack: int, max_locals: int, instructions: bytes) -> bytes:
+            data = struct.pack(">HHI", max_stack, max_locals, len(instructions)) + instructions + struct.pack(">HH", 0, 0)
+            return attribute("Code", data)
+
+        init = pool.method_ref(super_name, "<init>", "()V")
+        methods = [member("<init>", "()V", [code(1, 1, b"\x2a\xb7" + struct.pack(">H", init) + b"\xb1")])]
+        for name, return_type, parameters in self.methods:
+            descriptor = f"({''.join(p.descriptor for p in parameters)}){return_type.descriptor}"
+            generic = return_type.signature or any(p.signature for p in parameters)
+            method_signature = None
+            if generic:
+                method_signature = f"({''.join(p.signature or p.descriptor for p in parameters)})"
+                method_signature += return_type.signature or return_type.descriptor
+            _, instructions, max_stack = RETURNS.get(return_type.descriptor, REFERENCE_RETURN)
+            max_locals = 1 + sum(2 if p.descriptor in ("J", "D") else 1 for p in parameters)
+            methods.append(member(name, descriptor, [code(max_stack, max_locals, instructions)] + signature(method_signature)))
+
+        fields = [member(name, t.descriptor, signature(t.signature)) for name, t in self.fields]
+
+        class_signature = None
+        if self.generic:
+            class_signature = f"<T:L{OBJECT};>L{super_name};"
+        class_attributes = signature(class_signature)
+
+        body = struct.pack(">HHHH", ACC_PUBLIC | ACC_SUPER, this_index, super_index, 0)
+        body += struct.pack(">H", len(fields)) + b"".join(fields)
+        body += struct.pack(">H", len(methods)) + b"".join(methods)
+        body += struct.pack(">H", len(class_attributes)) + b"".join(class_attributes)
+        return struct.pack(">IHH", 0xCAFEBABE, 0, 52) + bytes(pool) + body
+
+    def source(self) -> str:
+        lines = [f"package {self.package};", ""]
+        if self.imports:
+            lines.extend(f"import {i};" for i in sorted(self.imports))
+            lines.append("")
+
+        declaration = f"public class {self.name}"
+        if self.generic:
+            declaration += "<T>"
+        if self.superclass:
+            declaration += f" extends {self.superclass.rpartition('.')[2]}"
+        lines.append(declaration + " {")
+
+        for name, field_type in self.fields:
+            lines.append(f"    public {field_type.source} {name};")
+        for name, return_type, parameters in self.methods:
+            arguments = ", ".join(f"{p.source} a{i}" for i, p in enumerate(parameters))
+            statement, _, _ = RETURNS.get(return_type.descriptor, REFERENCE_RETURN)
+            lines.append(f"    public {return_type.source} {name}({arguments}) {{ {statement} }}")
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+
+def package_name(index: int, depth: int) -> str:
+    """
+    Gets the name of a synthetic package, spreading packages over a tree with a fanout of 10.
+
+    Args:
+        index: The index of the package.
+        depth: The number of segments below the `bench` root.
+
+    Returns:
+        The dotted package name.
+    """
+    segments = [f"g{(index // 10 ** (depth - 1 - j)) % 10}" for j in range(depth - 1)]
+    return ".".join(["bench"] + segments + [f"p{index}"])
+
+
+def build_classes(spec: SyntheticSpec) -> List[SyntheticClass]:
+    """
+    Builds the classes of a synthetic jar.
+
+    Classes reference classes of other packages through both single-type and on-demand
+    imports, so that reference resolution has work to do.
+
+    Args:
+        spec: The shape of the jar.
+
+    Returns:
+        The synthetic classes.
+    """
+    rng = random.Random(spec.seed)
+    names = [
+        (package_name(i // spec.classes_per_package, spec.package_depth), f"C{i // spec.classes_per_package}_{i % spec.classes_per_package}")
+        for i in range(spec.classes)
+    ]
+
+    def reference(owner: SyntheticClass) -> SyntheticType:
+        package, name = names[rng.randrange(len(names))]
+        if package != owner.package:
+            owner.imports.add(f"{package}.*" if rng.random() < 0.5 else f"{package}.{name}")
+        internal = f"L{package.replace('.', '/')}/{name};"
+        return SyntheticType(name, internal)
+
+    def member_type(owner: SyntheticClass, generic: bool) -> SyntheticType:
+        if generic and rng.random() < spec.generics_density:
+            if owner.generic and rng.random() < 0.5:
+                return SyntheticType("T", f"L{OBJECT};", "TT;")
+            element = reference(owner) if rng.random() < 0.5 else PRIMITIVES[3]
+            owner.imports.add("java.util.List")
+            return SyntheticType(f"List<{element.source}>", "Ljava/util/List;", f"Ljava/util/List<{element.descriptor}>;")
+        if rng.random() < 0.4:
+            return reference(owner)
+        return PRIMITIVES[rng.randrange(len(PRIMITIVES))]
+
+    classes = []
+    for i, (package, name) in enumerate(names):
+        generic = rng.random() < spec.generics_density
+        superclass = None
+        if i and rng.random() < 0.3:
+            super_package, super_name = names[rng.randrange(i)]
+            superclass = f"{super_package}.{super_name}"
+
+        synthetic = SyntheticClass(package, name, generic, superclass)
+        if superclass and super_package != package:
+            synthetic.imports.add(superclass)
+
+        for m in range(spec.members_per_class):
+            if m % 2 == 0:
+                synthetic.fields.append((f"field{m}", member_type(synthetic, True)))
+            else:
+                return_type = member_type(synthetic, True) if rng.random() < 0.7 else SyntheticType("void", "V")
+                parameters = [member_type(synthetic, True) for _ in range(rng.randrange(3))]
+                synthetic.methods.append((f"method{m}", return_type, parameters))
+        classes.append(synthetic)
+
+    return classes
+
+
+def generate_jar(spec: SyntheticSpec, jar_path: str, source_dir: str = None) -> int:
+    """
+    Writes a synthetic jar, and optionally the Java sources it would decompile to.
+
+    Args:
+        spec: The shape of the jar.
+        jar_path: The path to write the jar to.
+        source_dir: The directory to write the matching Java sources to, if any.
+
+    Returns:
+        The number of classes written.
+    """
+    classes = build_classes(spec)
+    with zipfile.ZipFile(jar_path, "w", zipfile.ZIP_DEFLATED) as jar:
+        jar.writestr("META-INF/MANIFEST.MF", "Manifest-Version: 1.0\r\n\r\n")
+        for synthetic in classes:
+            jar.writestr(synthetic.internal_name + ".class", synthetic.class_file())
+
+    if source_dir is not None:
+        for synthetic in classes:
+            path = os.path.join(source_dir, synthetic.internal_name + ".java")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(synthetic.source())
+
+    return len(classes)
+
+
+def parse_count(value: str) -> int:
+    """Parses a class count, allowing `k` and `m` suffixes, e.g. `10k`."""
+    value = value.strip().lower()
+    multiplier = {"k": 1000, "m": 1000000}.get(value[-1:], 1)
+    return int(float(value.rstrip("km")) * multiplier)
+
+
+def add_spec_arguments(arg_parser: argparse.ArgumentParser) -> None:
+    """Adds the arguments describing a `SyntheticSpec` to an argument parser."""
+    defaults = SyntheticSpec()
+    arg_parser.add_argument("-n", "--classes", type=parse_count, default=defaults.classes,
+                            help=f"The number of classes, e.g. 1k, 10k or 100k. Default {defaults.classes}.")
+    arg_parser.add_argument("--package-depth", type=int, default=defaults.package_depth,
+                            help=f"The number of package segments below the root. Default {defaults.package_depth}.")
+    arg_parser.add_argument("--classes-per-package", type=int, default=defaults.classes_per_package,
+                            help=f"The number of classes in each package. Default {defaults.classes_per_package}.")
+    arg_parser.add_argument("--members-per-class", type=int, default=defaults.members_per_class,
+                            help=f"The number of fields and methods in each class. Default {defaults.members_per_class}.")
+    arg_parser.add_argument("--generics-density", type=float, default=defaults.generics_density,
+                            help=f"The fraction of classes and members using generics. Default {defaults.generics_density}.")
+    arg_parser.add_argument("--seed", type=int, default=defaults.seed, help="The random seed. Default 0.")
+
+
+def spec_from_args(args: argparse.Namespace) -> SyntheticSpec:
+    """Builds a `SyntheticSpec` from arguments added by `add_spec_arguments`."""
+    if args.classes < 1 or args.package_depth < 1 or args.classes_per_package < 1 or args.members_per_class < 0:
+        raise Exception("Class counts and package depth must be at least 1, and member counts at least 0.")
+    if not 0 <= args.generics_density <= 1:
+        raise Exception("The generics density must be between 0 and 1.")
+    return SyntheticSpec(args.classes, args.package_depth, args.classes_per_package, args.members_per_class,
+                         args.generics_density, args.seed)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Generate a synthetic jar for benchmarking.")
+    arg_parser.add_argument("jar", help="The path to write the jar to.")
+    arg_parser.add_argument("--sources", help="A directory to write the matching Java sources to.")
+    add_spec_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    count = generate_jar(spec_from_args(args), args.jar, args.sources)
+    print(f"Wrote {count} classes to {args.jar}", file=sys.stderr)
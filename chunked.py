@@ -0,0 +1,97 @@
+import gc
+from itertools import groupby
+from typing import Iterator, List, Optional, Tuple
+
+from utils import profiling, tree
+
+DEFAULT_BATCH_SIZE = 2000
+# Batches are never shrunk below this many classes, however far memory is over the target
+MIN_BATCH_SIZE = 50
+
+
+def iter_packages(file_tree: tree.Tree) -> Iterator[List[str]]:
+    """
+    Iterates over the packages of a file tree.
+
+    Args:
+        file_tree: The file tree.
+
+    Yields:
+        The top-level classes of each package, as paths without extension.
+    """
+    for path, files in groupby(tree.iter_tree_files(file_tree), key=lambda item: item[0]):
+        prefix = "/".join(path) + "/" if path else ""
+        yield [prefix + file for _, file in files]
+
+
+class BatchPlanner:
+    """
+    Splits a file tree into batches of whole packages, sized to keep memory under a target.
+
+    Packages are added to a batch until it reaches the batch size; a package larger than the
+    batch size is split by class. When a memory target is given, the batch size is halved
+    whenever a batch leaves the resident set size higher and over the target, and grown back
+    towards the configured size while it stays under half of it.
+    """
+
+    def __init__(self, file_tree: tree.Tree, batch_size: int, max_memory: Optional[int] = None):
+        """
+        Creates a new BatchPlanner.
+
+        Args:
+            file_tree: The filtered file tree of the jar.
+            batch_size: The number of top-level classes per batch.
+            max_memory: The target resident set size in bytes, if any.
+        """
+        self.packages = iter_packages(file_tree)
+        self.carry: List[str] = []
+        self.max_batch_size = batch_size
+        self.batch_size = batch_size
+        self.max_memory = max_memory
+        self.last_rss = profiling.current_rss()
+
+    def next_batch(self) -> Optional[Tuple[int, tree.Tree]]:
+        """
+        Plans the next batch.
+
+        Returns:
+            The number of classes and the file tree of the batch, or None once every class
+            has been batched.
+        """
+        keys = self.carry
+        for package in self.packages:
+            keys.extend(package)
+            if len(keys) >= self.batch_size:
+                break
+
+        self.carry = keys[self.batch_size:]
+        keys = keys[:self.batch_size]
+        if not keys:
+            return None
+        return tree.build_class_file_tree(key + ".class" for key in keys)
+
+    def over_target(self) -> bool:
+        """Checks whether the process is over its memory target."""
+        return self.max_memory is not None and profiling.current_rss() > self.max_memory
+
+    def adjust(self) -> None:
+        """
+        Resizes the following batches to the memory used so far, once the last batch is released.
+
+        Batches only shrink when the last one raised the resident set size while over the
+        target. Memory held outside of batches, such as the symbol index, is not reduced by
+        smaller batches, which would only add per-batch overhead.
+        """
+        if self.max_memory is None:
+            return
+
+        rss = profiling.current_rss()
+        if rss > self.max_memory:
+            # The released classes may only be freed once their reference cycles are collected
+            gc.collect()
+            rss = profiling.current_rss()
+            if rss > self.max_memory and rss > self.last_rss:
+                self.batch_size = max(min(MIN_BATCH_SIZE, self.batch_size), self.batch_size // 2)
+        elif rss < self.max_memory // 2:
+            self.batch_size = min(self.max_batch_size, self.batch_size * 3 // 2)
+        self.last_rss = rss
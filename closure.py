@@ -0,0 +1,82 @@
+"""
+Dependency closure of a set of root classes.
+
+The roots are read straight from bytecode, exactly as `--bytecode` reads them, and every
+type their stubs would reference (supertypes, field types, method parameter, return and
+type parameter types, throws clauses, type arguments and the members of nested classes) is
+followed to its top-level class in any of the input jars, until no new class is reached.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+import generator
+from java_model.jash_class import JashClass
+from utils.zip_directory import ZipDirectory
+
+
+def referenced_classes(classes: Dict[str, JashClass]) -> Set[str]:
+    """
+    Gets the top-level classes referenced by the stubs of a file.
+
+    Args:
+        classes: The top-level classes of the file, keyed by class name.
+
+    Returns:
+        The referenced classes, as paths without extension.
+    """
+    referenced = set()
+    for jash_class in classes.values():
+        for jash_type in jash_class.iter_types():
+            path = jash_type.import_path()
+            if path is not None:
+                referenced.add(path[0].replace(".", "/") + "/" + path[1])
+    return referenced
+
+
+def reachable_classes(jars: List[Tuple[str, Iterable[str]]]) -> List[Tuple[List[str], int]]:
+    """
+    Finds every class of a set of jars reachable from their root classes.
+
+    A class in several jars is read from the last one, as `java_data` keeps the last copy,
+    but is kept in every jar that holds it.
+
+    Args:
+        jars: Each jar and its root classes, as paths without extension.
+
+    Returns:
+        The reachable classes of each jar, in the order of the jar's entries, and the number
+        of classes in the jar, in the order of `jars`.
+    """
+    archives = []
+    class_entries: List[Dict[str, List[str]]] = []
+    # Class -> the index of the jar it is read from
+    providers: Dict[str, int] = {}
+    try:
+        for i, (jar, _) in enumerate(jars):
+            archive = ZipDirectory(jar)
+            archives.append(archive)
+            class_entries.append(generator.group_class_entries(archive.namelist()))
+            providers.update(dict.fromkeys(class_entries[-1], i))
+
+        reached: Set[str] = set()
+        pending = deque()
+        for _, roots in jars:
+            for key in roots:
+                if key not in reached:
+                    reached.add(key)
+                    pending.append(key)
+
+        while pending:
+            key = pending.popleft()
+            i = providers[key]
+            classes = generator.parse_class_entries(archives[i], key.rpartition("/")[2], class_entries[i][key])
+            for referenced in referenced_classes(classes):
+                if referenced in providers and referenced not in reached:
+                    reached.add(referenced)
+                    pending.append(referenced)
+    finally:
+        for archive in archives:
+            archive.close()
+
+    return [([key for key in entries if key in reached], len(entries)) for entries in class_entries]
@@ -0,0 +1,130 @@
+import json
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+from utils.zip_directory import ZipDirectory
+
+# Which copy of a class is kept when jars hold different contents under the same name:
+# "last" matches the order classes are stored in `java_data`, "first" the JVM class path
+# order, and "error" refuses to pick one
+DUPLICATE_POLICIES = ("last", "first", "error")
+
+
+class DuplicateConflictError(Exception):
+    """Raised when jars hold different contents for the same class and the policy is `error`."""
+    pass
+
+
+class DuplicateReport:
+    """The classes skipped as duplicates of a class in another jar, and how much work that saved."""
+
+    def __init__(self, policy: str):
+        """
+        Creates a new DuplicateReport.
+
+        Args:
+            policy: The duplicate policy in use, one of `DUPLICATE_POLICIES`.
+        """
+        self.policy = policy
+        # Class -> the jar whose copy is kept, and the jars whose identical copies are skipped
+        self.identical: Dict[str, Tuple[str, List[str]]] = {}
+        # Class -> the jar whose copy is kept, and the jars whose differing copies are dropped
+        self.conflicts: Dict[str, Tuple[str, List[str]]] = {}
+        # Jar -> the number of classes, class entries and uncompressed class bytes skipped
+        self.skipped: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0])
+
+    def skipped_classes(self) -> int:
+        return sum(classes for classes, _, _ in self.skipped.values())
+
+    def skipped_bytes(self) -> int:
+        return sum(size for _, _, size in self.skipped.values())
+
+    def summary(self) -> str:
+        """Summarises the report for the console."""
+        lines = [
+            f"Skipped {self.skipped_classes()} duplicate classes ({self.skipped_bytes() / 1024:.1f} KiB of class files): "
+            f"{len(self.identical)} identical across jars, {len(self.conflicts)} with differing contents, "
+            f"keeping the {self.policy} copy."
+        ]
+        for jar, (classes, entries, size) in self.skipped.items():
+            lines.append(f"  {jar}: {classes} classes, {entries} class files, {size / 1024:.1f} KiB")
+        return "\n".join(lines)
+
+    def to_json(self) -> dict:
+        return {
+            "policy": self.policy,
+            "skipped_classes": self.skipped_classes(),
+            "skipped_bytes": self.skipped_bytes(),
+            "jars": {
+                jar: {"classes": classes, "class_files": entries, "bytes": size}
+                for jar, (classes, entries, size) in self.skipped.items()
+            },
+            "identical": {key: {"kept": kept, "skipped": dropped} for key, (kept, dropped) in sorted(self.identical.items())},
+            "conflicts": {key: {"kept": kept, "dropped": dropped} for key, (kept, dropped) in sorted(self.conflicts.items())},
+        }
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f, indent=1)
+
+
+def plan_deduplication(
+        jars: List[Tuple[str, Dict[str, int], Dict[str, List[str]]]],
+        policy: str = "last"
+) -> Tuple[List[Set[str]], DuplicateReport]:
+    """
+    Picks a single copy of every class that is selected in more than one jar.
+
+    Classes are matched by their path, and compared by the CRC signature of their class
+    files. Identical copies are only decompiled and parsed once, from the jar the policy
+    keeps. Differing copies are resolved by the policy.
+
+    Args:
+        jars: Each jar, the signature of every selected top-level class, as computed by
+            `incremental.scan_jar`, and the class entries of every top-level class in it.
+        policy: One of `DUPLICATE_POLICIES`.
+
+    Returns:
+        The classes to drop from each jar, in the order of `jars`, and the report.
+
+    Raises:
+        DuplicateConflictError: If copies differ and the policy is `error`.
+    """
+    if policy not in DUPLICATE_POLICIES:
+        raise Exception(f"Unknown duplicate policy '{policy}'.")
+
+    # Class -> the index of every jar selecting it, in class path order
+    copies: Dict[str, List[int]] = defaultdict(list)
+    for i, (_, signatures, _) in enumerate(jars):
+        for key in signatures:
+            copies[key].append(i)
+
+    report = DuplicateReport(policy)
+    dropped: List[Set[str]] = [set() for _ in jars]
+    for key, indices in copies.items():
+        if len(indices) < 2:
+            continue
+
+        kept = indices[0] if policy == "first" else indices[-1]
+        others = [i for i in indices if i != kept]
+        identical = all(jars[i][1][key] == jars[kept][1][key] for i in others)
+        if not identical and policy == "error":
+            raise DuplicateConflictError(
+                f"The class {key.replace('/', '.')} differs between " + ", ".join(jars[i][0] for i in indices) + "."
+            )
+
+        (report.identical if identical else report.conflicts)[key] = (jars[kept][0], [jars[i][0] for i in others])
+        for i in others:
+            dropped[i].add(key)
+
+    for (jar, _, class_entries), keys in zip(jars, dropped):
+        if not keys:
+            continue
+        with ZipDirectory(jar) as archive:
+            skipped = report.skipped[jar]
+            for key in keys:
+                entries = class_entries[key]
+                skipped[0] += 1
+                skipped[1] += len(entries)
+                skipped[2] += sum(archive.getinfo(entry).file_size for entry in entries)
+    return dropped, report
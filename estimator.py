@@ -0,0 +1,167 @@
+import random
+import time
+from collections import defaultdict
+
+import generator
+from utils import tree
+from utils.zip_directory import ZipDirectory
+
+# Rough throughput figures for the stages that cannot be sampled without running them.
+# jd-cli's rate is an assumption; the parsers' were measured with benchmarks/declaration_parser.py.
+JD_CLI_BYTES_PER_SECOND = 1024 * 1024
+JVM_STARTUP_SECONDS = 1.0
+DECOMPILED_SOURCE_RATIO = 1.0
+JAVALANG_BYTES_PER_SECOND = 400 * 1024
+DECLARATION_PARSER_BYTES_PER_SECOND = 3 * 1024 * 1024
+
+DEFAULT_SAMPLES = 64
+
+
+class JarEstimate:
+    def __init__(
+            self,
+            file_count: int,
+            class_bytes: int,
+            stub_count: float,
+            stub_bytes: float,
+            read_seconds: float,
+            render_seconds: float,
+            sample_count: int
+    ):
+        """
+        Creates a new JarEstimate instance, the projected output of generating stubs for a jar.
+
+        Args:
+            file_count: The number of top-level classes that would be processed.
+            class_bytes: The uncompressed size of their class files, nested classes included.
+            stub_count: The projected number of stub files.
+            stub_bytes: The projected size of the stub files.
+            read_seconds: The projected time to read every class file's declarations.
+            render_seconds: The projected time to render every stub file.
+            sample_count: The number of files the projection was sampled from.
+        """
+        self.file_count = file_count
+        self.class_bytes = class_bytes
+        self.stub_count = stub_count
+        self.stub_bytes = stub_bytes
+        self.read_seconds = read_seconds
+        self.render_seconds = render_seconds
+        self.sample_count = sample_count
+
+    def runtime(self, bytecode: bool = False, jobs: int = 1, decompile_workers: int = 1, parser: str = "declarations") -> dict[str, float]:
+        """
+        Projects the runtime of each stage of a run.
+
+        Args:
+            bytecode: Whether declarations are read from bytecode instead of decompiled sources.
+            jobs: The number of worker processes used to parse java files.
+            decompile_workers: The number of jd-cli processes used to decompile the jar.
+            parser: The parser used for decompiled sources, as in `generator.JAVA_PARSERS`.
+
+        Returns:
+            The projected seconds per stage.
+        """
+        if bytecode:
+            return {"read": self.read_seconds, "generate": self.render_seconds}
+        if not self.file_count:
+            return {"decompile": 0.0, "parse": 0.0, "generate": 0.0}
+
+        decompile = JVM_STARTUP_SECONDS + self.class_bytes / JD_CLI_BYTES_PER_SECOND / decompile_workers
+        seconds_per_byte = {
+            "declarations": 1 / DECLARATION_PARSER_BYTES_PER_SECOND,
+            "javalang": 1 / JAVALANG_BYTES_PER_SECOND,
+            "verify": 1 / DECLARATION_PARSER_BYTES_PER_SECOND + 1 / JAVALANG_BYTES_PER_SECOND,
+        }[parser]
+        parse = self.class_bytes * DECOMPILED_SOURCE_RATIO * seconds_per_byte / jobs
+        return {"decompile": decompile, "parse": parse, "generate": self.render_seconds}
+
+
+def estimate_jar(jar_file: ZipDirectory, file_tree: tree.Tree, samples: int = DEFAULT_SAMPLES, seed: int = 0) -> JarEstimate:
+    """
+    Estimates the output of generating stubs for the classes of a filtered file tree.
+
+    Sizes are read from the jar's central directory, which is already in memory. Only a
+    random sample of the selected classes is decompressed, read and rendered, and the stub
+    size and timings of the sample are scaled by class file size to the whole selection.
+
+    Args:
+        jar_file: The jar, opened from its central directory.
+        file_tree: The filtered file tree of the jar.
+        samples: The number of classes to sample.
+        seed: The seed used to choose the sample.
+
+    Returns:
+        The estimate.
+    """
+    # Sizes are summed per top-level class, and nested entries kept for the sampled classes
+    sizes = defaultdict(int)
+    nested = defaultdict(list)
+    for name, size in jar_file.file_sizes():
+        if not name.endswith(".class"):
+            continue
+        base = name[:-6]
+        dollar = base.find("$", base.rfind("/") + 1)
+        key = base[:dollar] if dollar >= 0 else base
+        sizes[key] += size
+        if dollar >= 0:
+            nested[key].append(name)
+
+    selected = []
+    stack = [(file_tree, "")]
+    while stack:
+        node, prefix = stack.pop()
+        selected.extend(prefix + file for file in node.files)
+        stack.extend((child, f"{prefix}{name}/") for name, child in node.children.items())
+
+    class_bytes = sum(sizes[key] for key in selected)
+    if not selected:
+        return JarEstimate(0, 0, 0, 0, 0.0, 0.0, 0)
+
+    sample = random.Random(seed).sample(selected, min(samples, len(selected)))
+    sample_bytes = 0
+    sample_stubs = 0
+    sample_stub_bytes = 0
+    read_seconds = 0.0
+    render_seconds = 0.0
+    for key in sample:
+        file = key.rpartition("/")[2]
+        entries = [key + ".class"] + nested[key]
+        size = sizes[key]
+        start = time.perf_counter()
+        classes = generator.parse_class_entries(jar_file, file, entries)
+        read_seconds += time.perf_counter() - start
+
+        sample_bytes += size
+        if classes:
+            start = time.perf_counter()
+            sample_stub_bytes += len(generator.render_python_module(classes).encode("utf-8"))
+            render_seconds += time.perf_counter() - start
+            sample_stubs += 1
+
+    scale = class_bytes / sample_bytes if sample_bytes else 0.0
+    return JarEstimate(
+        len(selected),
+        class_bytes,
+        sample_stubs * len(selected) / len(sample),
+        sample_stub_bytes * scale,
+        read_seconds * scale,
+        render_seconds * scale,
+        len(sample)
+    )
+
+
+def format_size(size: float) -> str:
+    """
+    Formats a byte count for display.
+
+    Args:
+        size: The number of bytes.
+
+    Returns:
+        The size in the largest fitting binary unit.
+    """
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
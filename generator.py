@@ -1,14 +1,45 @@
 import enum
+import io
 import os
+import sys
+import zipfile
+from collections import defaultdict, deque
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
 
 import javalang.parse
 
-from utils import fio
+from utils import declaration_parser, fio, profiling, progress_counter, stub_output
+from utils.symbols import SymbolIndex, split_imports
+from utils.utils import interned_tuples
+from utils.class_reader import (ACC_ANNOTATION, ACC_BRIDGE, ACC_ENUM, ACC_INTERFACE, ACC_PRIVATE, ACC_STATIC,
+                                ACC_SYNTHETIC, ACC_VARARGS, ClassInfo, modifiers_from_flags, parse_class_signature,
+                                parse_field_signature, parse_method_signature, read_class)
 from java_model.jash_annotation import JashAnnotation
 from java_model.jash_class import JashClass
+from java_model.jash_method import CONSTRUCTOR_NAME, JashMethod
+from java_model.jash_type import JashType, WILDCARD
+from java_model.jash_type_parameter import JashTypeParameter
+from java_model.jash_variable import JashVariable
 
+# Fully qualified file name -> the top-level classes of the file, keyed by class name
 java_data = {}
+# Fully qualified file name -> (package, imports, unresolved simple names) of the file
 unknown_references = {}
+# Every package a collected type was imported from, e.g. to pick the standard library packages to install
+referenced_packages: Set[str] = set()
+
+# The parser used for Java sources: "declarations", "javalang", or "verify" to check the former against the latter
+JAVA_PARSERS = ("declarations", "javalang", "verify")
+java_parser = "declarations"
+
+# Set by `enable_streaming_emission`, in which case files are written as soon as they are collected
+emit_dir: Optional[str] = None
+# Fully qualified class name -> fully qualified name of its file, kept in place of `java_data` when streaming
+symbol_summary: Dict[str, str] = {}
+# Flat stub module name -> the fully qualified names of the files emitted to it, in order, the last one kept on disk
+emitted_modules: Dict[str, List[str]] = {}
 
 
 class DataType(enum.Enum):
@@ -17,6 +48,151 @@ class DataType(enum.Enum):
     METHOD = 2
 
 
+def reset() -> None:
+    """Clears all data collected so far and switches streaming emission off, e.g. before another run."""
+    global emit_dir
+    java_data.clear()
+    unknown_references.clear()
+    referenced_packages.clear()
+    symbol_summary.clear()
+    emitted_modules.clear()
+    interned_tuples.clear()
+    emit_dir = None
+
+
+def set_java_parser(name: str) -> None:
+    """
+    Selects the parser used for Java sources, also used to initialise worker processes.
+
+    Args:
+        name: One of `JAVA_PARSERS`.
+    """
+    global java_parser
+    if name not in JAVA_PARSERS:
+        raise Exception(f"Unknown Java parser '{name}'.")
+    java_parser = name
+
+
+def init_worker(parser: str, progress=None) -> None:
+    """
+    Initialises a worker process with the parent's parser and progress counter.
+
+    Args:
+        parser: The Java parser to use.
+        progress: The shared value of the parent's progress counter, if any.
+    """
+    set_java_parser(parser)
+    progress_counter.attach(progress)
+
+
+def parse_in_worker(function, *args):
+    """Runs a parse function in a worker process, timed and counted towards the parent's progress."""
+    result = profiling.timed_call(function, *args)
+    progress_counter.worker_increment()
+    return result
+
+
+def enable_streaming_emission(save_dir: str) -> None:
+    """
+    Switches collection to streaming emission.
+
+    Instead of accumulating in `java_data` until `generate_python_files` runs, each file's
+    stub module is written to `save_dir` as soon as the file is collected, and its classes
+    are released. Only `symbol_summary`, and the simple type names each file could not
+    resolve on its own in `unknown_references`, are kept for later reference resolution.
+
+    Args:
+        save_dir: The directory to write stub modules to.
+    """
+    global emit_dir
+    emit_dir = save_dir
+    os.makedirs(save_dir, exist_ok=True)
+
+
+def store_java_data(file: str, classes: dict[str, JashClass]) -> None:
+    """
+    Stores the collected classes of a file in `java_data`, or emits them straight away when streaming.
+
+    Either way, the simple type names the file cannot resolve on its own are recorded in
+    `unknown_references`, along with the file's package and imports, for `propagate_java_data`.
+
+    Args:
+        file: The name of the file.
+        classes: The top-level classes of the file, keyed by class name.
+    """
+    if not classes:
+        return
+
+    first = next(iter(classes.values()))
+    key = sys.intern(f"{first.package}.{file}" if first.package else file)
+
+    unresolved = unresolved_type_names(classes)
+    if unresolved:
+        unknown_references[key] = (first.package, first.imports, tuple(sorted(unresolved)))
+    for jash_class in classes.values():
+        for jash_type in jash_class.iter_types():
+            path = jash_type.import_path()
+            if path is not None:
+                referenced_packages.add(path[0])
+
+    if emit_dir is None:
+        java_data[key] = classes
+        return
+
+    write_python_file(emit_dir, file, classes)
+    emitted_modules.setdefault(file + ".py", []).append(key)
+    for jash_class in classes.values():
+        for name in iter_class_names(jash_class):
+            symbol_summary[sys.intern(name)] = key
+
+
+def iter_class_names(jash_class: JashClass, prefix: str = None) -> Iterator[str]:
+    """
+    Iterates over the fully qualified names of a class and all its nested classes.
+
+    Args:
+        jash_class: The class.
+        prefix: The qualified name of the enclosing class, if nested.
+
+    Yields:
+        The fully qualified name of each class, with nested classes separated by `$`.
+    """
+    name = f"{prefix}${jash_class.name}" if prefix else jash_class.fqn
+    yield name
+    for member in jash_class.body:
+        if isinstance(member, JashClass):
+            yield from iter_class_names(member, name)
+
+
+def unresolved_type_names(classes: dict[str, JashClass]) -> set[str]:
+    """
+    Finds the simple type names referenced by a file that cannot be resolved from the file alone.
+
+    These are unqualified names that are neither builtins, type variables nor classes
+    declared in the file itself.
+
+    Args:
+        classes: The top-level classes of the file, keyed by class name.
+
+    Returns:
+        The unresolved simple names.
+    """
+    declared = set()
+    for jash_class in classes.values():
+        declared.update(name.rpartition(".")[2].split("$")[-1] for name in iter_class_names(jash_class))
+        declared.update(t.name for t in jash_class.iter_type_parameters())
+
+    unresolved = set()
+    for jash_class in classes.values():
+        for jash_type in jash_class.iter_types():
+            if jash_type.is_primitive() or jash_type.name == WILDCARD or jash_type.import_path() is not None:
+                continue
+            name = jash_type.full_name.split(".")[0]
+            if name not in declared:
+                unresolved.add(name)
+    return unresolved
+
+
 def collect_java_data(file: str, temp_path: str, path: list[str]) -> None:
     """
     Collects all pertinent data from a given Java file.
@@ -28,112 +204,823 @@ def collect_java_data(file: str, temp_path: str, path: list[str]) -> None:
         temp_path: The path to the temp file directory.
         path: The path to the java file.
     """
+    with profiling.file("/".join(path + [file]), "parse"):
+        classes = parse_java_file(file, temp_path, path)
+    store_java_data(file, classes)
+
+
+def collect_java_data_parallel(
+        files: Iterable[Tuple[List[str], str]],
+        temp_path: str,
+        jobs: int,
+        counter=None
+) -> None:
+    """
+    Collects data from many Java files at once using a pool of worker processes.
+
+    Files are parsed by `parse_java_file` in the workers, and the resulting classes are
+    merged into `java_data` in the same order as `files`, so the result is identical to
+    calling `collect_java_data` on each file in turn.
+
+    Args:
+        files: The (path, file) pairs to parse, as yielded by `tree.iter_tree_files`.
+        temp_path: The path to the temp file directory.
+        jobs: The number of worker processes to use.
+        counter: An optional progress counter, incremented once per parsed file.
+    """
+    files = list(files)
+    if not files:
+        return
+
+    # Larger chunks amortise the pickling round trip, smaller ones keep the workers balanced
+    chunk_size = max(1, len(files) // (jobs * 8))
+
+    # Workers count their own progress, as results are only merged in order
+    progress = counter.shared() if counter is not None else None
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(java_parser, progress)) as executor:
+        results = executor.map(
+            parse_in_worker,
+            repeat(parse_java_file),
+            [file for _, file in files],
+            repeat(temp_path),
+            [path for path, _ in files],
+            chunksize=chunk_size
+        )
+
+        for (path, file), (classes, timing) in zip(files, results):
+            profiling.record_file("/".join(path + [file]), "parse", timing)
+            store_java_data(file, classes)
+
+
+def iter_java_sources(
+        sources_jar: zipfile.ZipFile,
+        files: Iterable[Tuple[List[str], str]]
+) -> Iterator[Tuple[List[str], str, str]]:
+    """
+    Streams decompiled Java sources out of an in-memory sources jar.
+
+    Args:
+        sources_jar: The jar of decompiled sources.
+        files: The (path, file) pairs to read, as yielded by `tree.iter_tree_files`.
+
+    Yields:
+        The path, file name and source text of each file.
+
+    Raises:
+        FileNotFoundError: If a file is missing from the sources jar.
+    """
+    for path, file in files:
+        entry = "/".join(path + [file + ".java"])
+        try:
+            source = sources_jar.read(entry)
+        except KeyError:
+            raise FileNotFoundError(f"The file '{entry}' does not exist in the decompiled sources.")
+        yield path, file, source.decode("utf-8", "replace")
+
+
+def collect_java_sources(
+        sources: Iterable[Tuple[List[str], str, str]],
+        jobs: int = 1,
+        counter=None
+) -> None:
+    """
+    Collects data from a stream of Java sources held in memory.
+
+    With more than one job, sources are parsed in a pool of worker processes. Only a
+    bounded window of sources is in flight at once, so the stream is never read far
+    ahead of the parser, and results are merged into `java_data` in stream order.
+
+    Args:
+        sources: The (path, file, source) triples to parse, as yielded by `iter_java_sources`.
+        jobs: The number of worker processes to use.
+        counter: An optional progress counter, incremented once per parsed file.
+    """
+    def merge(path: List[str], file: str, result: Tuple[dict[str, JashClass], tuple]) -> None:
+        classes, timing = result
+        profiling.record_file("/".join(path + [file]), "parse", timing)
+        store_java_data(file, classes)
+
+    if jobs <= 1:
+        for path, file, source in sources:
+            merge(path, file, profiling.timed_call(parse_java_source, source, file))
+            if counter is not None:
+                counter.increment()
+        return
+
+    # Workers count their own progress, so that it is reported as files are parsed rather than merged
+    progress = counter.shared() if counter is not None else None
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(java_parser, progress)) as executor:
+        pending = deque()
+        for path, file, source in sources:
+            pending.append((path, file, executor.submit(parse_in_worker, parse_java_source, source, file)))
+            if len(pending) >= jobs * 4:
+                path, file, future = pending.popleft()
+                merge(path, file, future.result())
+
+        while pending:
+            path, file, future = pending.popleft()
+            merge(path, file, future.result())
+
+
+def parse_java_file(file: str, temp_path: str, path: list[str]) -> dict[str, JashClass]:
+    """
+    Parses a given Java file into its classes, without touching any global state.
+
+    Args:
+        file: The name of the java file.
+        temp_path: The path to the temp file directory.
+        path: The path to the java file.
+
+    Returns:
+        The top-level classes declared in the file, keyed by class name.
+    """
     absolute_path = "/".join([temp_path] + path + [file + ".java"])
     fio.check_file_access(absolute_path)
 
-    file_tree = None
     with (open(absolute_path, "r") as f):
+        return parse_java_source(f.read(), file)
+
+
+def parse_java_source(source: str, file: str) -> dict[str, JashClass]:
+    """
+    Parses Java source text into its classes, without touching any global state.
+
+    The parser is chosen by `java_parser`. The declaration parser falls back to a full
+    javalang parse for any source it cannot handle, so it fails on exactly the same sources.
+
+    Args:
+        source: The Java source text.
+        file: The name of the java file, used in error messages.
+
+    Returns:
+        The top-level classes declared in the source, keyed by class name.
+    """
+    try:
+        if java_parser == "javalang":
+            return convert_compilation_unit(javalang.parse.parse(source))
+
         try:
-            file_tree: javalang.parser.tree.CompilationUnit = javalang.parse.parse(f.read())
-
-            classes = {}
-
-            for path, node in file_tree.filter(javalang.parser.tree.ClassDeclaration):
-
-                # General class data
-                classes[node.name] = JashClass(
-                    node.name,
-                    [JashAnnotation(a) for a in node.annotations],
-                    [],
-                    str(node.documentation),
-                    None,
-                    None,
-                    []
-                )
-
-                # Member variable
-            #     for path, node in file_tree.filter(javalang.parser.tree.FieldDeclaration):
-            #         class_name = None
-            #         for ancestor in reversed(path):
-            #             if isinstance(ancestor, javalang.parser.tree.ClassDeclaration):
-            #                 class_name = ancestor.name
-            #                 break
-            #
-            #         if class_name:
-            #             for decl in node.declarators:
-            #                 # print(f"Variable | {str(node)}\n\n")
-            #                 field_info = {
-            #                     "name": decl.name,
-            #                     "type": getattr(node.type, 'name', str(node.type)),
-            #                     "modifiers": node.modifiers,
-            #                     "position": node.position
-            #                 }
-            #
-            #                 try:
-            #                     classes[class_name].setdefault("fields", []).append(field_info)
-            #                 except KeyError:
-            #                     if class_name not in unknown_references:
-            #                         unknown_references[class_name] = []
-            #                     unknown_references[class_name].append({
-            #                         "file": file,
-            #                         "path": path,
-            #                         "inner_path": [
-            #                             (class_name, DataType.CLASS),
-            #                             (field_info["name"], DataType.FIELD)
-            #                         ]
-            #                     })
-            #
-            # # Constructors
-            # for path, node in file_tree.filter(javalang.parser.tree.ConstructorDeclaration):
-            #     class_name = None
-            #     for ancestor in reversed(path):
-            #         if isinstance(ancestor, javalang.parser.tree.ClassDeclaration):
-            #             class_name = ancestor.name
-            #             break
-            #     if class_name is None:
-            #         continue
-            #
-            #     classes[class_name]["constructors"].append({
-            #         "class": class_name,
-            #         "name": "__init__",
-            #         "return_type": None,
-            #         "modifiers": node.modifiers,
-            #         "parameters": [(param.type.name, param.name) for param in node.parameters],
-            #         "position": node.position
-            #     })
-            #
-            # # Methods
-            # for path, node in file_tree.filter(javalang.parser.tree.MethodDeclaration):
-            #     class_name = None
-            #     for ancestor in reversed(path):
-            #         if isinstance(ancestor, javalang.parser.tree.ClassDeclaration):
-            #             class_name = ancestor.name
-            #             break
-            #     if class_name is None:
-            #         continue  # skip if no class found
-            #     classes[class_name]["methods"].append({
-            #         "class": class_name,
-            #         "name": node.name,
-            #         "return_type": node.return_type.name if node.return_type else 'void',
-            #         "modifiers": node.modifiers,
-            #         "parameters": [(param.type.name, param.name) for param in node.parameters],
-            #         "position": node.position
-            #     })
-
-                java_data[file] = classes
-        except javalang.parser.JavaSyntaxError as e:
-            raise Exception(f"Syntax error encountered while parsing {file}.java.\n\t- {e}")
+            classes = convert_compilation_unit(declaration_parser.parse(source))
+        except (javalang.parser.JavaSyntaxError, javalang.tokenizer.LexerError):
+            return convert_compilation_unit(javalang.parse.parse(source))
+
+        if java_parser == "verify":
+            expected = convert_compilation_unit(javalang.parse.parse(source))
+            if render_python_module(classes) != render_python_module(expected):
+                print(f"Warning: the declaration parser disagrees with javalang on {file}.java, using javalang's result.", file=sys.stderr)
+                return expected
+        return classes
+    except javalang.parser.JavaSyntaxError as e:
+        raise Exception(f"Syntax error encountered while parsing {file}.java.\n\t- {e}")
+    except Exception as e:
+        raise Exception(f"Unknown error encountered while parsing {file}.java.\n\t- {e}")
+
+
+def convert_compilation_unit(file_tree: javalang.parser.tree.CompilationUnit) -> dict[str, JashClass]:
+    """
+    Converts the type declarations of a parsed Java file.
+
+    Args:
+        file_tree: The compilation unit of the file.
+
+    Returns:
+        The top-level classes declared in the file, keyed by class name.
+    """
+    package = file_tree.package.name if file_tree.package else ""
+    imports = [i.path + ".*" if i.wildcard else i.path for i in file_tree.imports if not i.static]
+
+    classes = {}
+    for node in file_tree.types:
+        classes[node.name] = convert_class_declaration(node, package, imports)
+    return classes
+
+
+def convert_type(node) -> Optional[JashType]:
+    """
+    Converts a javalang type node into a JashType.
+
+    Args:
+        node: The javalang BasicType, ReferenceType or TypeArgument node.
+
+    Returns:
+        The converted type, or None for a missing (void) type.
+    """
+    if node is None:
+        return None
+
+    if isinstance(node, javalang.parser.tree.TypeArgument):
+        if node.type is None:
+            return JashType(WILDCARD)
+        if node.pattern_type == "extends":
+            return JashType(WILDCARD, implements=convert_type(node.type), modifiers=["extends"])
+        if node.pattern_type == "super":
+            return JashType(WILDCARD, modifiers=["super"])
+        return convert_type(node.type)
+
+    return JashType(
+        node.name,
+        sub_type=convert_type(getattr(node, "sub_type", None)),
+        dimensions=node.dimensions,
+        parameters=[convert_type(a) for a in getattr(node, "arguments", None) or []]
+    )
+
+
+def convert_type_parameters(nodes) -> list[JashTypeParameter]:
+    """
+    Converts javalang type parameter nodes into JashTypeParameters.
+
+    Args:
+        nodes: The javalang TypeParameter nodes, or None.
+
+    Returns:
+        The converted type parameters.
+    """
+    return [JashTypeParameter(n.name, [convert_type(e) for e in n.extends or []]) for n in nodes or []]
+
+
+def convert_class_declaration(node, package: str, imports: list[str] = None) -> JashClass:
+    """
+    Converts a javalang class, interface, enum or annotation declaration into a JashClass.
+
+    Private members are left out, as they cannot be referenced from outside the class.
+
+    Args:
+        node: The javalang type declaration node.
+        package: The package the declaration belongs to.
+        imports: The import declarations of the file, for top-level declarations.
+
+    Returns:
+        The converted class, with nested type declarations in its body.
+    """
+    tree = javalang.parser.tree
+    modifiers = sorted(node.modifiers)
+    extends = None
+    implements = []
+
+    if isinstance(node, tree.InterfaceDeclaration):
+        modifiers.append("interface")
+        implements = [convert_type(t) for t in node.extends or []]
+    else:
+        extends = convert_type(getattr(node, "extends", None))
+        implements = [convert_type(t) for t in getattr(node, "implements", None) or []]
+
+    declarations = node.body or []
+    body = []
+    if isinstance(node, tree.EnumDeclaration):
+        modifiers.append("enum")
+        enum_type = JashType(node.name)
+        for constant in node.body.constants:
+            body.append(JashVariable(constant.name, enum_type, modifiers=["public", "static", "final"]))
+        declarations = node.body.declarations
+
+    for member in declarations:
+        if "private" in getattr(member, "modifiers", ()):
+            continue
+
+        if isinstance(member, tree.FieldDeclaration):
+            for declarator in member.declarators:
+                field_type = convert_type(member.type).with_dimensions(len(declarator.dimensions or []))
+                body.append(JashVariable(
+                    declarator.name,
+                    field_type,
+                    modifiers=sorted(member.modifiers),
+                    annotations=[JashAnnotation([a.name]) for a in member.annotations],
+                    documentation=member.documentation
+                ))
+        elif isinstance(member, (tree.MethodDeclaration, tree.ConstructorDeclaration)):
+            constructor = isinstance(member, tree.ConstructorDeclaration)
+            parameters = []
+            for parameter in member.parameters:
+                parameter_type = convert_type(parameter.type)
+                if parameter.varargs:
+                    parameter_type = parameter_type.with_dimensions(1)
+                parameters.append(JashVariable(parameter.name, parameter_type))
+
+            body.append(JashMethod(
+                CONSTRUCTOR_NAME if constructor else member.name,
+                None if constructor else convert_type(member.return_type) or JashType("void"),
+                parameters,
+                [JashType(t) for t in member.throws or []],
+                sorted(member.modifiers),
+                convert_type_parameters(member.type_parameters),
+                [JashAnnotation([a.name]) for a in member.annotations],
+                member.documentation,
+                bool(member.parameters) and member.parameters[-1].varargs
+            ))
+        elif isinstance(member, tree.TypeDeclaration):
+            body.append(convert_class_declaration(member, package))
+
+    return JashClass(
+        node.name,
+        [JashAnnotation([a.name]) for a in node.annotations],
+        body,
+        node.documentation,
+        extends,
+        implements,
+        modifiers,
+        convert_type_parameters(getattr(node, "type_parameters", None)),
+        package,
+        imports
+    )
+
+
+def group_class_entries(names: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Groups the class entries of a jar by the top-level class they belong to.
+
+    Nested classes (`Outer$Inner.class`) are grouped with their outer class, mirroring
+    how they share a single decompiled source file. Metadata entries are skipped.
+
+    Args:
+        names: The entry names of the jar.
+
+    Returns:
+        A mapping of top-level class path, without extension, to its class entries.
+    """
+    groups = defaultdict(list)
+    for name in names:
+        if not name.endswith(".class") or name.startswith("META-INF/"):
+            continue
+        base = name[:-6]
+        if base.endswith(("module-info", "package-info")):
+            continue
+
+        directory, _, file = base.rpartition("/")
+        top_level = file.split("$", 1)[0]
+        if not top_level:
+            continue
+        groups[f"{directory}/{top_level}" if directory else top_level].append(name)
+    return groups
+
+
+def collect_class_data(jar_file: zipfile.ZipFile, file: str, entries: List[str]) -> None:
+    """
+    Collects all pertinent data from the class entries of a single top-level class.
+
+    All data gathered is stored in `java_data`.
+
+    Args:
+        jar_file: The open jar containing the entries.
+        file: The name of the top-level class.
+        entries: The class entries of the top-level class and its nested classes.
+    """
+    directory = entries[0].rpartition("/")[0] if entries else ""
+    with profiling.file(f"{directory}/{file}" if directory else file, "read"):
+        classes = parse_class_entries(jar_file, file, entries)
+    store_java_data(file, classes)
+
+
+def parse_class_entries(jar_file: zipfile.ZipFile, file: str, entries: List[str]) -> dict[str, JashClass]:
+    """
+    Reads a top-level class and its nested classes straight from their class file bytecode.
+
+    Args:
+        jar_file: The open jar containing the entries.
+        file: The name of the top-level class.
+        entries: The class entries of the top-level class and its nested classes.
+
+    Returns:
+        The top-level class, keyed by class name, with member classes nested in its body.
+    """
+    infos = []
+    for entry in entries:
+        try:
+            infos.append(read_class(jar_file.read(entry)))
         except Exception as e:
-            raise Exception(f"Unknown error encountered while parsing {file}.java.\n\t- {e}")
+            raise Exception(f"Error encountered while reading {entry}.\n\t- {e}")
+    return convert_class_files(infos, file)
 
 
-def propagate_java_data():
-    pass
+def convert_class_files(infos: List[ClassInfo], file: str) -> dict[str, JashClass]:
+    """
+    Converts the class files of a top-level class and its nested classes into JashClasses.
 
+    Args:
+        infos: The class files of the top-level class and its nested classes.
+        file: The name of the top-level class.
+
+    Returns:
+        The top-level class, keyed by class name, with member classes nested in its body.
+    """
+    converted = {}
+    outers = {}
+    for info in infos:
+        nesting = {inner: (outer, simple_name, flags) for inner, outer, simple_name, flags in info.attributes.get("InnerClasses", [])}
+        outer, simple_name, flags = nesting.get(info.name, (None, None, info.access_flags))
+
+        # Anonymous and local classes cannot be referenced by name
+        if info.name in nesting and (outer is None or simple_name is None):
+            continue
+
+        jash_class = convert_class_file(info, flags, simple_name, outer)
+        if jash_class is not None:
+            converted[info.name] = jash_class
+            outers[info.name] = outer
+
+    # Nest member classes into their outer classes, outermost first
+    for name in sorted(converted, key=len):
+        outer = outers[name]
+        if outer is not None and outer in converted:
+            converted[outer].body.append(converted[name])
+
+    return {c.name: c for name, c in converted.items() if outers[name] is None and c.name == file}
+
+
+def convert_class_file(info: ClassInfo, flags: int, simple_name: str = None, outer: str = None) -> Optional[JashClass]:
+    """
+    Converts a single class file into a JashClass, without its member classes.
+
+    Synthetic and private members are left out, as they cannot be referenced by stubs.
+
+    Args:
+        info: The class file.
+        flags: The access flags of the class, taken from its InnerClasses entry when nested.
+        simple_name: The simple name of the class when nested.
+        outer: The binary name of the enclosing class when nested.
+
+    Returns:
+        The converted class, or None if the class is synthetic or private.
+    """
+    if flags & (ACC_SYNTHETIC | ACC_PRIVATE):
+        return None
+
+    package, _, binary_name = info.name.rpartition(".")
+    modifiers = modifiers_from_flags(flags)
+    if flags & ACC_ANNOTATION:
+        modifiers.append("@interface")
+    elif flags & ACC_INTERFACE:
+        modifiers.append("interface")
+    elif flags & ACC_ENUM:
+        modifiers.append("enum")
+
+    attributes = info.attributes
+    if "Signature" in attributes:
+        type_parameters, extends, implements = parse_class_signature(attributes["Signature"])
+    else:
+        type_parameters = []
+        extends = JashType(info.super_name) if info.super_name else None
+        implements = [JashType(i) for i in info.interfaces]
+    if flags & ACC_INTERFACE:
+        extends = None
+
+    annotations = [JashAnnotation([a]) for a in attributes.get("RuntimeVisibleAnnotations", [])]
+    body = []
+
+    for field in info.fields:
+        if field.access_flags & (ACC_SYNTHETIC | ACC_PRIVATE):
+            continue
+        body.append(JashVariable(
+            field.name,
+            parse_field_signature(field.attributes.get("Signature", field.descriptor)),
+            modifiers=modifiers_from_flags(field.access_flags)
+        ))
+
+    for method in info.methods:
+        if method.access_flags & (ACC_SYNTHETIC | ACC_BRIDGE | ACC_PRIVATE) or method.name == "<clinit>":
+            continue
+        constructor = method.name == "<init>"
+
+        if "Signature" in method.attributes:
+            method_type_parameters, parameter_types, return_type, throws = parse_method_signature(method.attributes["Signature"])
+        else:
+            method_type_parameters, parameter_types, return_type, throws = parse_method_signature(method.descriptor)
+            # Inner class constructors take their enclosing instance as a hidden first parameter
+            if constructor and outer is not None and not flags & ACC_STATIC and parameter_types:
+                parameter_types = parameter_types[1:]
+        if not throws:
+            throws = [JashType(e) for e in method.attributes.get("Exceptions", [])]
+
+        names = method.attributes.get("MethodParameters", [])
+        if len(names) != len(parameter_types):
+            names = []
+        parameters = [
+            JashVariable(names[i] if names and names[i] else f"arg{i}", parameter_type)
+            for i, parameter_type in enumerate(parameter_types)
+        ]
+
+        body.append(JashMethod(
+            CONSTRUCTOR_NAME if constructor else method.name,
+            None if constructor else return_type,
+            parameters,
+            throws,
+            modifiers_from_flags(method.access_flags),
+            method_type_parameters,
+            varargs=bool(method.access_flags & ACC_VARARGS)
+        ))
+
+    return JashClass(
+        simple_name or binary_name,
+        annotations,
+        body,
+        None,
+        extends,
+        implements,
+        modifiers,
+        type_parameters,
+        package
+    )
+
+
+def build_symbol_index() -> SymbolIndex:
+    """
+    Builds the symbol index of every class collected so far, across all input jars.
+
+    Returns:
+        The index, built from `java_data` or, when streaming, from `symbol_summary`.
+    """
+    index = SymbolIndex()
+    for name, key in symbol_summary.items():
+        index.add(name, key)
+    for key, classes in java_data.items():
+        for jash_class in classes.values():
+            for name in iter_class_names(jash_class):
+                index.add(name, key)
+    return index
+
+
+def propagate_java_data(counter=None) -> Tuple[int, int]:
+    """
+    Resolves every entry of `unknown_references` against the classes of all input jars.
+
+    The symbol index is built once, after which each reference is resolved with a constant
+    number of hashed lookups, so the whole pass is linear in the number of references.
+    Resolved names are qualified in place in `java_data`, or, when streaming, imported by
+    patching the already emitted stub modules, unless a file of the same name from another
+    package has since overwritten the module. Only the names that could not be resolved
+    are left in `unknown_references`.
+
+    Args:
+        counter: An optional progress counter, incremented once per file with references.
+
+    Returns:
+        The number of resolved and unresolved references.
+    """
+    index = build_symbol_index()
+    resolved_count = 0
+    unresolved_count = 0
+
+    for key in list(unknown_references):
+        package, imports, names = unknown_references[key]
+        single_imports, on_demand_imports = split_imports(imports)
+
+        resolved = {}
+        unresolved = []
+        for name in names:
+            fqn = index.resolve(name, package, single_imports, on_demand_imports)
+            if fqn is None:
+                unresolved.append(name)
+            else:
+                resolved[name] = fqn
+                referenced_packages.add(JashType(fqn).split_name()[0])
+
+        if resolved:
+            if key in java_data:
+                for jash_class in java_data[key].values():
+                    jash_class.map_types(lambda t: t.qualify(resolved))
+            elif emit_dir is not None:
+                file = key.rpartition(".")[2]
+                if emitted_modules.get(file + ".py", [None])[-1] == key:
+                    patch_python_file(emit_dir, file, resolved)
+
+        if unresolved:
+            unknown_references[key] = (package, imports, tuple(unresolved))
+        else:
+            del unknown_references[key]
+
+        resolved_count += len(resolved)
+        unresolved_count += len(unresolved)
+        if counter is not None:
+            counter.increment()
+
+    return resolved_count, unresolved_count
+
+
+MODULE_HEADER = "from __future__ import annotations\n\nfrom typing import Any, ClassVar, Generic, TypeVar, overload\n"
+
+
+def render_python_module(classes: dict[str, JashClass], out: Optional[TextIO] = None) -> Optional[str]:
+    """
+    Renders the classes of a single Java file as a python stub module.
+
+    Imports are generated for every referenced type from another module, and a TypeVar is
+    declared for every generic type variable used in the module.
+
+    Args:
+        classes: The top-level classes of the file, keyed by class name.
+        out: The stream to write the module to, e.g. a buffer reused across modules.
+
+    Returns:
+        The source of the stub module, or None when written to `out`.
+    """
+    imports = defaultdict(set)
+    type_vars = set()
+    for jash_class in classes.values():
+        for jash_type in jash_class.iter_types():
+            path = jash_type.import_path()
+            if path is None or (path[0] == jash_class.package and path[1] in classes):
+                continue
+            imports[path[0]].add(path[1])
+        type_vars.update(t.name for t in jash_class.iter_type_parameters())
+
+    buffer = io.StringIO() if out is None else out
+    buffer.write(MODULE_HEADER)
+    if imports:
+        for package, names in sorted(imports.items()):
+            buffer.write(f"\nfrom {package} import {', '.join(sorted(names))}")
+        buffer.write("\n")
+    if type_vars:
+        for name in sorted(type_vars):
+            buffer.write(f'\n{name} = TypeVar("{name}")')
+        buffer.write("\n")
+
+    for jash_class in classes.values():
+        buffer.write("\n\n")
+        jash_class.write(buffer)
+        buffer.write("\n")
+    return buffer.getvalue() if out is None else None
 
-def generate_python_files(save_dir: str):
-    os.makedirs(save_dir, exist_ok=True)
 
-    for file, data in java_data.items():
+def write_python_file(save_dir: str, file: str, classes: dict[str, JashClass]) -> None:
+    """
+    Renders and writes the stub module of a single Java file.
+
+    Args:
+        save_dir: The directory to write the module to.
+        file: The name of the Java file.
+        classes: The top-level classes of the file, keyed by class name.
+    """
+    with profiling.file(os.path.join(save_dir, file + ".py"), "write"):
         with open(os.path.join(save_dir, file + ".py"), "w") as f:
-            f.write(str(data[file]))
+            f.write(render_python_module(classes))
+
+
+def patch_python_file(save_dir: str, file: str, names: Dict[str, str]) -> None:
+    """
+    Adds imports for resolved type names to an already emitted stub module.
+
+    Names resolved to a nested class are imported through their top-level class and
+    aliased, as the stub references them by their simple name.
+
+    Args:
+        save_dir: The directory the module was written to.
+        file: The name of the Java file.
+        names: A mapping of simple name to fully qualified name.
+    """
+    imports = defaultdict(set)
+    aliases = []
+    for name, fqn in sorted(names.items()):
+        package, class_name = JashType(fqn).split_name()
+        if not package:
+            continue
+        imports[package].add(class_name.split(".")[0])
+        if class_name != name:
+            aliases.append(f"{name} = {class_name}")
+    if not imports:
+        return
+
+    lines = [f"from {package} import {', '.join(sorted(classes))}" for package, classes in sorted(imports.items())]
+    lines.extend(aliases)
+
+    path = os.path.join(save_dir, file + ".py")
+    with open(path, "r") as f:
+        source = f.read()
+    if source.startswith(MODULE_HEADER):
+        source = f"{MODULE_HEADER}\n" + "\n".join(lines) + "\n" + source[len(MODULE_HEADER):]
+    else:
+        source = "\n".join(lines) + "\n" + source
+    with open(path, "w") as f:
+        f.write(source)
+
+
+# How stub modules are laid out: "flat" writes a module per Java file into the output directory,
+# "packages" a package per Java package whose `__init__.py` defines all of its classes
+OUTPUT_LAYOUTS = ("flat", "packages")
+
+
+def plan_modules(layout: str = "flat") -> Dict[str, dict[str, JashClass]]:
+    """
+    Lays out the collected classes as stub modules, before any module is rendered.
+
+    In the flat layout, a later file overwrites an earlier file of the same name, as writing
+    them in order would, see `warn_flat_collisions`. In the package layout, every package becomes an importable Python
+    package whose `__init__.py` defines all of its classes, so that the imports the stubs
+    contain resolve as written. Classes in the default package keep a module per file.
+
+    Args:
+        layout: One of `OUTPUT_LAYOUTS`.
+
+    Returns:
+        The classes of every module, keyed by the path of the module with `/` separators.
+    """
+    if layout == "flat":
+        return {key.rpartition(".")[2] + ".py": classes for key, classes in java_data.items()}
+
+    modules = {}
+    packages = defaultdict(dict)
+    for key, classes in java_data.items():
+        package, _, file = key.rpartition(".")
+        if package:
+            packages[package].update(classes)
+        else:
+            modules[file + ".py"] = classes
+    for package in sorted(packages):
+        modules[stub_output.package_module_name(package)] = packages[package]
+    return modules
+
+
+def flat_module_keys(keys: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Groups Java files by the stub module they are written to in the flat layout.
+
+    Args:
+        keys: The fully qualified names of the files, in the order they are written.
+
+    Returns:
+        The fully qualified names of the files written to each module, in order, keyed by module name.
+    """
+    modules = defaultdict(list)
+    for key in keys:
+        modules[key.rpartition(".")[2] + ".py"].append(key)
+    return modules
+
+
+def warn_flat_collisions(modules: Dict[str, List[str]]) -> int:
+    """
+    Warns about Java files whose flat stub module is overwritten by a file of the same name from another package.
+
+    Args:
+        modules: The fully qualified names of the files written to each module, in order, keyed by module name.
+
+    Returns:
+        The number of overwritten files.
+    """
+    collisions = [keys for keys in modules.values() if len(keys) > 1]
+    overwritten = sum(len(keys) - 1 for keys in collisions)
+    if overwritten:
+        examples = "; ".join(", ".join(keys) for keys in collisions[:3]) + ("; ..." if len(collisions) > 3 else "")
+        print(f"Warning: {overwritten} file{'s' if overwritten != 1 else ''} overwritten by a file of the same name "
+              f"from another package in the flat layout ({examples}). --layout packages keeps every class.", file=sys.stderr)
+    return overwritten
+
+
+def write_modules(writer, modules: Dict[str, dict[str, JashClass]]) -> int:
+    """
+    Renders and writes stub modules, reusing a single buffer to render them into.
+
+    Args:
+        writer: The writer to write the modules with, see `stub_output`.
+        modules: The classes of every module, as laid out by `plan_modules`.
+
+    Returns:
+        The number of modules written.
+    """
+    buffer = io.StringIO()
+    for name, classes in modules.items():
+        buffer.seek(0)
+        buffer.truncate()
+        render_python_module(classes, buffer)
+        writer.write(name, buffer.getvalue())
+    return len(modules)
+
+
+def generate_python_files(
+        save_dir: str,
+        batch_bytes: int = stub_output.DEFAULT_BATCH_BYTES,
+        layout: str = "flat",
+        workers: int = stub_output.DEFAULT_WRITE_WORKERS
+) -> int:
+    """
+    Writes the stub modules of every collected Java file to a directory.
+
+    The modules are laid out up front, so that every directory is created in a single pass,
+    then rendered and written in batches, see `stub_output.DirectoryWriter`.
+
+    Args:
+        save_dir: The directory to write the modules to.
+        batch_bytes: The number of bytes of rendered modules to buffer before writing.
+        layout: One of `OUTPUT_LAYOUTS`.
+        workers: The number of threads writing each batch.
+
+    Returns:
+        The number of modules written.
+    """
+    os.makedirs(save_dir, exist_ok=True)
+    if layout == "flat":
+        warn_flat_collisions(emitted_modules if emit_dir is not None else flat_module_keys(java_data))
+
+    modules = plan_modules(layout)
+    with stub_output.DirectoryWriter(save_dir, batch_bytes, workers, modules) as writer:
+        return write_modules(writer, modules)
+
+
+def write_package_modules(writer) -> int:
+    """
+    Writes the collected classes as one stub module per package, e.g. into an archive.
+
+    Args:
+        writer: The writer to write the modules with, see `stub_output`.
+
+    Returns:
+        The number of modules written.
+    """
+    return write_modules(writer, plan_modules("packages"))
@@ -0,0 +1,226 @@
+import json
+import os
+import time
+import zlib
+from typing import Dict, Iterable, List, Set, Tuple
+
+import generator
+from utils import tree
+from utils.cache import jar_entry_crcs
+
+MANIFEST_FORMAT = 1
+# Written to the output directory, recording the CRC signature of every class a stub was generated from
+MANIFEST_FILE = ".jash-manifest.json"
+
+
+def run_options(bytecode: bool) -> dict:
+    """
+    Gets the options of a run that change the generated stubs, invalidating the whole manifest when they differ.
+
+    Args:
+        bytecode: Whether declarations are read from bytecode instead of decompiled sources.
+
+    Returns:
+        The options, as recorded in the manifest.
+    """
+    return {"bytecode": bytecode}
+
+
+def read_manifest(save_dir: str) -> dict:
+    """
+    Reads the manifest of a previous run.
+
+    Args:
+        save_dir: The output directory of the run.
+
+    Returns:
+        The manifest, or an empty one if there is none or it is of an unsupported format.
+    """
+    empty = {"format": MANIFEST_FORMAT, "options": None, "jars": {}}
+    path = os.path.join(save_dir, MANIFEST_FILE)
+    if not os.path.isfile(path):
+        return empty
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except ValueError:
+        return empty
+    return manifest if manifest.get("format") == MANIFEST_FORMAT else empty
+
+
+def write_manifest(save_dir: str, options: dict, jars: Dict[str, Dict[str, int]]) -> None:
+    """
+    Writes the manifest of a run.
+
+    Args:
+        save_dir: The output directory of the run.
+        options: The options of the run, from `run_options`.
+        jars: The CRC signature of every selected top-level class, per absolute jar path.
+    """
+    os.makedirs(save_dir, exist_ok=True)
+    with open(os.path.join(save_dir, MANIFEST_FILE), "w") as f:
+        json.dump({"format": MANIFEST_FORMAT, "options": options, "jars": jars}, f, indent=1, sort_keys=True)
+
+
+def scan_jar(jar: str, file_tree: tree.Tree) -> Tuple[Dict[str, int], Dict[str, List[str]]]:
+    """
+    Computes the CRC signature of every top-level class in a jar's filtered file tree.
+
+    A class's signature combines the CRC-32 of its own class file and those of its nested
+    classes, all read from the jar's central directory, so it changes whenever any of the
+    entries its stub is generated from does.
+
+    Args:
+        jar: The jar.
+        file_tree: The filtered file tree of the jar.
+
+    Returns:
+        The signature of each top-level class, keyed by its path without extension, and the
+        class entries of every top-level class in the jar.
+    """
+    crcs = jar_entry_crcs(jar)
+    class_entries = generator.group_class_entries(crcs)
+
+    signatures = {}
+    for path, file in tree.iter_tree_files(file_tree):
+        key = "/".join(path + [file])
+        entries = sorted(class_entries[key])
+        signatures[key] = zlib.crc32(";".join(f"{e}:{crcs[e]:08x}" for e in entries).encode("utf-8"))
+    return signatures, class_entries
+
+
+def stub_name(key: str) -> str:
+    """Gets the name of the stub file generated for a top-level class, `Foo.py` for `com/a/Foo`."""
+    return key.rpartition("/")[2] + ".py"
+
+
+def merge_signatures(jars: Dict[str, Dict[str, int]]) -> Dict[str, int]:
+    """
+    Merges the signatures of several jars.
+
+    Classes are matched by their path alone, so that a patch release shipped under a new
+    jar name is still compared against the stubs generated from the previous release.
+
+    Args:
+        jars: The signatures of every top-level class, per jar.
+
+    Returns:
+        The signatures of every top-level class, later jars taking precedence as in `java_data`.
+    """
+    merged = {}
+    for signatures in jars.values():
+        merged.update(signatures)
+    return merged
+
+
+def changed_classes(save_dir: str, signatures: Dict[str, int], previous: Dict[str, int]) -> List[str]:
+    """
+    Finds the top-level classes of a jar that need their stubs regenerated.
+
+    Args:
+        save_dir: The output directory.
+        signatures: The current signature of every selected top-level class.
+        previous: The signatures recorded by the previous run, merged across jars.
+
+    Returns:
+        The classes that are new, changed, or whose stub file has gone missing.
+    """
+    return [
+        key for key, signature in signatures.items()
+        if previous.get(key) != signature or not os.path.exists(os.path.join(save_dir, stub_name(key)))
+    ]
+
+
+def restrict_tree(keys: Iterable[str]) -> Tuple[int, tree.Tree]:
+    """
+    Builds a file tree of only the given top-level classes.
+
+    Args:
+        keys: The top-level classes, as paths without extension.
+
+    Returns:
+        The number of classes and the file tree.
+    """
+    return tree.build_class_file_tree(key + ".class" for key in keys)
+
+
+def seed_symbols(class_entries: Dict[str, List[str]], keys: Iterable[str]) -> None:
+    """
+    Adds the classes of unchanged stubs to `generator.symbol_summary`.
+
+    Regenerated files can then still resolve references to classes that were not
+    collected again, as if their stubs had just been emitted.
+
+    Args:
+        class_entries: The class entries of every top-level class in the jar.
+        keys: The unchanged top-level classes.
+    """
+    for key in keys:
+        file_key = key.replace("/", ".")
+        for entry in class_entries[key]:
+            generator.symbol_summary[entry[:-6].replace("/", ".")] = file_key
+
+
+def remove_stale_stubs(save_dir: str, previous: Dict[str, int], current: Dict[str, int]) -> int:
+    """
+    Deletes the stubs of classes that were generated by the previous run but are no longer selected.
+
+    Stub files still generated for another class of the same name are kept.
+
+    Args:
+        save_dir: The output directory.
+        previous: The signatures recorded by the previous run, merged across jars.
+        current: The signatures of this run, merged across jars.
+
+    Returns:
+        The number of stub files deleted.
+    """
+    live: Set[str] = {stub_name(key) for key in current}
+
+    removed = 0
+    for key in previous.keys() - current.keys():
+        name = stub_name(key)
+        path = os.path.join(save_dir, name)
+        if name not in live and os.path.exists(path):
+            os.remove(path)
+            live.add(name)
+            removed += 1
+    return removed
+
+
+def input_state(paths: Iterable[str]) -> List[Tuple[int, int]]:
+    """Gets the modification time and size of every input, or (0, 0) for missing inputs."""
+    state = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            state.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            state.append((0, 0))
+    return state
+
+
+def wait_for_change(paths: List[str], interval: float) -> None:
+    """
+    Blocks until any of the given files changes.
+
+    A change is only reported once the files have stopped changing for a full interval, so
+    that a jar is not read while it is still being written.
+
+    Args:
+        paths: The files to watch.
+        interval: The polling interval, in seconds.
+    """
+    state = input_state(paths)
+    while True:
+        time.sleep(interval)
+        current = input_state(paths)
+        if current == state:
+            continue
+
+        while True:
+            time.sleep(interval)
+            settled = input_state(paths)
+            if settled == current:
+                return
+            current = settled
@@ -1,3 +1,11 @@
+from utils.utils import intern_strings
+
+
 class JashAnnotation:
+    __slots__ = ("annotations",)
+
     def __init__(self, _annotations: list[str]):
-        self.annotations = _annotations
+        self.annotations = intern_strings(_annotations)
+
+    def __str__(self):
+        return '\n'.join(f"# @{a}" for a in self.annotations)
@@ -1,63 +1,158 @@
 from __future__ import annotations
 
-import textwrap
+import io
+import sys
+from collections import Counter
+from typing import Callable, Iterator, TextIO
 
 from java_model.jash_annotation import JashAnnotation
 from java_model.jash_method import JashMethod
 from java_model.jash_type import JashType
+from java_model.jash_type_parameter import JashTypeParameter
 from java_model.jash_variable import JashVariable
-from utils.utils import default
+from utils.utils import default, format_docstring, intern_strings, write_docstring
+
+OBJECT_TYPES = {"Object", "java.lang.Object"}
 
 
 class JashClass:
+    __slots__ = ("name", "type_parameters", "modifiers", "implements", "extends", "documentation", "body",
+                 "annotations", "package", "imports")
+
     def __init__(
             self,
             name: str = "",
             _annotations: list[JashAnnotation] = None,
-            body: list[JashMethod | JashVariable] = None,
+            body: list[JashMethod | JashVariable | JashClass] = None,
             documentation: str = None,
             extends: JashType = None,
-            implements: JashType = None,
+            implements: list[JashType] = None,
             modifiers: list[str] = None,
-            type_parameters: list[JashType] = None
+            type_parameters: list[JashTypeParameter] = None,
+            package: str = None,
+            imports: list[str] = None
     ):
         """
         Creates a new JashClass instance
 
         Args:
             _annotations: All class annotations.
-            body: All definitions and declarations within the class.
+            body: All definitions and declarations within the class, including nested classes.
             documentation: Any documentation comments on the class.
-            extends: All types the class extends.
+            extends: The superclass of the class.
+            implements: All interfaces the class implements, or an interface extends.
+            modifiers: All class modifiers.
+            type_parameters: All generic type variables declared by the class.
+            package: The package the class is declared in.
+            imports: The import declarations of the file declaring the class, with on-demand
+                imports ending in `.*`.
         """
-        self.name = default(name, "")
-        self.type_parameters = default(type_parameters, [])
-        self.modifiers = default(modifiers, [])
-        self.implements = implements
+        self.name = sys.intern(default(name, ""))
+        self.type_parameters = tuple(default(type_parameters, ()))
+        self.modifiers = intern_strings(modifiers)
+        self.implements = tuple(default(implements, ()))
         self.extends = extends
         self.documentation = default(documentation, "", True)
         self.body = default(body, [])
-        self.annotations = default(_annotations, [])
+        self.annotations = tuple(default(_annotations, ()))
+        self.package = sys.intern(default(package, ""))
+        # Every file has its own imports, so they are not shared through `intern_strings`, which would keep them alive
+        self.imports = tuple(sys.intern(i) for i in default(imports, ()))
 
-    def __str__(self):
-        annotation_str = '\n'.join(str(a) for a in self.annotations).strip()
-        body_decls = '\n\n'.join(textwrap.indent(str(b), "    ") for b in self.body).strip()
-        doc = textwrap.indent(self.documentation.strip(), "    ") if self.documentation else ""
+    @property
+    def fqn(self) -> str:
+        """The fully qualified name of the class."""
+        return f"{self.package}.{self.name}" if self.package else self.name
+
+    def iter_types(self) -> Iterator[JashType]:
+        """
+        Iterates over every type referenced by the class and its members.
+
+        Yields:
+            Each referenced type, including nested type arguments and nested class members.
+        """
+        if self.extends is not None:
+            yield from self.extends.iter_types()
+        for interface in self.implements:
+            yield from interface.iter_types()
+        for type_parameter in self.type_parameters:
+            yield from type_parameter.iter_types()
+        for member in self.body:
+            yield from member.iter_types()
+
+    def map_types(self, function: Callable[[JashType], JashType]) -> None:
+        """
+        Replaces every type referenced by the class and its members with the result of a function.
+
+        Args:
+            function: The function mapping each type to its replacement.
+        """
+        if self.extends is not None:
+            self.extends = function(self.extends)
+        self.implements = tuple(function(i) for i in self.implements)
+        for type_parameter in self.type_parameters:
+            type_parameter.map_types(function)
+        for member in self.body:
+            member.map_types(function)
+
+    def iter_type_parameters(self) -> Iterator[JashTypeParameter]:
+        """
+        Iterates over every type parameter declared by the class, its methods and nested classes.
 
-        lines = []
+        Yields:
+            Each declared type parameter.
+        """
+        yield from self.type_parameters
+        for member in self.body:
+            if isinstance(member, JashMethod):
+                yield from member.type_parameters
+            elif isinstance(member, JashClass):
+                yield from member.iter_type_parameters()
 
-        if annotation_str:
-            lines.append(annotation_str)
+    def write(self, out: TextIO, indent: str = "") -> None:
+        """
+        Writes the class as a python class stub, without surrounding blank lines.
 
-        class_def = f"class {self.name}: "
-        lines.append(class_def)
+        Members are written straight into the stream at their nesting depth, so that a
+        class is rendered in a single pass however deeply its classes are nested.
 
+        Args:
+            out: The stream to write to.
+            indent: The indentation of the class statement.
+        """
+        for annotation in self.annotations:
+            out.write(f"{indent}{annotation}\n")
+
+        bases = []
+        if self.extends is not None and self.extends.full_name not in OBJECT_TYPES:
+            bases.append(str(self.extends))
+        bases.extend(str(i) for i in self.implements)
+        if self.type_parameters:
+            bases.append(f"Generic[{', '.join(str(t) for t in self.type_parameters)}]")
+        out.write(f"{indent}class {self.name}({', '.join(bases)}):" if bases else f"{indent}class {self.name}:")
+
+        member_indent = indent + "    "
+        doc = format_docstring(self.documentation)
         if doc:
-            lines.append(doc)
+            out.write("\n")
+            write_docstring(out, doc, member_indent)
 
-        if body_decls:
-            lines.append(body_decls)
-        else:
-            lines.append("    pass")
+        overloaded = Counter(m.name for m in self.body if isinstance(m, JashMethod))
+        separator = "\n"
+        for member in self.body:
+            out.write(separator)
+            separator = "\n\n"
+            if isinstance(member, JashMethod):
+                member.write(out, member_indent, overloaded[member.name] > 1)
+            else:
+                member.write(out, member_indent)
 
-        return '\n\n' + '\n'.join(lines) + '\n'
+        if not self.body and not doc:
+            out.write(f"\n{member_indent}pass")
+
+    def __str__(self):
+        out = io.StringIO()
+        out.write("\n\n")
+        self.write(out)
+        out.write("\n")
+        return out.getvalue()
@@ -1,2 +1,144 @@
+from __future__ import annotations
+
+import io
+import sys
+from typing import Callable, Iterator, TextIO
+
+from java_model.jash_annotation import JashAnnotation
+from java_model.jash_type import JashType
+from java_model.jash_type_parameter import JashTypeParameter
+from java_model.jash_variable import JashVariable, python_identifier
+from utils.utils import default, format_docstring, intern_strings, write_docstring
+
+CONSTRUCTOR_NAME = "__init__"
+
+
 class JashMethod:
-    pass
+    __slots__ = ("name", "return_type", "parameters", "throws", "modifiers", "type_parameters", "annotations",
+                 "documentation", "varargs")
+
+    def __init__(
+            self,
+            name: str = "",
+            return_type: JashType = None,
+            parameters: list[JashVariable] = None,
+            throws: list[JashType] = None,
+            modifiers: list[str] = None,
+            type_parameters: list[JashTypeParameter] = None,
+            _annotations: list[JashAnnotation] = None,
+            documentation: str = None,
+            varargs: bool = False
+    ):
+        """
+        Creates a new JashMethod instance.
+
+        Args:
+            name: The name of the method, or `__init__` for constructors.
+            return_type: The return type of the method, None for constructors and void methods.
+            parameters: All method parameters.
+            throws: All exception types declared by the method.
+            modifiers: All method modifiers.
+            type_parameters: All generic type variables declared by the method.
+            _annotations: All method annotations.
+            documentation: Any documentation comments on the method.
+            varargs: Whether the last parameter is a varargs parameter.
+        """
+        self.name = sys.intern(default(name, ""))
+        self.return_type = return_type
+        self.parameters = tuple(default(parameters, ()))
+        self.throws = tuple(default(throws, ()))
+        self.modifiers = intern_strings(modifiers)
+        self.type_parameters = tuple(default(type_parameters, ()))
+        self.annotations = tuple(default(_annotations, ()))
+        self.documentation = default(documentation, "", True)
+        self.varargs = varargs
+
+    @property
+    def is_constructor(self) -> bool:
+        """Whether the method is a constructor."""
+        return self.name == CONSTRUCTOR_NAME
+
+    def iter_types(self) -> Iterator[JashType]:
+        """
+        Iterates over every type referenced by the method signature.
+
+        Yields:
+            The return, parameter, exception and type parameter bound types of the method.
+        """
+        if self.return_type is not None:
+            yield from self.return_type.iter_types()
+        for parameter in self.parameters:
+            yield from parameter.iter_types()
+        for exception in self.throws:
+            yield from exception.iter_types()
+        for type_parameter in self.type_parameters:
+            yield from type_parameter.iter_types()
+
+    def map_types(self, function: Callable[[JashType], JashType]) -> None:
+        """
+        Replaces every type referenced by the method signature with the result of a function.
+
+        Args:
+            function: The function mapping each type to its replacement.
+        """
+        if self.return_type is not None:
+            self.return_type = function(self.return_type)
+        for parameter in self.parameters:
+            parameter.map_types(function)
+        self.throws = tuple(function(t) for t in self.throws)
+        for type_parameter in self.type_parameters:
+            type_parameter.map_types(function)
+
+    def write(self, out: TextIO, indent: str = "", overload: bool = False) -> None:
+        """
+        Writes the method as a python function stub, without a trailing newline.
+
+        Args:
+            out: The stream to write to.
+            indent: The indentation of the stub.
+            overload: Whether the method shares its name with another method in its class.
+        """
+        for annotation in self.annotations:
+            out.write(f"{indent}{annotation}\n")
+        if overload:
+            out.write(f"{indent}@overload\n")
+
+        static = "static" in self.modifiers and not self.is_constructor
+        if static:
+            out.write(f"{indent}@staticmethod\n")
+
+        parameters = [] if static else ["self"]
+        for i, parameter in enumerate(self.parameters):
+            parameters.append(parameter.as_parameter(self.varargs and i == len(self.parameters) - 1))
+
+        return_type = "None" if self.return_type is None else str(self.return_type)
+        signature = f"def {python_identifier(self.name)}({', '.join(parameters)}) -> {return_type}:"
+
+        doc = format_docstring(self.documentation)
+        if self.throws:
+            raises = '\n'.join(f"    {t.split_name()[1]}" for t in self.throws)
+            doc = f"{doc}\n\nRaises:\n{raises}".strip()
+
+        if doc:
+            out.write(f"{indent}{signature}\n")
+            write_docstring(out, doc, indent + "    ")
+            out.write(f"\n{indent}    ...")
+        else:
+            out.write(f"{indent}{signature} ...")
+
+    def render(self, overload: bool = False) -> str:
+        """
+        Renders the method as a python function stub.
+
+        Args:
+            overload: Whether the method shares its name with another method in its class.
+
+        Returns:
+            The function stub.
+        """
+        out = io.StringIO()
+        self.write(out, overload=overload)
+        return out.getvalue()
+
+    def __str__(self):
+        return self.render()
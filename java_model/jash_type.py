@@ -1,20 +1,210 @@
-from java_model.jash_type_parameter import JashTypeParameter
+from __future__ import annotations
+
+import sys
+import weakref
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
 from utils.utils import default
 
+PRIMITIVE_TYPES = {
+    "boolean": "bool",
+    "byte": "int",
+    "short": "int",
+    "int": "int",
+    "long": "int",
+    "char": "str",
+    "float": "float",
+    "double": "float",
+    "void": "None",
+    "String": "str",
+    "java.lang.String": "str",
+}
+
+WILDCARD = "?"
+
 
 class JashType:
-    def __init__(
-            self,
+    """
+    A reference to a Java type.
+
+    Types are flyweights: constructing a type equal to an existing one returns the existing
+    instance, so every reference to e.g. `java.lang.String` across all classes shares one
+    object. Instances are therefore immutable, use `with_dimensions` to derive array types.
+
+    The registry only holds types weakly, so that types no longer referenced by any class,
+    e.g. once a batch is released or a served package evicted, are freed with their classes.
+    """
+
+    __slots__ = ("name", "sub_type", "implements", "modifiers", "dimensions", "parameters", "__weakref__")
+
+    # (name, sub_type, implements, modifiers, dimension count, parameters) -> shared instance
+    _registry: "weakref.WeakValueDictionary[tuple, JashType]" = weakref.WeakValueDictionary()
+
+    def __new__(
+            cls,
             name: str = None,
             sub_type: "JashType" = None,
             implements: "JashType" = None,
-            modifiers: list[str] = None,
-            dimensions: list[int] = None,
-            parameters: list[JashTypeParameter] = None
+            modifiers: Iterable[str] = None,
+            dimensions: Iterable[Any] = None,
+            parameters: Iterable["JashType"] = None
     ):
-        self.parameters = default(parameters, [])
-        self.dimensions = default(dimensions, [])
-        self.modifiers = default(modifiers, [])
-        self.implements = implements
-        self.sub_type = sub_type
-        self.name = default(name, "")
+        """
+        Gets the JashType instance for a reference to a Java type, creating it if needed.
+
+        Names are either simple or dotted source names (`List`, `Map.Entry`) or binary names
+        (`java.util.Map$Entry`), depending on where the type was read from.
+
+        Args:
+            name: The name of the type.
+            sub_type: The type of a member class selected from this type.
+            implements: The bound of a wildcard type.
+            modifiers: Any modifiers on the type.
+            dimensions: One entry per array dimension of the type.
+            parameters: The type arguments of the type.
+        """
+        name = sys.intern(default(name, ""))
+        modifiers = tuple(sys.intern(m) for m in modifiers or ())
+        dimensions = (None,) * len(tuple(dimensions or ()))
+        parameters = tuple(parameters or ())
+
+        key = (name, sub_type, implements, modifiers, len(dimensions), parameters)
+        instance = cls._registry.get(key)
+        if instance is None:
+            instance = object.__new__(cls)
+            for slot, value in zip(cls.__slots__, (name, sub_type, implements, modifiers, dimensions, parameters)):
+                object.__setattr__(instance, slot, value)
+            cls._registry[key] = instance
+        return instance
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        raise AttributeError("JashType instances are shared and cannot be modified.")
+
+    def __reduce__(self):
+        # Unpickled types, e.g. from parse workers, are re-interned into this process's registry
+        return JashType, (self.name, self.sub_type, self.implements, self.modifiers, self.dimensions, self.parameters)
+
+    def with_dimensions(self, dimensions: int) -> JashType:
+        """
+        Gets the array type with additional dimensions over this type.
+
+        Args:
+            dimensions: The number of dimensions to add, or to remove if negative.
+
+        Returns:
+            The array type.
+        """
+        count = max(len(self.dimensions) + dimensions, 0)
+        return JashType(self.name, self.sub_type, self.implements, self.modifiers, (None,) * count, self.parameters)
+
+    def qualify(self, names: Dict[str, str], head: bool = True) -> JashType:
+        """
+        Gets this type with resolved simple names replaced by their fully qualified names.
+
+        Only the outermost name of a member type chain is replaced, as the names selected
+        from it are members of the resolved class. Type arguments and wildcard bounds are
+        qualified recursively.
+
+        Args:
+            names: A mapping of simple name to fully qualified name.
+            head: Whether this type is the outermost name of a member type chain.
+
+        Returns:
+            The qualified type, which is this type if nothing was replaced.
+        """
+        return JashType(
+            names.get(self.name, self.name) if head else self.name,
+            self.sub_type.qualify(names, False) if self.sub_type is not None else None,
+            self.implements.qualify(names) if self.implements is not None else None,
+            self.modifiers,
+            self.dimensions,
+            [p.qualify(names) for p in self.parameters]
+        )
+
+    @property
+    def full_name(self) -> str:
+        """The dotted name of the type, including any selected member types."""
+        if self.sub_type is not None:
+            return f"{self.name}.{self.sub_type.full_name}"
+        return self.name
+
+    @property
+    def arguments(self) -> list[JashType]:
+        """The type arguments of the innermost parameterised type in the member type chain."""
+        arguments = self.parameters
+        sub_type = self.sub_type
+        while sub_type is not None:
+            arguments = sub_type.parameters or arguments
+            sub_type = sub_type.sub_type
+        return arguments
+
+    def split_name(self) -> Tuple[str, str]:
+        """
+        Splits the type name into its package and its (possibly nested) class name.
+
+        Binary names are split on the `$` separator, other names at the first capitalised
+        segment, following Java naming conventions.
+
+        Returns:
+            The package, which may be empty, and the dotted class name.
+        """
+        name = self.full_name
+        if "$" in name:
+            outer, inner = name.split("$", 1)
+            package, _, top = outer.rpartition(".")
+            return package, ".".join([top] + inner.split("$"))
+
+        parts = name.split(".")
+        for i, part in enumerate(parts):
+            if part[:1].isupper():
+                return ".".join(parts[:i]), ".".join(parts[i:])
+        return ".".join(parts[:-1]), parts[-1]
+
+    def import_path(self) -> Optional[Tuple[str, str]]:
+        """
+        Gets the import needed to reference the type from another module.
+
+        Returns:
+            The package and top-level class to import, or None if no import is needed.
+        """
+        if self.is_primitive() or self.name == WILDCARD:
+            return None
+        package, class_name = self.split_name()
+        if not package:
+            return None
+        return package, class_name.split(".")[0]
+
+    def is_primitive(self) -> bool:
+        """Whether the type maps onto a python builtin."""
+        return self.sub_type is None and self.name in PRIMITIVE_TYPES
+
+    def iter_types(self) -> Iterator[JashType]:
+        """
+        Iterates over this type and every type nested within it.
+
+        Yields:
+            This type, followed by its type arguments and wildcard bounds.
+        """
+        yield self
+        sub_type = self
+        while sub_type is not None:
+            for parameter in sub_type.parameters:
+                yield from parameter.iter_types()
+            sub_type = sub_type.sub_type
+        if self.implements is not None:
+            yield from self.implements.iter_types()
+
+    def __str__(self):
+        if self.name == WILDCARD:
+            python_type = str(self.implements) if self.implements is not None else "Any"
+        elif self.is_primitive():
+            python_type = PRIMITIVE_TYPES[self.name]
+        else:
+            python_type = self.split_name()[1]
+            arguments = self.arguments
+            if arguments:
+                python_type += f"[{', '.join(str(a) for a in arguments)}]"
+
+        for _ in self.dimensions:
+            python_type = f"list[{python_type}]"
+        return python_type
@@ -1,2 +1,50 @@
+from __future__ import annotations
+
+import sys
+from typing import TYPE_CHECKING, Callable, Iterator
+
+from utils.utils import default
+
+if TYPE_CHECKING:
+    from java_model.jash_type import JashType
+
+
 class JashTypeParameter:
-    pass
\ No newline at end of file
+    __slots__ = ("name", "extends")
+
+    def __init__(
+            self,
+            name: str = None,
+            extends: list[JashType] = None
+    ):
+        """
+        Creates a new JashTypeParameter instance, a generic type variable declaration.
+
+        Args:
+            name: The name of the type variable.
+            extends: The bounds of the type variable.
+        """
+        self.name = sys.intern(default(name, ""))
+        self.extends = tuple(default(extends, ()))
+
+    def iter_types(self) -> Iterator[JashType]:
+        """
+        Iterates over every type referenced by the type parameter's bounds.
+
+        Yields:
+            Each referenced type, including nested type arguments.
+        """
+        for bound in self.extends:
+            yield from bound.iter_types()
+
+    def map_types(self, function: Callable[[JashType], JashType]) -> None:
+        """
+        Replaces every bound of the type parameter with the result of a function.
+
+        Args:
+            function: The function mapping each bound to its replacement.
+        """
+        self.extends = tuple(function(bound) for bound in self.extends)
+
+    def __str__(self):
+        return self.name
@@ -1,8 +1,31 @@
+from __future__ import annotations
+
+import io
+import keyword
+import sys
+from typing import Callable, Iterator, TextIO
+
 from java_model.jash_annotation import JashAnnotation
 from java_model.jash_type import JashType
+from utils.utils import intern_strings
+
+
+def python_identifier(name: str) -> str:
+    """
+    Makes a Java identifier safe to use as a python identifier.
+
+    Args:
+        name: The Java identifier.
+
+    Returns:
+        The identifier, suffixed with an underscore if it is a python keyword.
+    """
+    return name + "_" if keyword.iskeyword(name) else name
 
 
 class JashVariable:
+    __slots__ = ("name", "type", "initializer", "modifiers", "annotations", "documentation")
+
     def __init__(
         self,
         name: str,
@@ -12,9 +35,60 @@ class JashVariable:
         annotations: list['JashAnnotation'] = None,
         documentation: str = None
     ):
-        self.name = name
+        self.name = sys.intern(name)
         self.type = type
         self.initializer = initializer
-        self.modifiers = modifiers or []
-        self.annotations = annotations or []
+        self.modifiers = intern_strings(modifiers)
+        self.annotations = tuple(annotations or ())
         self.documentation = documentation
+
+    def iter_types(self) -> Iterator[JashType]:
+        """
+        Iterates over every type referenced by the variable.
+
+        Yields:
+            The variable's type and every type nested within it.
+        """
+        yield from self.type.iter_types()
+
+    def map_types(self, function: Callable[[JashType], JashType]) -> None:
+        """
+        Replaces the variable's type with the result of a function.
+
+        Args:
+            function: The function mapping the type to its replacement.
+        """
+        self.type = function(self.type)
+
+    def as_parameter(self, varargs: bool = False) -> str:
+        """
+        Renders the variable as a python function parameter.
+
+        Args:
+            varargs: Whether the variable is a Java varargs parameter.
+
+        Returns:
+            The parameter declaration.
+        """
+        if varargs and self.type.dimensions:
+            element = self.type.with_dimensions(-1)
+            return f"*{python_identifier(self.name)}: {element}"
+        return f"{python_identifier(self.name)}: {self.type}"
+
+    def write(self, out: TextIO, indent: str = "") -> None:
+        """
+        Writes the variable as a python attribute declaration, without a trailing newline.
+
+        Args:
+            out: The stream to write to.
+            indent: The indentation of every line.
+        """
+        for annotation in self.annotations:
+            out.write(f"{indent}{annotation}\n")
+        type_str = f"ClassVar[{self.type}]" if "static" in self.modifiers else str(self.type)
+        out.write(f"{indent}{python_identifier(self.name)}: {type_str}")
+
+    def __str__(self):
+        out = io.StringIO()
+        self.write(out)
+        return out.getvalue()
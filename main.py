@@ -1,12 +1,29 @@
 import argparse
+import asyncio
+import contextlib
+import io
 import os
 import tempfile
 import shutil
-
-from utils.utils import generator
-from utils import progress_counter, tree, fio
+import sys
+import time
+import zipfile
+
+import chunked
+import closure
+import dedup
+import estimator
+import generator
+import incremental
+import model_index
+import serve
+import stdlib
+from utils import progress_counter, profiling, stub_output, tree, fio
+from utils.cache import DecompileCache, DEFAULT_CACHE_SIZE, default_cache_dir, selection_variant
 from utils.fio import check_file_access
-from utils.utils import collect_java_data, propagate_java_data
+from utils.zip_directory import ZipDirectory
+from generator import (collect_class_data, collect_java_data, collect_java_data_parallel, collect_java_sources,
+                       iter_java_sources, propagate_java_data)
 
 """
 Jython Advanced Syntax Highlighter (JASH)
@@ -16,17 +33,571 @@ enable accurate syntax highlighting and autocompletion.
 """
 
 
-if __name__ == "__main__":
-    arg_parser = argparse.ArgumentParser(description="Jython Advanced Syntax Highlighter (JASH)")
-    arg_parser.add_argument("-i", "--input", nargs="+", help="The jar file to generate stubs for.")
+def read_filter_paths(args: argparse.Namespace) -> tuple[tree.PatternTrie | None, tree.PatternTrie | None, str]:
+    """
+    Reads and compiles the include or exclude patterns given on the command line or in a paths file.
+
+    Args:
+        args: The parsed command line arguments.
+
+    Returns:
+        The include patterns, the exclude patterns and a description of where they came from.
+    """
+    def read_paths_file(paths_file: str, kind: str) -> list[str]:
+        check_file_access(paths_file)
+        print(f"Parsing {kind} paths from {paths_file}...")
+        with open(paths_file, "r") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    if args.include:
+        return tree.PatternTrie(read_paths_file(args.include, "include")), None, f" from {args.include}"
+    elif args.include_list:
+        return tree.PatternTrie(args.include_list), None, ""
+    elif args.exclude:
+        return None, tree.PatternTrie(read_paths_file(args.exclude, "exclude")), f" from {args.exclude}"
+    elif args.exclude_list:
+        return None, tree.PatternTrie(args.exclude_list), ""
+    return None, None, ""
+
+
+def apply_filters(
+        file_tree: tree.Tree,
+        jar: str,
+        includes: tree.PatternTrie | None,
+        excludes: tree.PatternTrie | None,
+        source: str,
+        strict: bool = True
+) -> set[str]:
+    """
+    Applies include and exclude patterns to a jar's file tree in place.
+
+    Args:
+        file_tree: The file tree of the jar.
+        jar: The jar the tree was built from.
+        includes: The patterns to keep, if any.
+        excludes: The patterns to remove, if any.
+        source: A description of where the patterns came from.
+        strict: Whether every pattern must match a path in this jar, rather than in any of the input jars.
+
+    Returns:
+        The patterns that matched a path in the tree.
+
+    Raises:
+        Exception: If strict and a pattern does not match any path in the tree.
+    """
+    if includes is None and excludes is None:
+        return set()
+
+    matched = tree.filter_tree(file_tree, includes, excludes)
+
+    for kind, patterns in (("include", includes), ("exclude", excludes)):
+        if patterns is None:
+            continue
+
+        for pattern in patterns.patterns:
+            if strict and pattern not in matched:
+                raise Exception(f"The {kind} path '{pattern}' does not exist in {jar}.")
+
+        pattern_num = len(patterns.patterns)
+        print(f"Applied {pattern_num} {kind} path{'s' if pattern_num != 1 else ''}{source}.")
+
+    return matched
+
+
+class JarJob:
+    def __init__(self, jar: str, workspace: str, file_tree: tree.Tree, file_count: int, filtered: bool):
+        """
+        Creates a new JarJob instance, the state of a single input jar as it moves through the pipeline.
+
+        Args:
+            jar: The path of the jar.
+            workspace: The temp directory owned exclusively by this jar.
+            file_tree: The filtered file tree of the jar.
+            file_count: The number of files in the filtered tree.
+            filtered: Whether filtering removed any files from the tree.
+        """
+        self.jar = jar
+        # How the job is referred to in progress messages
+        self.label = jar
+        self.workspace = workspace
+        self.file_tree = file_tree
+        self.file_count = file_count
+        self.filtered = filtered
+        self.source_dir = None
+        self.sources_jar = None
+        # The CRC signature of every top-level class in the filtered tree, recorded in the output manifest
+        self.signatures = {}
+        # The class entries of every top-level class in the jar, grouped by `generator.group_class_entries`
+        self.class_entries = {}
+        # The jar, kept open while it is processed in batches
+        self.archive: ZipDirectory | None = None
+        # The include and exclude patterns that matched a path of the jar
+        self.matched_patterns = set()
+
+
+def prepare_jar(
+        jar: str,
+        index: int,
+        temp_dir: str,
+        includes: tree.PatternTrie | None,
+        excludes: tree.PatternTrie | None,
+        filter_source: str,
+        strict: bool = True
+) -> JarJob:
+    """
+    Checks a jar, builds its filtered file tree and creates its workspace.
+
+    Args:
+        jar: The path of the jar.
+        index: The position of the jar on the command line, keeping workspaces unique.
+        temp_dir: The root temp directory.
+        includes: The patterns to keep, if any.
+        excludes: The patterns to remove, if any.
+        filter_source: A description of where the patterns came from.
+        strict: Whether every pattern must match a path in this jar, rather than in any of the input jars.
+
+    Returns:
+        The job for the jar.
+    """
+    fio.check_file_access(jar)
+    if os.path.splitext(jar)[1].lower() != ".jar":
+        raise Exception(f"The file '{jar}' is not a jar file.")
+
+    # The tree is built from the jar's central directory, so that filtered out classes are never decompiled
+    file_count, file_tree = tree.build_jar_file_tree(jar)
+    print(f"Found {file_count} compatible files in {jar}.")
+
+    # Mutually include or exclude files from the tree
+    matched = apply_filters(file_tree, jar, includes, excludes, filter_source, strict)
+
+    t_len = tree.tree_len(file_tree)
+    print(f"Total of {t_len} file{'s' if t_len != 1 else ''} from {jar} after filtering.\n")
+
+    workspace = os.path.join(temp_dir, f"{index}-{os.path.splitext(os.path.basename(jar))[0]}")
+    os.makedirs(workspace)
+    job = JarJob(jar, workspace, file_tree, t_len, t_len != file_count)
+    job.matched_patterns = matched
+    return job
+
+
+def decompile_job(job: JarJob, args: argparse.Namespace, cache: DecompileCache | None) -> None:
+    """
+    Decompiles the filtered classes of a jar into its workspace, the cache or memory.
+
+    Args:
+        job: The job of the jar to decompile.
+        args: The parsed command line arguments.
+        cache: The decompile cache, if enabled.
+    """
+    selected_entries = [
+        entry
+        for path, file in tree.iter_tree_files(job.file_tree)
+        for entry in job.class_entries["/".join(path + [file])]
+    ]
+
+    variant = selection_variant(selected_entries) if job.filtered else ""
+
+    def decompile(out_dir: str | None) -> bytes | None:
+        # Split the surviving classes across several jd-cli processes
+        if args.decompile_workers > 1:
+            return fio.decompile_jar_sharded(job.jar, selected_entries, job.workspace, args.decompile_workers, out_dir, job.archive)
+
+        # Only hand jd-cli the surviving classes when filtering removed anything
+        decompile_target = job.jar
+        if job.filtered:
+            decompile_target = os.path.join(job.workspace, os.path.basename(job.jar))
+            fio.write_sub_jar(job.jar, selected_entries, decompile_target, job.archive)
+
+        if out_dir is None:
+            return fio.decompile_jar_to_memory(decompile_target)
+        fio.decompile_jar(decompile_target, out_dir)
+        return None
+
+    print(f"Decompiling {job.label}...")
+    with profiling.phase("decompile", job.jar):
+        if args.stream:
+            job.sources_jar = zipfile.ZipFile(io.BytesIO(decompile(None)))
+        elif cache is not None:
+            job.source_dir = cache.fetch(job.jar, decompile, variant)
+        else:
+            job.source_dir = os.path.join(job.workspace, "src")
+            decompile(job.source_dir)
+
+
+def collect_job(job: JarJob, args: argparse.Namespace) -> None:
+    """
+    Collects the java data of every file in a jar's filtered tree.
+
+    Args:
+        job: The job of the jar to collect, already decompiled unless reading bytecode.
+        args: The parsed command line arguments.
+    """
+    print(f"Collecting initial java data from {job.label}...")
+    counter = progress_counter.ProgressCounter(job.file_count, f"Collecting {os.path.basename(job.jar)}")
+    with profiling.phase("collect", job.jar, cprofile=True):
+        if args.bytecode:
+            with contextlib.nullcontext(job.archive) if job.archive is not None else ZipDirectory(job.jar) as jar_file:
+                for path, file in tree.iter_tree_files(job.file_tree):
+                    collect_class_data(jar_file, file, job.class_entries["/".join(path + [file])])
+                    counter.increment()
+        elif args.stream:
+            with job.sources_jar:
+                collect_java_sources(iter_java_sources(job.sources_jar, tree.iter_tree_files(job.file_tree)), args.jobs, counter)
+            job.sources_jar = None
+        elif args.jobs > 1:
+            collect_java_data_parallel(tree.iter_tree_files(job.file_tree), job.source_dir, args.jobs, counter)
+        else:
+            for path, file in tree.iter_tree_files(job.file_tree):
+                collect_java_data(file, job.source_dir, path)
+                counter.increment()
+    counter.complete()
+
+
+def estimate_jars(args: argparse.Namespace) -> None:
+    """
+    Estimates the output of a run without decompiling or generating anything.
+
+    Each jar's central directory is filtered as in a real run, then a sample of the selected
+    classes is read straight from bytecode to project the stub count, size and runtime.
+
+    Args:
+        args: The parsed command line arguments.
+    """
+    start = time.perf_counter()
+    includes, excludes, filter_source = read_filter_paths(args)
+
+    total_files = 0
+    total_bytes = 0.0
+    total_seconds = 0.0
+    for jar in args.input:
+        fio.check_file_access(jar)
+        with ZipDirectory(jar) as jar_file:
+            file_count, file_tree = tree.build_class_file_tree(jar_file.namelist())
+            apply_filters(file_tree, jar, includes, excludes, filter_source)
+            estimate = estimator.estimate_jar(jar_file, file_tree)
 
-    inc_ex_group = arg_parser.add_mutually_exclusive_group()
-    inc_ex_group.add_argument("-ex", "--exclude", help="The exclude jar paths file to use during generation.")
-    inc_ex_group.add_argument("-exl", "--exclude-list", nargs="+", help="List of internal jar directories to exclude during generation")
-    inc_ex_group.add_argument("-inc", "--include", help="The include jar paths file to use during generation.")
-    inc_ex_group.add_argument("-incl", "--include-list", nargs="+", help="List of internal jar directories to include during generation")
+        runtime = estimate.runtime(args.bytecode, args.jobs, args.decompile_workers, args.parser)
+        stages = ", ".join(f"{stage} ~{seconds:.1f}s" for stage, seconds in runtime.items())
+        print(f"Estimate for {jar} (sampled {estimate.sample_count} of {estimate.file_count} files):")
+        print(f"  Files:       {estimate.file_count} of {file_count} after filtering, ~{estimate.stub_count:.0f} stubs")
+        print(f"  Class bytes: {estimator.format_size(estimate.class_bytes)}")
+        print(f"  Stub bytes:  ~{estimator.format_size(estimate.stub_bytes)}")
+        print(f"  Runtime:     ~{sum(runtime.values()):.1f}s ({stages})\n")
 
-    args = arg_parser.parse_args()
+        total_files += round(estimate.stub_count)
+        total_bytes += estimate.stub_bytes
+        total_seconds += sum(runtime.values())
+
+    if len(args.input) > 1:
+        print(f"Total: ~{total_files} stubs, ~{estimator.format_size(total_bytes)}, ~{total_seconds:.1f}s")
+    print(f"Estimated in {time.perf_counter() - start:.2f}s.")
+
+
+def serve_jars(args: argparse.Namespace) -> None:
+    """
+    Serves the stubs of every package in the input jars, generating each package when it is first requested.
+
+    Only the jars' central directories are read up front, so the server starts almost
+    immediately. Classes are read straight from bytecode when their package is requested.
+
+    Args:
+        args: The parsed command line arguments.
+    """
+    includes, excludes, filter_source = read_filter_paths(args)
+
+    jars = []
+    for jar in args.input:
+        fio.check_file_access(jar)
+        file_count, file_tree = tree.build_jar_file_tree(jar)
+        apply_filters(file_tree, jar, includes, excludes, filter_source)
+        print(f"Indexed {tree.tree_len(file_tree)} of {file_count} files in {jar}.")
+        jars.append((jar, file_tree))
+
+    index = serve.StubIndex(jars, args.serve_cache)
+    try:
+        serve.serve(index, args.host, args.port)
+    finally:
+        index.close()
+
+
+async def process_jars(jobs: list[JarJob], args: argparse.Namespace, cache: DecompileCache | None) -> None:
+    """
+    Decompiles and collects every jar, overlapping decompilation with parsing.
+
+    Up to `args.max_decompiles` jars are decompiled concurrently, each jd-cli process running
+    in its own thread. Jars are collected strictly in input order as their decompilation
+    finishes, so `java_data` is deterministic. A jar's slot is only freed once it has been
+    collected, which bounds how far decompilation can run ahead of parsing. With `--batch-size`
+    or `--max-memory`, jars are instead processed one at a time, in batches.
+
+    Args:
+        jobs: The jobs of all input jars, in input order.
+        args: The parsed command line arguments.
+        cache: The decompile cache, if enabled.
+    """
+    slots = asyncio.Semaphore(args.max_decompiles)
+
+    async def decompile(job: JarJob) -> None:
+        await slots.acquire()
+        if not args.bytecode:
+            await asyncio.to_thread(decompile_job, job, args, cache)
+
+    if args.batch_size or args.max_memory:
+        for job in jobs:
+            await process_jar_batches(job, args)
+        return
+
+    tasks = [asyncio.create_task(decompile(job)) for job in jobs]
+    try:
+        for job, task in zip(jobs, tasks):
+            await task
+            await asyncio.to_thread(collect_job, job, args)
+            slots.release()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def process_jar_batches(job: JarJob, args: argparse.Namespace) -> None:
+    """
+    Decompiles and collects a jar in batches of whole packages, keeping memory bounded.
+
+    Each batch is decompiled into its own workspace and collected with streaming emission,
+    after which its sources and parsed classes are released. The next batch is decompiled
+    while the current one is collected, unless memory is already over `--max-memory`, in
+    which case it waits until the current batch is released. Batches are never cached, as
+    their selection changes with memory use from run to run.
+
+    Args:
+        job: The job of the jar.
+        args: The parsed command line arguments.
+    """
+    max_memory = args.max_memory * 1024 * 1024 if args.max_memory else None
+    planner = chunked.BatchPlanner(job.file_tree, args.batch_size or chunked.DEFAULT_BATCH_SIZE, max_memory)
+    batches = 0
+
+    def plan() -> JarJob | None:
+        nonlocal batches
+        batch = planner.next_batch()
+        if batch is None:
+            return None
+        batches += 1
+        file_count, file_tree = batch
+        workspace = os.path.join(job.workspace, f"batch-{batches}")
+        os.makedirs(workspace)
+        batch_job = JarJob(job.jar, workspace, file_tree, file_count, True)
+        batch_job.label = f"{job.jar} (batch {batches}, {file_count} files)"
+        batch_job.class_entries = job.class_entries
+        batch_job.archive = archive
+        return batch_job
+
+    def decompile(batch_job: JarJob | None) -> asyncio.Task | None:
+        if batch_job is None or args.bytecode:
+            return None
+        return asyncio.create_task(asyncio.to_thread(decompile_job, batch_job, args, None))
+
+    # The jar is opened once, instead of once per batch
+    with ZipDirectory(job.jar) as archive:
+        batch_job = plan()
+        task = decompile(batch_job)
+        while batch_job is not None:
+            if task is not None:
+                await task
+
+            # Decompile ahead only while there is memory to spare
+            ahead = not planner.over_target()
+            next_job = plan() if ahead else None
+            next_task = decompile(next_job)
+
+            await asyncio.to_thread(collect_job, batch_job, args)
+            shutil.rmtree(batch_job.workspace, ignore_errors=True)
+            batch_job = None
+            planner.adjust()
+
+            if not ahead:
+                next_job = plan()
+                next_task = decompile(next_job)
+            batch_job, task = next_job, next_task
+
+
+def expand_closure(jobs: list[JarJob], includes: tree.PatternTrie) -> None:
+    """
+    Widens every job from its included classes to all the classes they reach, in any input jar.
+
+    Args:
+        jobs: The jobs of all input jars, their trees filtered to the include roots.
+        includes: The patterns of the include roots.
+
+    Raises:
+        Exception: If an include pattern does not match a path in any of the input jars.
+    """
+    matched = set().union(*(job.matched_patterns for job in jobs))
+    for pattern in includes.patterns:
+        if pattern not in matched:
+            raise Exception(f"The include path '{pattern}' does not exist in any input jar.")
+
+    roots = [(job.jar, ["/".join(path + [file]) for path, file in tree.iter_tree_files(job.file_tree)]) for job in jobs]
+    reachable = closure.reachable_classes(roots)
+
+    root_count = len({key for _, keys in roots for key in keys})
+    reached_count = len({key for keys, _ in reachable for key in keys})
+    print(f"The closure of {root_count} included classes reaches {reached_count} classes.")
+    for job, (keys, class_count) in zip(jobs, reachable):
+        print(f"Total of {len(keys)} of {class_count} files from {job.jar} in the closure.")
+        job.file_count, job.file_tree = incremental.restrict_tree(keys)
+        job.filtered = job.file_count < class_count
+    print()
+
+
+def deduplicate_jobs(jobs: list[JarJob], args: argparse.Namespace) -> None:
+    """
+    Narrows every job to the classes it is kept for, so that classes selected in several jars are only processed once.
+
+    Args:
+        jobs: The jobs of all input jars, with their signatures computed.
+        args: The parsed command line arguments.
+    """
+    dropped, report = dedup.plan_deduplication([(job.jar, job.signatures, job.class_entries) for job in jobs], args.duplicates)
+    if args.duplicates_report:
+        report.write(args.duplicates_report)
+    if not report.skipped:
+        return
+
+    print(report.summary() + "\n")
+    for job, keys in zip(jobs, dropped):
+        if keys:
+            job.signatures = {key: signature for key, signature in job.signatures.items() if key not in keys}
+            job.filtered = True
+            job.file_count, job.file_tree = incremental.restrict_tree(job.signatures)
+
+
+def select_changed_classes(jobs: list[JarJob], args: argparse.Namespace, previous: dict) -> list[JarJob]:
+    """
+    Compares every jar against the manifest of the previous run, narrowing each job to the classes that changed.
+
+    The classes of unchanged stubs are still added to the symbol index, so that the
+    regenerated files resolve references to them as in a full run.
+
+    Args:
+        jobs: The jobs of all input jars, with their signatures computed.
+        args: The parsed command line arguments.
+        previous: The signatures recorded by the previous run, merged across jars.
+
+    Returns:
+        The jobs of the jars with any changed classes.
+    """
+    changed_jobs = []
+    unchanged = []
+    for job in jobs:
+        keys = incremental.changed_classes(args.output, job.signatures, previous)
+        print(f"{len(keys)} of {job.file_count} files changed in {job.jar}.")
+        unchanged.append((job, job.signatures.keys() - set(keys)))
+        if keys:
+            job.filtered = job.filtered or len(keys) < job.file_count
+            job.file_count, job.file_tree = incremental.restrict_tree(keys)
+            changed_jobs.append(job)
+
+    if changed_jobs:
+        for job, keys in unchanged:
+            incremental.seed_symbols(job.class_entries, keys)
+    return changed_jobs
+
+
+def write_output_directory(args: argparse.Namespace, manifest: dict, options: dict, signatures: dict) -> None:
+    """
+    Writes the generated stubs to the output directory, along with the manifest of the run and any standard library stubs.
+
+    Args:
+        args: The parsed command line arguments.
+        manifest: The manifest of the previous run.
+        options: The options of this run, from `incremental.run_options`.
+        signatures: The signatures of every selected top-level class, per absolute jar path.
+    """
+    # Generate python stub files
+    print("Generating python files...")
+    with profiling.phase("generate", cprofile=True):
+        generator.generate_python_files(args.output, layout=args.layout, workers=args.write_workers)
+
+    # Record what was generated, and when incremental, delete the stubs of classes that no longer exist or are filtered out
+    if args.input and args.layout == "flat":
+        if args.incremental or args.watch:
+            removed = incremental.remove_stale_stubs(
+                args.output, incremental.merge_signatures(manifest["jars"]), incremental.merge_signatures(signatures)
+            )
+            if removed:
+                print(f"Removed {removed} stale stub file{'s' if removed != 1 else ''}.")
+        incremental.write_manifest(args.output, options, signatures)
+
+    if args.stdlib:
+        print(f"Unpacking JDK {args.stdlib} standard library stubs...")
+        patterns = tree.PatternTrie(args.stdlib_packages) if args.stdlib_packages else None
+        referenced = generator.referenced_packages if args.input or args.from_index else None
+        with profiling.phase("stdlib"):
+            unpacked, skipped = stdlib.install_stdlib(args.stdlib, args.output, referenced, patterns, args.stdlib_dir)
+        print(f"Unpacked {unpacked} standard library packages, {skipped} already up to date.")
+
+
+def write_output_archive(args: argparse.Namespace) -> None:
+    """
+    Writes the generated stubs, and any standard library stubs, into a single zip archive or wheel.
+
+    Args:
+        args: The parsed command line arguments.
+    """
+    print(f"Writing python packages to {args.output_archive}...")
+    with stub_output.open_archive(args.output_archive) as writer:
+        with profiling.phase("generate", cprofile=True):
+            modules = generator.write_package_modules(writer)
+
+        if args.stdlib:
+            patterns = tree.PatternTrie(args.stdlib_packages) if args.stdlib_packages else None
+            referenced = generator.referenced_packages if args.input or args.from_index else None
+            with profiling.phase("stdlib"):
+                added = stdlib.write_stdlib_archive(args.stdlib, writer, referenced, patterns, args.stdlib_dir)
+            print(f"Added {added} JDK {args.stdlib} standard library packages.")
+    print(f"Wrote {modules} modules to {args.output_archive}.")
+
+
+def run_from_index(args: argparse.Namespace) -> None:
+    """
+    Generates the stubs of the classes held in a model index, without decompiling or parsing anything.
+
+    Args:
+        args: The parsed command line arguments.
+    """
+    start = time.perf_counter()
+    includes, excludes, filter_source = read_filter_paths(args)
+
+    with model_index.ModelIndex(args.from_index) as index:
+        keys = list(index.files())
+        file_count, file_tree = tree.build_class_file_tree(key.replace(".", "/") + ".class" for key in keys)
+        apply_filters(file_tree, args.from_index, includes, excludes, filter_source)
+        selected = {".".join(path + [file]) for path, file in tree.iter_tree_files(file_tree)}
+        print(f"Loading {len(selected)} of {file_count} files from {args.from_index}...")
+
+        # Files are loaded in the order they were collected, as later files overwrite earlier ones of the same name
+        with profiling.phase("load"):
+            for key in keys:
+                if key in selected:
+                    generator.store_java_data(key.rpartition(".")[2], index.load_file(key))
+
+    if args.output_archive:
+        write_output_archive(args)
+    else:
+        write_output_directory(args, incremental.read_manifest(args.output), {}, {})
+
+    print(f"Successfully generated all files in {time.perf_counter() - start:.2f}s.")
+
+
+def run(args: argparse.Namespace, cache: DecompileCache | None) -> None:
+    """
+    Generates the stubs of every input jar, regenerating only the changed classes when incremental.
+
+    Args:
+        args: The parsed command line arguments.
+        cache: The decompile cache, if enabled.
+    """
+    start = time.perf_counter()
 
     # Create temp directory
     temp_dir = os.path.join(tempfile.gettempdir(), "jash")
@@ -35,109 +606,213 @@ if __name__ == "__main__":
     os.makedirs(temp_dir)
     print(f"Using temp directory: {temp_dir}\n")
 
-    # Check for valid java installation
-    code, output = fio.run_command(["java", "-version"])
-    if code != 0 or "version" not in output.lower():
-        raise Exception("Java is not installed or not properly configured.")
-
-    # Decompile and generate jar stubs
-    for jar in args.input:
-        fio.check_file_access(jar)
-        if os.path.splitext(jar)[1].lower() != ".jar":
-            raise Exception(f"The file '{jar}' is not a jar file.")
-
-        print(f"Decompiling {jar}...")
-        code, _ = fio.run_command(["java", "-jar", "./third-party/jd-cli.jar", jar, "-od", temp_dir])
-        if code != 0:
-            raise Exception(f"Failed to decompile {jar}.")
-
-        file_count, file_tree = tree.build_java_file_tree(temp_dir)
-        print(f"Found {file_count} compatible files in {jar}.\n")
-
-        # Mutually include or exclude files from the tree.py
-        if args.include:
-            check_file_access(args.include)
-
-            include_paths = []
-            print(f"Parsing include paths from {args.include}...")
-            with open(args.include, "r") as f:
-                for line in f:
-                    line = line.strip()
-                    include_paths.append(line.split("."))
-
-            for path in include_paths:
-                if not tree.path_exists(file_tree, path):
-                    raise Exception(f"The include path '{'.'.join(path)}' does not exist in {jar}.")
-
-            tree.keep_only_included(file_tree, include_paths)
-            include_num = len(include_paths)
-            print(f"Applied {include_num} include path{'s' if include_num != 1 else ''} from {args.include}.")
-
-        elif args.include_list:
-            if not isinstance(args.exclude_list, list):
-                args.exclude_list = [args.exclude_list]
-            include_paths = [p.split(".") for p in args.include_list]
-
-            for path in include_paths:
-                if not tree.path_exists(file_tree, path):
-                    raise Exception(f"The include path '{'.'.join(path)}' does not exist in {jar}.")
-
-            tree.keep_only_included(file_tree, include_paths)
-            include_num = len(include_paths)
-            print(f"Applied {include_num} include path{'s' if include_num != 1 else ''}.")
-
-        elif args.exclude:
-            fio.check_file_access(args.exclude)
-
-            exclude_num = 0
-            exclude_paths = []
-
-            print(f"Parsing exclude paths from {args.exclude}...")
-            with open(args.exclude, "r") as f:
-                for line in f:
-                    line = line.strip()
-                    exclude_paths.append(line.split("."))
-            exclude_num = len(exclude_paths)
-
-            for path in exclude_paths:
-                if not tree.remove_from_tree(file_tree, path):
-                    raise Exception(f"The exclude path '{'.'.join(path)}' does not exist in {jar}.")
-
-            print(f"Applied {exclude_num} exclude path{'s' if exclude_num != 1 else ''} from {args.exclude}.")
-        elif args.exclude_list:
-            if not isinstance(args.exclude_list, list):
-                args.exclude_list = [args.exclude_list]
-
-            exclude_num = len(args.exclude_list)
-
-            print(f"Parsing exclude paths...")
-            for path in args.exclude_list:
-                if not tree.remove_from_tree(file_tree, path.split(".")):
-                    raise Exception(f"The exclude path '{path}' does not exist in {jar}.")
-
-            print(f"Applied {exclude_num} exclude path{'s' if exclude_num != 1 else ''}.")
-
-        t_len = tree.tree_len(file_tree)
-        print(f"Total of {t_len} file{'s' if t_len != 1 else ''} from {jar} after filtering.")
-
-        # Collect initial data
-        print("Collecting initial java data...")
-        counter = progress_counter.ProgressCounter(t_len)
-        for path, file in tree.iter_tree_files(file_tree):
-            collect_java_data(file, temp_dir, path)
-            counter.increment()
+    includes, excludes, filter_source = read_filter_paths(args)
+
+    # Prepare every jar up front, so that bad inputs and filters fail before any decompiling starts
+    with profiling.phase("prepare", cprofile=True):
+        # With --closure, a root only has to exist in one of the jars, as its closure spans all of them
+        jobs = [
+            prepare_jar(jar, i, temp_dir, includes, excludes, filter_source, not args.closure)
+            for i, jar in enumerate(args.input)
+        ]
+        if args.closure:
+            expand_closure(jobs, includes)
+        for job in jobs:
+            job.signatures, job.class_entries = incremental.scan_jar(job.jar, job.file_tree)
+        if len(jobs) > 1:
+            deduplicate_jobs(jobs, args)
+
+    options = incremental.run_options(args.bytecode)
+    manifest = incremental.read_manifest(args.output)
+    signatures = {os.path.abspath(job.jar): job.signatures for job in jobs}
+    if args.incremental and manifest["options"] == options:
+        jobs = select_changed_classes(jobs, args, incremental.merge_signatures(manifest["jars"]))
+        print()
+    elif args.incremental and manifest["jars"]:
+        print("The previous run used different options, regenerating all files.\n")
+
+    # Check for valid java installation, only needed to decompile
+    if not args.bytecode and any(job.file_count for job in jobs):
+        code, output = fio.run_command(["java", "-version"])
+        if code != 0 or "version" not in output.lower():
+            raise Exception("Java is not installed or not properly configured.")
+
+    # Batches are always emitted as they are collected, so that their classes can be released
+    if args.stream_emit or args.batch_size or args.max_memory:
+        generator.enable_streaming_emission(args.output)
+
+    # Decompile and collect jar data, overlapping the decompiling of later jars with the parsing of earlier ones
+    asyncio.run(process_jars([job for job in jobs if job.file_count], args, cache))
+
+    # Concurrent jobs read their sources straight from the cache, so it is only trimmed once all are collected
+    if cache is not None:
+        cache.evict()
+
+    # Resolve unknown references against the classes of every jar in a single pass
+    print("Propagating java data...")
+    counter = None
+    if generator.unknown_references:
+        counter = progress_counter.ProgressCounter(len(generator.unknown_references), "Propagating")
+    with profiling.phase("propagate", cprofile=True):
+        resolved, unresolved = propagate_java_data(counter)
+    if counter is not None:
         counter.complete()
+    print(f"Resolved {resolved} references, {unresolved} left unresolved.")
 
-        # Propagate known data to unknown references
-        print("Propagating java data...")
-        counter = progress_counter.ProgressCounter(t_len)
-        for path, file in tree.iter_tree_files(file_tree):
-            propagate_java_data()
-            counter.increment()
-        counter.complete()
+    if args.write_index:
+        with profiling.phase("index"):
+            size = model_index.write_index(args.write_index, generator.java_data)
+        print(f"Wrote the model of {len(generator.java_data)} files to {args.write_index} ({size / 1024:.1f} KiB).")
 
-        # Generate python stub files
-        print("Generating python files...")
-        generator.generate_python_files("./test_dir/")
+    if args.output_archive:
+        write_output_archive(args)
+    else:
+        write_output_directory(args, manifest, options, signatures)
+
+    print(f"Successfully generated all files in {time.perf_counter() - start:.2f}s.")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Jython Advanced Syntax Highlighter (JASH)")
+    arg_parser.add_argument("-i", "--input", nargs="+", help="The jar file to generate stubs for.")
+    arg_parser.add_argument("-o", "--output", default="./test_dir/", help="The directory to write python stubs to.")
+
+    arg_parser.add_argument("-j", "--jobs", type=int, default=1, help="The number of worker processes used to parse java files.")
+
+    arg_parser.add_argument("--max-decompiles", type=int, default=2, help="The maximum number of jars decompiled at once.")
+
+    arg_parser.add_argument("--decompile-workers", type=int, default=1, help="The number of jd-cli processes used to decompile a single jar.")
+
+    arg_parser.add_argument("--parser", choices=generator.JAVA_PARSERS, default="declarations", help="The parser used for decompiled sources. 'declarations' skips method bodies, 'verify' checks it against the full javalang parse.")
+    arg_parser.add_argument("--bytecode", action="store_true", help="Read declarations straight from class files, skipping decompilation.")
+    arg_parser.add_argument("--stream", action="store_true", help="Stream decompiled sources through memory instead of extracting them to disk.")
+    arg_parser.add_argument("--output-archive", help="Write every stub into this single zip archive, or an installable wheel if it ends in .whl, instead of the output directory.")
+    arg_parser.add_argument("--layout", choices=generator.OUTPUT_LAYOUTS, default="flat", help="How stubs are laid out in the output directory. 'flat' writes a module per Java file, 'packages' mirrors the package structure with a package per Java package, as in output archives.")
+    arg_parser.add_argument("--write-workers", type=int, default=stub_output.DEFAULT_WRITE_WORKERS, help="The number of threads writing stub files, overlapping file creation with rendering. Helps on file systems where creating files is slow, e.g. network drives.")
+    arg_parser.add_argument("--stream-emit", action="store_true", help="Write each file's stubs as soon as it is parsed, instead of holding every class in memory.")
+    arg_parser.add_argument("--batch-size", type=int, default=0, help=f"Decompile and collect each jar in batches of about this many classes, whole packages at a time, releasing each batch before the next. Implies --stream-emit. 0 processes each jar at once, unless --max-memory is given, which defaults it to {chunked.DEFAULT_BATCH_SIZE}.")
+    arg_parser.add_argument("--max-memory", type=int, help="Process jars in batches, shrinking them to keep this process under this many MiB of memory. Implies --stream-emit.")
+    arg_parser.add_argument("--write-index", help="Write the parsed model of every class to this index file, for querying with model_index.py or regenerating with --from-index.")
+    arg_parser.add_argument("--from-index", help="Generate stubs from the classes of this index file, written with --write-index, instead of from jars.")
+    arg_parser.add_argument("--closure", action="store_true", help="Treat the included classes as roots, and generate them and every class their stubs reference, transitively, in any input jar.")
+    arg_parser.add_argument("--duplicates", choices=dedup.DUPLICATE_POLICIES, default="last", help="Which copy of a class to keep when several jars hold it with different contents. 'first' follows class path order, 'error' stops the run. Identical copies are always processed once.")
+    arg_parser.add_argument("--duplicates-report", help="Write a JSON report of the duplicate classes skipped across jars to this file.")
+    arg_parser.add_argument("--cache-dir", default=default_cache_dir(), help="The directory to cache decompiled jars in.")
+    arg_parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE, help="The maximum size of the decompile cache, in MiB.")
+    arg_parser.add_argument("--no-cache", action="store_true", help="Always decompile jars, bypassing the decompile cache. Batched runs always bypass it.")
+
+    arg_parser.add_argument("--stdlib", metavar="VERSION", help="Unpack the prebuilt Java standard library stubs of this JDK version that the generated stubs need.")
+    arg_parser.add_argument("--stdlib-packages", nargs="+", help="Standard library packages to unpack in addition to the needed ones, glob wildcards allowed.")
+    arg_parser.add_argument("--stdlib-dir", default=stdlib.STDLIB_DIR, help="The directory holding the standard library bundles.")
+    arg_parser.add_argument("--incremental", action="store_true", help="Only regenerate the stubs of classes that changed since the previous run into the output directory.")
+    arg_parser.add_argument("--watch", action="store_true", help="Keep running, incrementally regenerating stubs whenever an input jar changes. Implies --incremental.")
+    arg_parser.add_argument("--watch-interval", type=float, default=1.0, help="How often to check the input jars for changes when watching, in seconds.")
+    arg_parser.add_argument("--estimate", action="store_true", help="Only estimate the number and size of stubs and the runtime, from the jar's central directory and a sample of its classes.")
+    arg_parser.add_argument("--serve", action="store_true", help="Serve stubs over HTTP instead of writing them, generating each package from bytecode when it is first requested.")
+    arg_parser.add_argument("--host", default="127.0.0.1", help="The address to serve stubs on.")
+    arg_parser.add_argument("--port", type=int, default=serve.DEFAULT_PORT, help="The port to serve stubs on.")
+    arg_parser.add_argument("--serve-cache", type=int, default=serve.DEFAULT_CACHE_PACKAGES, help="The number of generated packages kept in memory when serving.")
+    arg_parser.add_argument("--profile", action="store_true", help="Report wall time, CPU time and peak memory per phase, and the slowest files.")
+    arg_parser.add_argument("--profile-top", type=int, default=10, help="The number of slowest files to report when profiling.")
+    arg_parser.add_argument("--profile-pstats", help="Dump cProfile statistics of the collect, propagate and generate phases to this file. Implies --profile.")
+    arg_parser.add_argument("--profile-trace", help="Write a Chrome trace-event JSON of every phase and file to this file. Implies --profile.")
+
+    inc_ex_group = arg_parser.add_mutually_exclusive_group()
+    inc_ex_group.add_argument("-ex", "--exclude", help="The exclude jar paths file to use during generation.")
+    inc_ex_group.add_argument("-exl", "--exclude-list", nargs="+", help="List of internal jar directories to exclude during generation, glob wildcards allowed")
+    inc_ex_group.add_argument("-inc", "--include", help="The include jar paths file to use during generation.")
+    inc_ex_group.add_argument("-incl", "--include-list", nargs="+", help="List of internal jar directories to include during generation, glob wildcards allowed")
+
+    args = arg_parser.parse_args()
 
-        print("Successfully generated all files.")
+    if args.from_index and args.input:
+        raise Exception("--from-index cannot be combined with input jars.")
+    if not args.input and not args.stdlib and not args.from_index:
+        raise Exception("No input jars were given.")
+    args.input = args.input or []
+    if args.jobs < 1:
+        raise Exception("The number of jobs must be at least 1.")
+    if args.max_decompiles < 1:
+        raise Exception("The maximum number of decompiles must be at least 1.")
+    if args.decompile_workers < 1:
+        raise Exception("The number of decompile workers must be at least 1.")
+
+    generator.set_java_parser(args.parser)
+
+    if args.closure and not (args.include or args.include_list):
+        raise Exception("--closure needs the root classes to be given with --include or --include-list.")
+    if args.batch_size < 0:
+        raise Exception("The batch size must not be negative.")
+    if args.max_memory is not None and args.max_memory < 1:
+        raise Exception("The maximum memory must be at least 1 MiB.")
+    if args.output_archive and (args.stream_emit or args.batch_size or args.max_memory or args.incremental or args.watch):
+        raise Exception("--output-archive cannot be combined with --stream-emit, --batch-size, --max-memory, --incremental or --watch.")
+
+    if args.write_workers < 1:
+        raise Exception("The number of write workers must be at least 1.")
+    if args.layout != "flat" and (args.stream_emit or args.batch_size or args.max_memory or args.incremental or args.watch):
+        raise Exception(f"--layout {args.layout} cannot be combined with --stream-emit, --batch-size, --max-memory, --incremental or --watch.")
+    if args.write_index and (args.stream_emit or args.batch_size or args.max_memory):
+        raise Exception("--write-index cannot be combined with --stream-emit, --batch-size or --max-memory, which release classes once emitted.")
+    if args.from_index and (args.closure or args.incremental or args.watch or args.estimate or args.serve or args.write_index):
+        raise Exception("--from-index cannot be combined with --closure, --incremental, --watch, --estimate, --serve or --write-index.")
+
+    if args.watch:
+        if not args.input:
+            raise Exception("No input jars were given to watch.")
+        args.incremental = True
+
+    if args.estimate:
+        estimate_jars(args)
+        sys.exit(0)
+
+    if args.serve:
+        if not args.input:
+            raise Exception("No input jars were given to serve.")
+        if args.serve_cache < 1:
+            raise Exception("The serve cache must hold at least 1 package.")
+        serve_jars(args)
+        sys.exit(0)
+
+    # A missing standard library bundle fails before anything is generated
+    if args.stdlib:
+        try:
+            stdlib.ensure_bundle(args.stdlib, args.stdlib_dir)
+        except stdlib.BundleIntegrityError as e:
+            print(f"error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    profiler = None
+    if args.profile or args.profile_pstats or args.profile_trace:
+        profiler = profiling.enable(args.profile_pstats, args.profile_trace)
+
+    # Batches are cached by their selection, which --max-memory changes from run to run, so batched runs bypass the cache
+    cache = None
+    batched = args.batch_size or args.max_memory
+    if not args.no_cache and not args.bytecode and not args.stream and not args.from_index and not batched:
+        cache = DecompileCache(args.cache_dir, args.cache_size * 1024 * 1024)
+        print(f"Using decompile cache: {args.cache_dir}")
+
+    if args.from_index:
+        run_from_index(args)
+    else:
+        run(args, cache)
+
+    if args.watch:
+        print(f"\nWatching {len(args.input)} jar{'s' if len(args.input) != 1 else ''} for changes, press Ctrl+C to stop...")
+        try:
+            while True:
+                incremental.wait_for_change(args.input, args.watch_interval)
+                print(f"\nChange detected at {time.strftime('%H:%M:%S')}, regenerating...")
+                generator.reset()
+                run(args, cache)
+        except KeyboardInterrupt:
+            pass
+
+    if profiler is not None:
+        profiler.finish()
+        print(f"\nProfile:\n{profiler.report(args.profile_top)}")
+        if args.profile_pstats:
+            print(f"cProfile statistics written to {args.profile_pstats}")
+        if args.profile_trace:
+            print(f"Chrome trace written to {args.profile_trace}")
@@ -0,0 +1,362 @@
+"""
+A persistent index of the parsed class model.
+
+The index is a single binary file, read through a memory map so that opening it costs the
+same for ten classes as for a million. It holds a zlib-compressed pickle of the classes of
+every Java file, and three tables sorted by name and searched in place:
+
+- files: the fully qualified file name, and the offset and size of its record
+- classes: every class and nested class, by fully qualified name with `$` for nesting,
+  and the file declaring it
+- supertypes: every supertype named in an `extends` or `implements` clause, and the class
+  naming it
+
+All names are stored once, in a UTF-8 string table. Records are pickles, so an index must
+only be loaded from a trusted source, like the decompile cache.
+"""
+
+import argparse
+import mmap
+import os
+import pickle
+import struct
+import sys
+import zlib
+from collections import defaultdict, deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from java_model.jash_class import JashClass
+from java_model.jash_type import JashType
+
+INDEX_MAGIC = b"JASHIDX\0"
+INDEX_VERSION = 1
+
+HEADER = struct.Struct("<8sHHIIIQQQQ")
+# Name offset, name length, record offset, record length
+FILE_ENTRY = struct.Struct("<IHQI")
+# Name offset, name length, index of the declaring file, or of the subclass for supertypes
+NAME_ENTRY = struct.Struct("<IHI")
+
+
+class IndexFormatError(Exception):
+    """Raised when a file is not a model index, or of an unsupported version."""
+    pass
+
+
+def binary_name(name: str) -> str:
+    """
+    Gets the fully qualified name of a class as stored in the index.
+
+    Args:
+        name: The name, with nested classes separated by `.` or `$`.
+
+    Returns:
+        The name with nested classes separated by `$`, e.g. `java.util.Map$Entry`.
+    """
+    if "$" in name:
+        return name
+    package, class_name = JashType(name).split_name()
+    class_name = class_name.replace(".", "$")
+    return f"{package}.{class_name}" if package else class_name
+
+
+def iter_nested_classes(jash_class: JashClass, name: str) -> Iterator[Tuple[str, JashClass]]:
+    """Iterates over a class and all its nested classes, with their fully qualified binary names."""
+    yield name, jash_class
+    for member in jash_class.body:
+        if isinstance(member, JashClass):
+            yield from iter_nested_classes(member, f"{name}${member.name}")
+
+
+def qualified_supertype(supertype: JashType, declared: Dict[str, str]) -> str:
+    """
+    Gets the binary name of a supertype, qualifying the simple names of classes declared in the same file.
+
+    Args:
+        supertype: The supertype.
+        declared: The binary name of every class declared in the file, keyed by simple name.
+
+    Returns:
+        The binary name of the supertype.
+    """
+    first, _, rest = supertype.full_name.partition(".")
+    if supertype.import_path() is None and first in declared:
+        return declared[first] + ("$" + rest.replace(".", "$") if rest else "")
+    return binary_name(supertype.full_name)
+
+
+def write_index(path: str, java_data: Dict[str, Dict[str, JashClass]]) -> int:
+    """
+    Writes the parsed classes of a run to an index file, replacing any existing one.
+
+    Args:
+        path: The path of the index.
+        java_data: The classes of every Java file, keyed by fully qualified file name, as in
+            `generator.java_data`.
+
+    Returns:
+        The size of the index in bytes.
+    """
+    strings: Dict[str, int] = {}
+    blob = bytearray()
+
+    def string(value: str) -> Tuple[int, int]:
+        offset = strings.get(value)
+        encoded = value.encode("utf-8")
+        if offset is None:
+            offset = strings[value] = len(blob)
+            blob.extend(encoded)
+        return offset, len(encoded)
+
+    files = []
+    classes = []
+    supertypes = []
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+
+        # Records keep the order the files were collected in, so that loading them in that
+        # order reproduces the run exactly; the table of files is sorted by name separately
+        for key, file_classes in java_data.items():
+            record = zlib.compress(pickle.dumps(file_classes, pickle.HIGHEST_PROTOCOL))
+            files.append((key, f.tell(), len(record)))
+            f.write(record)
+        files.sort(key=lambda entry: entry[0].encode("utf-8"))
+
+        for i, (key, _, _) in enumerate(files):
+            file_classes = [
+                (name, nested) for jash_class in java_data[key].values()
+                for name, nested in iter_nested_classes(jash_class, jash_class.fqn)
+            ]
+            # Classes of the same file are referenced by simple name, as their module needs no import
+            declared = {name.rpartition(".")[2].split("$")[-1]: name for name, _ in file_classes}
+            for name, nested in file_classes:
+                classes.append((name, i))
+                for supertype in ([nested.extends] if nested.extends is not None else []) + list(nested.implements):
+                    supertypes.append((qualified_supertype(supertype, declared), name))
+
+        classes.sort(key=lambda entry: entry[0].encode("utf-8"))
+        class_indices = {name: i for i, (name, _) in enumerate(classes)}
+        supertypes.sort(key=lambda entry: (entry[0].encode("utf-8"), class_indices[entry[1]]))
+
+        files_offset = f.tell()
+        for key, offset, length in files:
+            f.write(FILE_ENTRY.pack(*string(key), offset, length))
+        classes_offset = f.tell()
+        for name, file_index in classes:
+            f.write(NAME_ENTRY.pack(*string(name), file_index))
+        supertypes_offset = f.tell()
+        for supertype, name in supertypes:
+            f.write(NAME_ENTRY.pack(*string(supertype), class_indices[name]))
+        strings_offset = f.tell()
+        f.write(blob)
+        size = f.tell()
+
+        f.seek(0)
+        f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, len(files), len(classes), len(supertypes),
+                            files_offset, classes_offset, supertypes_offset, strings_offset))
+    os.replace(temp_path, path)
+    return size
+
+
+class ModelIndex:
+    """
+    A read-only view of an index file, loading the classes of a file only when asked for.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens an index file.
+
+        Args:
+            path: The path of the index.
+
+        Raises:
+            IndexFormatError: If the file is not an index, or of an unsupported version.
+        """
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise IndexFormatError(f"The file '{path}' is not a model index.")
+
+        if len(self.data) < HEADER.size or self.data[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            self.close()
+            raise IndexFormatError(f"The file '{path}' is not a model index.")
+        (_, version, _, self.file_count, self.class_count, self.supertype_count,
+         self.files_offset, self.classes_offset, self.supertypes_offset, self.strings_offset) = HEADER.unpack_from(self.data)
+        if version != INDEX_VERSION:
+            self.close()
+            raise IndexFormatError(f"The model index '{path}' is of unsupported version {version}.")
+
+    def __enter__(self) -> "ModelIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.data.close()
+        self.file.close()
+
+    def __len__(self) -> int:
+        return self.class_count
+
+    def string(self, offset: int, length: int) -> bytes:
+        start = self.strings_offset + offset
+        return self.data[start:start + length]
+
+    def entry(self, table_offset: int, entry: struct.Struct, i: int) -> tuple:
+        return entry.unpack_from(self.data, table_offset + i * entry.size)
+
+    def lower_bound(self, table_offset: int, count: int, entry: struct.Struct, name: bytes) -> int:
+        """Finds the first entry of a table whose name is not less than `name`, by binary search."""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if self.string(*self.entry(table_offset, entry, middle)[:2]) < name:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def files(self) -> Iterator[str]:
+        """Iterates over the fully qualified name of every file, in the order they were collected."""
+        entries = [self.entry(self.files_offset, FILE_ENTRY, i) for i in range(self.file_count)]
+        for name_offset, name_length, _, _ in sorted(entries, key=lambda entry: entry[2]):
+            yield self.string(name_offset, name_length).decode("utf-8")
+
+    def class_names(self) -> Iterator[str]:
+        """Iterates over the fully qualified name of every class, in sorted order."""
+        for i in range(self.class_count):
+            yield self.string(*self.entry(self.classes_offset, NAME_ENTRY, i)[:2]).decode("utf-8")
+
+    def packages(self) -> Dict[str, int]:
+        """Gets every package, and the number of top-level classes in it."""
+        packages = defaultdict(int)
+        for name in self.class_names():
+            if "$" not in name:
+                packages[name.rpartition(".")[0]] += 1
+        return dict(packages)
+
+    def load_file(self, key: str) -> Optional[Dict[str, JashClass]]:
+        """
+        Loads the classes of a single file.
+
+        Args:
+            key: The fully qualified name of the file, e.g. `java.util.Map`.
+
+        Returns:
+            The top-level classes of the file, keyed by class name, or None if the file is not indexed.
+        """
+        name = key.encode("utf-8")
+        i = self.lower_bound(self.files_offset, self.file_count, FILE_ENTRY, name)
+        if i == self.file_count:
+            return None
+        name_offset, name_length, offset, length = self.entry(self.files_offset, FILE_ENTRY, i)
+        if self.string(name_offset, name_length) != name:
+            return None
+        return pickle.loads(zlib.decompress(self.data[offset:offset + length]))
+
+    def file_of(self, fqn: str) -> Optional[str]:
+        """
+        Finds the file declaring a class.
+
+        Args:
+            fqn: The fully qualified name of the class, nested classes separated by `.` or `$`.
+
+        Returns:
+            The fully qualified name of the file, or None if the class is not indexed.
+        """
+        name = binary_name(fqn).encode("utf-8")
+        i = self.lower_bound(self.classes_offset, self.class_count, NAME_ENTRY, name)
+        if i == self.class_count:
+            return None
+        name_offset, name_length, file_index = self.entry(self.classes_offset, NAME_ENTRY, i)
+        if self.string(name_offset, name_length) != name:
+            return None
+        return self.string(*self.entry(self.files_offset, FILE_ENTRY, file_index)[:2]).decode("utf-8")
+
+    def find_class(self, fqn: str) -> Optional[JashClass]:
+        """
+        Loads a single class, reading only the file that declares it.
+
+        Args:
+            fqn: The fully qualified name of the class, nested classes separated by `.` or `$`.
+
+        Returns:
+            The class, with its nested classes, or None if the class is not indexed.
+        """
+        key = self.file_of(fqn)
+        if key is None:
+            return None
+        name = binary_name(fqn)
+        for jash_class in self.load_file(key).values():
+            for nested_name, nested in iter_nested_classes(jash_class, jash_class.fqn):
+                if nested_name == name:
+                    return nested
+        return None
+
+    def subtypes(self, fqn: str, transitive: bool = False) -> List[str]:
+        """
+        Finds the classes that extend or implement a class.
+
+        Args:
+            fqn: The fully qualified name of the class, which need not be indexed itself,
+                e.g. `java.lang.Runnable`.
+            transitive: Whether to include the subtypes of subtypes.
+
+        Returns:
+            The fully qualified names of the subtypes, in sorted order.
+        """
+        found = set()
+        pending = deque([binary_name(fqn)])
+        while pending:
+            name = pending.popleft().encode("utf-8")
+            i = self.lower_bound(self.supertypes_offset, self.supertype_count, NAME_ENTRY, name)
+            while i < self.supertype_count:
+                name_offset, name_length, class_index = self.entry(self.supertypes_offset, NAME_ENTRY, i)
+                if self.string(name_offset, name_length) != name:
+                    break
+                subtype = self.string(*self.entry(self.classes_offset, NAME_ENTRY, class_index)[:2]).decode("utf-8")
+                if subtype not in found:
+                    found.add(subtype)
+                    if transitive:
+                        pending.append(subtype)
+                i += 1
+        return sorted(found)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Query a JASH model index without decompiling anything.")
+    arg_parser.add_argument("index", help="The index file, written with --write-index.")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    packages_parser = commands.add_parser("packages", help="List every package and its number of classes.")
+    packages_parser.add_argument("prefix", nargs="?", default="", help="Only list packages starting with this prefix.")
+
+    show_parser = commands.add_parser("show", help="Print the stub of a class.")
+    show_parser.add_argument("name", help="The fully qualified name of the class.")
+
+    subtypes_parser = commands.add_parser("subtypes", help="List the classes extending or implementing a class.")
+    subtypes_parser.add_argument("name", help="The fully qualified name of the class.")
+    subtypes_parser.add_argument("-t", "--transitive", action="store_true", help="Include the subtypes of subtypes.")
+
+    args = arg_parser.parse_args()
+
+    with ModelIndex(args.index) as model_index:
+        if args.command == "packages":
+            for package, count in sorted(model_index.packages().items()):
+                if package.startswith(args.prefix):
+                    print(f"{package or '<default>':<60} {count} classes")
+        elif args.command == "show":
+            jash_class = model_index.find_class(args.name)
+            if jash_class is None:
+                print(f"The class {args.name} is not in {args.index}.", file=sys.stderr)
+                sys.exit(1)
+            print(jash_class, end="")
+        elif args.command == "subtypes":
+            for name in model_index.subtypes(args.name, args.transitive):
+                print(name)
@@ -0,0 +1,351 @@
+import builtins
+import importlib.abc
+import importlib.util
+import json
+import sys
+import threading
+import time
+import types
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import OrderedDict, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import generator
+from utils import tree
+from utils.zip_directory import ZipDirectory
+
+DEFAULT_CACHE_PACKAGES = 256
+DEFAULT_PORT = 8765
+# Seconds the import hook waits for the stub server before the import falls through
+DEFAULT_FETCH_TIMEOUT = 2.0
+# Seconds the import hook stops asking an unreachable stub server, so that only one import waits for it
+UNREACHABLE_RETRY_INTERVAL = 30.0
+MODULE_ROUTE = "/modules/"
+
+EMPTY_MODULE = "# Namespace package generated by JASH\n"
+
+
+class StubIndex:
+    """
+    An in-memory index of every class in a set of jars, rendering package stubs on demand.
+
+    Only the jars' central directories are read up front. The first request for a package
+    reads that package's classes straight from bytecode and renders them as a single stub
+    module, which is kept in an LRU cache of rendered packages.
+    """
+
+    def __init__(self, jars: Iterable[Tuple[str, tree.Tree]], cache_packages: int = DEFAULT_CACHE_PACKAGES):
+        """
+        Creates a new StubIndex.
+
+        Args:
+            jars: Each jar and its filtered file tree.
+            cache_packages: The maximum number of rendered packages to keep.
+        """
+        self.cache_packages = cache_packages
+        self.archives: List[ZipDirectory] = []
+        # Package -> (archive, top-level class file name, class entries) of every class in it
+        self.packages: Dict[str, List[Tuple[ZipDirectory, str, List[str]]]] = defaultdict(list)
+        self.parents = set()
+
+        for jar, file_tree in jars:
+            archive = ZipDirectory(jar)
+            self.archives.append(archive)
+            class_entries = generator.group_class_entries(archive.namelist())
+            for path, file in tree.iter_tree_files(file_tree):
+                self.packages[".".join(path)].append((archive, file, class_entries["/".join(path + [file])]))
+                for i in range(1, len(path)):
+                    self.parents.add(".".join(path[:i]))
+
+        self.cache: OrderedDict[str, str] = OrderedDict()
+        self.lock = threading.Lock()
+        self.rendering: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def close(self) -> None:
+        for archive in self.archives:
+            archive.close()
+
+    def __contains__(self, package: str) -> bool:
+        return package in self.packages or package in self.parents
+
+    def module_source(self, package: str) -> Optional[str]:
+        """
+        Gets the stub module of a package, rendering it on first use.
+
+        Args:
+            package: The dotted package name.
+
+        Returns:
+            The module source, an empty module for packages that only hold other packages,
+            or None if the package is not in any jar.
+        """
+        if package not in self.packages:
+            return EMPTY_MODULE if package in self.parents else None
+
+        with self.lock:
+            source = self.cache.get(package)
+            if source is not None:
+                self.cache.move_to_end(package)
+                self.hits += 1
+                return source
+
+        # Concurrent requests for the same package wait for a single render
+        with self.rendering[package]:
+            with self.lock:
+                source = self.cache.get(package)
+                if source is not None:
+                    self.hits += 1
+                    return source
+                self.misses += 1
+
+            source = self.render(package)
+
+            with self.lock:
+                self.cache[package] = source
+                while len(self.cache) > self.cache_packages:
+                    self.cache.popitem(last=False)
+                    self.evictions += 1
+        return source
+
+    def render(self, package: str) -> str:
+        """
+        Reads the classes of a package from bytecode and renders them as a single stub module.
+
+        Args:
+            package: The dotted package name.
+
+        Returns:
+            The module source.
+        """
+        classes = {}
+        for archive, file, entries in self.packages[package]:
+            classes.update(generator.parse_class_entries(archive, file, entries))
+        return generator.render_python_module(classes)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "packages": len(self.packages),
+                "cached": len(self.cache),
+                "capacity": self.cache_packages,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves a StubIndex over HTTP.
+
+    `GET /modules/<package>` returns the package's stub module, `GET /packages` every known
+    package and `GET /stats` the cache statistics.
+    """
+
+    index: StubIndex = None
+
+    def do_GET(self) -> None:
+        path = urllib.parse.urlparse(self.path).path
+        if path.startswith(MODULE_ROUTE):
+            start = time.perf_counter()
+            source = self.index.module_source(path[len(MODULE_ROUTE):])
+            if source is None:
+                self.send_text(404, "text/plain", "Unknown package.\n")
+            else:
+                self.send_text(200, "text/x-python", source, {"X-Jash-Render-Ms": f"{(time.perf_counter() - start) * 1e3:.1f}"})
+        elif path == "/packages":
+            self.send_text(200, "application/json", json.dumps(sorted(self.index.packages)))
+        elif path == "/stats":
+            self.send_text(200, "application/json", json.dumps(self.index.stats()))
+        else:
+            self.send_text(404, "text/plain", "Not found.\n")
+
+    def send_text(self, code: int, content_type: str, text: str, headers: Dict[str, str] = None) -> None:
+        body = text.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def serve(index: StubIndex, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> None:
+    """
+    Serves package stubs over HTTP until interrupted.
+
+    Args:
+        index: The index to serve.
+        host: The address to bind to.
+        port: The port to listen on.
+    """
+    handler = type("BoundStubRequestHandler", (StubRequestHandler,), {"index": index})
+    with ThreadingHTTPServer((host, port), handler) as server:
+        print(f"Serving stubs for {len(index.packages)} packages on http://{host}:{server.server_port}{MODULE_ROUTE}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+class Placeholder(type):
+    """The type of placeholder classes, which can be subscripted and hold placeholder nested classes."""
+
+    def __getitem__(cls, item):
+        return cls
+
+    def __getattr__(cls, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return placeholder(f"{cls.__qualname__}.{name}", cls.__module__)
+
+
+def placeholder(name: str, module: str) -> type:
+    """Creates a placeholder class standing in for a class that could not be imported."""
+    return Placeholder(name, (), {"__module__": module})
+
+
+class StubBuiltins(dict):
+    """
+    The builtins a stub module is executed with.
+
+    Stubs are written for static analysis, not execution: a class may extend one defined
+    further down its module, or one from a package that is not on the path. Names that are
+    not defined and modules that cannot be found resolve to placeholders instead of raising.
+    """
+
+    def __init__(self, module):
+        super().__init__(builtins.__dict__, __import__=lenient_import)
+        self.module = module
+
+    def __missing__(self, name: str):
+        if name.startswith("__"):
+            raise KeyError(name)
+        return placeholder(name, self.module.__name__)
+
+
+def lenient_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """Imports a module, standing in an empty module for any that cannot be found."""
+    try:
+        return builtins.__import__(name, globals, locals, fromlist, level)
+    except ModuleNotFoundError:
+        module = types.ModuleType(name)
+        module.__getattr__ = lambda attribute: module_placeholder(module, attribute)
+        return module
+
+
+def module_placeholder(module, name: str) -> type:
+    if name.startswith("__"):
+        raise AttributeError(name)
+    return placeholder(name, module.__name__)
+
+
+class StubLoader(importlib.abc.InspectLoader):
+    """
+    Loads a stub module from its source.
+
+    The module is executed leniently: imports that cannot be found and names that are not
+    defined yet become placeholder classes, so that any package can be imported and
+    inspected without the rest of the class path.
+    """
+
+    def __init__(self, fullname: str, source: str):
+        self.fullname = fullname
+        self.source = source
+
+    def get_source(self, fullname: str) -> str:
+        return self.source
+
+    def is_package(self, fullname: str) -> bool:
+        return True
+
+    def exec_module(self, module) -> None:
+        module.__builtins__ = StubBuiltins(module)
+        # Packages importing this one back while it executes get placeholders for the classes not defined yet
+        module.__getattr__ = lambda name: module_placeholder(module, name)
+        exec(compile(self.source, f"<jash:{self.fullname}>", "exec"), module.__dict__)
+        del module.__getattr__
+
+
+class StubFinder(importlib.abc.MetaPathFinder):
+    """
+    A meta path finder importing Java packages as stub modules, fetched as they are first imported.
+    """
+
+    def __init__(self, fetch: Callable[[str], Optional[str]]):
+        """
+        Creates a new StubFinder.
+
+        Args:
+            fetch: Gets the stub module source of a package, or None for unknown packages.
+        """
+        self.fetch = fetch
+
+    def find_spec(self, fullname: str, path=None, target=None):
+        source = self.fetch(fullname)
+        if source is None:
+            return None
+        return importlib.util.spec_from_loader(fullname, StubLoader(fullname, source), is_package=True)
+
+
+def fetch_from_url(url: str, timeout: float = DEFAULT_FETCH_TIMEOUT) -> Callable[[str], Optional[str]]:
+    """
+    Creates a fetch function reading package stubs from a running stub server.
+
+    Packages the server does not hold, and every package while the server cannot be reached,
+    are fetched as None, so that their imports fall through to the normal import machinery.
+    Once a request fails or times out, the server is not asked again for
+    `UNREACHABLE_RETRY_INTERVAL` seconds.
+
+    Args:
+        url: The base URL of the server, e.g. `http://127.0.0.1:8765`.
+        timeout: The seconds to wait for the server to connect or respond.
+
+    Returns:
+        The fetch function.
+    """
+    base = url.rstrip("/") + MODULE_ROUTE
+    retry_at = 0.0
+
+    def fetch(package: str) -> Optional[str]:
+        nonlocal retry_at
+        if time.monotonic() < retry_at:
+            return None
+        try:
+            with urllib.request.urlopen(base + urllib.parse.quote(package), timeout=timeout) as response:
+                return response.read().decode("utf-8")
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+        except (urllib.error.URLError, OSError):
+            retry_at = time.monotonic() + UNREACHABLE_RETRY_INTERVAL
+            return None
+    return fetch
+
+
+def install_import_hook(source: StubIndex | str, timeout: float = DEFAULT_FETCH_TIMEOUT) -> StubFinder:
+    """
+    Makes Java packages importable as stub modules, generated when first imported.
+
+    Args:
+        source: A local index, or the URL of a running stub server.
+        timeout: The seconds to wait for a stub server to connect or respond.
+
+    Returns:
+        The installed finder, which can be removed from `sys.meta_path` again.
+    """
+    fetch = source.module_source if isinstance(source, StubIndex) else fetch_from_url(source, timeout)
+    finder = StubFinder(fetch)
+    sys.meta_path.append(finder)
+    return finder
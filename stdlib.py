@@ -0,0 +1,550 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import urllib.error
+import urllib.request
+import zipfile
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+import generator
+from java_model.jash_class import JashClass
+from utils import tree
+from utils.jimage import JImage
+from utils.stub_output import package_module_name
+
+BUNDLE_FORMAT = 1
+STDLIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stdlib")
+DEFAULT_PACKAGES = ["java", "javax"]
+DEFAULT_MODULES = ["java.base"]
+
+MANIFEST_ENTRY = "manifest.json"
+# The pinned download URL and SHA-256 of the published bundle of each JDK version
+BUNDLE_REGISTRY = os.path.join(STDLIB_DIR, "bundles.json")
+# Written to the output directory, recording the hash of every installed package
+INSTALLED_FILE = ".jash-stdlib.json"
+
+
+class BundleIntegrityError(Exception):
+    """Raised when a standard library bundle is missing, malformed or fails its integrity check."""
+    pass
+
+
+def bundle_path(version: str, bundle_dir: str = STDLIB_DIR) -> str:
+    """
+    Gets the path of the standard library bundle of a JDK version.
+
+    Args:
+        version: The JDK version, e.g. `17`.
+        bundle_dir: The directory holding the bundles.
+
+    Returns:
+        The path of the bundle.
+    """
+    return os.path.join(bundle_dir, f"jdk-{version}.zip")
+
+
+def read_registry(registry_path: str = BUNDLE_REGISTRY) -> Dict[str, dict]:
+    """
+    Reads the registry of published bundles.
+
+    Args:
+        registry_path: The path of the registry.
+
+    Returns:
+        The download URL and SHA-256 of each published bundle, keyed by JDK version.
+    """
+    if not os.path.isfile(registry_path):
+        return {}
+    with open(registry_path, "r") as f:
+        return json.load(f).get("bundles", {})
+
+
+def file_sha256(path: str) -> str:
+    """Gets the SHA-256 of a file, as a hex string."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def missing_bundle_message(version: str, bundle_dir: str, registry_path: str = BUNDLE_REGISTRY) -> str:
+    """Describes how to get the bundle of a JDK version that is neither installed nor published."""
+    published = sorted(read_registry(registry_path))
+    return (
+        f"No standard library bundle for JDK {version} at {bundle_path(version, bundle_dir)}, and none is published "
+        f"for it in {registry_path}"
+        + (f" (published: {', '.join(published)})" if published else "") + ". "
+        f"Build one from a local JDK or JRE with `python stdlib.py build --jdk <JDK home> --version {version}`, "
+        f"or pass --stdlib-dir with a directory holding jdk-{version}.zip."
+    )
+
+
+def fetch_bundle(version: str, bundle_dir: str = STDLIB_DIR, registry_path: str = BUNDLE_REGISTRY) -> str:
+    """
+    Downloads the published bundle of a JDK version, verifying it against its pinned SHA-256.
+
+    The bundle is downloaded next to its final path and only moved into place once verified.
+
+    Args:
+        version: The JDK version.
+        bundle_dir: The directory to download the bundle to.
+        registry_path: The registry of published bundles.
+
+    Returns:
+        The path of the bundle.
+
+    Raises:
+        BundleIntegrityError: If no bundle is published for the version, the download fails,
+            or the bundle does not match its pinned hash.
+    """
+    entry = read_registry(registry_path).get(version)
+    if entry is None:
+        raise BundleIntegrityError(missing_bundle_message(version, bundle_dir, registry_path))
+
+    path = bundle_path(version, bundle_dir)
+    os.makedirs(bundle_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f"jdk-{version}-", suffix=".part", dir=bundle_dir)
+    try:
+        digest = hashlib.sha256()
+        with os.fdopen(fd, "wb") as f, urllib.request.urlopen(entry["url"]) as response:
+            for chunk in iter(lambda: response.read(1 << 20), b""):
+                digest.update(chunk)
+                f.write(chunk)
+        if digest.hexdigest() != entry["sha256"]:
+            raise BundleIntegrityError(
+                f"The bundle for JDK {version} downloaded from {entry['url']} does not match its pinned SHA-256."
+            )
+        os.replace(temp_path, path)
+    except (urllib.error.URLError, OSError) as e:
+        raise BundleIntegrityError(f"Failed to download the bundle for JDK {version} from {entry['url']}: {e}")
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return path
+
+
+def matches_package(patterns: tree.PatternTrie, package: str) -> bool:
+    """
+    Checks whether a package, or one of its parent packages, is matched by a set of patterns.
+
+    Args:
+        patterns: The package patterns.
+        package: The dotted package name.
+
+    Returns:
+        Whether the package is matched.
+    """
+    states = patterns.start()
+    for segment in package.split("."):
+        states = tree.advance(states, segment)
+        if tree.matched_patterns(states):
+            return True
+        if not states:
+            return False
+    return False
+
+
+def iter_jdk_archives(jdk: str, modules: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Finds the archives holding the class files of a JDK.
+
+    JDK 9 and later keep each module's classes in `jmods/<module>.jmod`, under `classes/`,
+    and every module in the runtime image `lib/modules`, under `/<module>/`, which is all a
+    JRE or a JDK without jmods has. JDK 8 keeps every class in `jre/lib/rt.jar`.
+
+    Args:
+        jdk: The JDK or JRE home directory.
+        modules: The modules to read, for JDK 9 and later.
+
+    Yields:
+        The path of each archive and the prefix of class entries within it.
+
+    Raises:
+        FileNotFoundError: If neither jmods, a runtime image nor rt.jar are found.
+    """
+    jmods = os.path.join(jdk, "jmods")
+    if os.path.isdir(jmods):
+        for module in modules:
+            path = os.path.join(jmods, f"{module}.jmod")
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"The module '{module}' does not exist in {jmods}.")
+            yield path, "classes/"
+        return
+
+    runtime_image = os.path.join(jdk, "lib", "modules")
+    if os.path.isfile(runtime_image):
+        for module in modules:
+            yield runtime_image, f"/{module}/"
+        return
+
+    for rt_jar in (os.path.join(jdk, "jre", "lib", "rt.jar"), os.path.join(jdk, "lib", "rt.jar")):
+        if os.path.isfile(rt_jar):
+            yield rt_jar, ""
+            return
+    raise FileNotFoundError(f"Neither jmods, a runtime image nor rt.jar were found in {jdk}.")
+
+
+def open_jdk_archive(path: str) -> zipfile.ZipFile | JImage:
+    """Opens an archive found by `iter_jdk_archives`, a runtime image or a zip."""
+    if os.path.basename(path) == "modules":
+        return JImage(path)
+    return zipfile.ZipFile(path)
+
+
+def collect_jdk_packages(jdk: str, modules: Iterable[str], patterns: tree.PatternTrie) -> Dict[str, Dict[str, JashClass]]:
+    """
+    Reads the public classes of a JDK straight from bytecode, grouped by package.
+
+    Args:
+        jdk: The JDK or JRE home directory.
+        modules: The modules to read, for JDK 9 and later.
+        patterns: The packages to include.
+
+    Returns:
+        A mapping of package to its public top-level classes, keyed by class name.
+    """
+    packages = defaultdict(dict)
+    for archive, prefix in iter_jdk_archives(jdk, modules):
+        # jmod files are zips behind a short header, which zipfile skips over
+        with open_jdk_archive(archive) as archive_file:
+            names = [n[len(prefix):] for n in archive_file.namelist() if n.startswith(prefix)]
+            if not names:
+                raise FileNotFoundError(f"The module '{prefix.strip('/')}' does not exist in {archive}.")
+            _, file_tree = tree.build_class_file_tree(names)
+            tree.filter_tree(file_tree, patterns, None)
+            class_entries = generator.group_class_entries(names)
+
+            for path, file in tree.iter_tree_files(file_tree):
+                entries = [prefix + e for e in class_entries["/".join(path + [file])]]
+                for jash_class in generator.parse_class_entries(archive_file, file, entries).values():
+                    if "public" in jash_class.modifiers:
+                        packages[".".join(path)][jash_class.name] = jash_class
+    return packages
+
+
+def build_bundle(jdk: str, version: str, out_path: str, modules: Iterable[str], package_patterns: Iterable[str]) -> int:
+    """
+    Builds the standard library bundle of a JDK.
+
+    Each package is rendered as a single stub module, stored as its own compressed entry so
+    that it can be unpacked without touching the rest of the bundle. The manifest records
+    the SHA-256 of every module and the packages it imports from.
+
+    Args:
+        jdk: The JDK or JRE home directory.
+        version: The JDK version the bundle is for.
+        out_path: The path to write the bundle to.
+        modules: The modules to read, for JDK 9 and later.
+        package_patterns: The packages to include.
+
+    Returns:
+        The number of packages in the bundle.
+    """
+    packages = collect_jdk_packages(jdk, modules, tree.PatternTrie(package_patterns))
+
+    manifest_packages = {}
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as bundle:
+        for package, classes in sorted(packages.items()):
+            source = generator.render_python_module(classes).encode("utf-8")
+            requires = {
+                path[0]
+                for jash_class in classes.values()
+                for jash_type in jash_class.iter_types()
+                if (path := jash_type.import_path()) is not None and path[0] != package
+            }
+            bundle.writestr(f"packages/{package}.py", source)
+            manifest_packages[package] = {
+                "sha256": hashlib.sha256(source).hexdigest(),
+                "classes": len(classes),
+                "requires": sorted(requires & packages.keys()),
+            }
+
+        manifest = {"format": BUNDLE_FORMAT, "jdk": version, "packages": manifest_packages}
+        bundle.writestr(MANIFEST_ENTRY, json.dumps(manifest, indent=1, sort_keys=True))
+
+    return len(manifest_packages)
+
+
+def read_manifest(bundle: zipfile.ZipFile) -> dict:
+    """
+    Reads and validates the manifest of an open bundle.
+
+    Raises:
+        BundleIntegrityError: If the manifest is missing or of an unsupported format.
+    """
+    try:
+        manifest = json.loads(bundle.read(MANIFEST_ENTRY))
+    except (KeyError, ValueError) as e:
+        raise BundleIntegrityError(f"The bundle {bundle.filename} has no valid manifest: {e}")
+    if manifest.get("format") != BUNDLE_FORMAT:
+        raise BundleIntegrityError(f"The bundle {bundle.filename} has unsupported format {manifest.get('format')}.")
+    return manifest
+
+
+def package_closure(manifest_packages: dict, roots: Iterable[str]) -> Set[str]:
+    """
+    Finds the bundled packages needed by a set of packages, including the packages they import from.
+
+    Args:
+        manifest_packages: The packages of a bundle manifest.
+        roots: The packages that are needed directly.
+
+    Returns:
+        The needed packages present in the bundle.
+    """
+    needed = set()
+    stack = [p for p in roots if p in manifest_packages]
+    while stack:
+        package = stack.pop()
+        if package in needed:
+            continue
+        needed.add(package)
+        stack.extend(manifest_packages[package]["requires"])
+    return needed
+
+
+def package_module_path(save_dir: str, package: str) -> str:
+    """Gets the path of a package's stub module, `java/util/__init__.py` for `java.util`."""
+    return os.path.join(save_dir, *package.split("."), "__init__.py")
+
+
+def ensure_bundle(version: str, bundle_dir: str = STDLIB_DIR) -> str:
+    """
+    Gets the standard library bundle of a JDK version, downloading it first if it is published but missing.
+
+    Args:
+        version: The JDK version of the bundle.
+        bundle_dir: The directory holding the bundles.
+
+    Returns:
+        The path of the bundle.
+
+    Raises:
+        BundleIntegrityError: If the bundle is missing and cannot be downloaded.
+    """
+    path = bundle_path(version, bundle_dir)
+    if not os.path.isfile(path):
+        if version not in read_registry():
+            raise BundleIntegrityError(missing_bundle_message(version, bundle_dir))
+        print(f"Downloading the standard library bundle for JDK {version}...")
+        path = fetch_bundle(version, bundle_dir)
+    return path
+
+
+def open_bundle(version: str, bundle_dir: str = STDLIB_DIR) -> zipfile.ZipFile:
+    """
+    Opens the standard library bundle of a JDK version, downloading it first if it is published but missing.
+
+    Args:
+        version: The JDK version of the bundle.
+        bundle_dir: The directory holding the bundles.
+
+    Returns:
+        The bundle.
+
+    Raises:
+        BundleIntegrityError: If the bundle is missing and cannot be downloaded.
+    """
+    return zipfile.ZipFile(ensure_bundle(version, bundle_dir))
+
+
+def select_packages(
+        manifest_packages: dict,
+        referenced: Optional[Iterable[str]],
+        patterns: Optional[tree.PatternTrie]
+) -> Set[str]:
+    """
+    Selects the packages of a bundle needed by a run.
+
+    Args:
+        manifest_packages: The packages of the bundle manifest.
+        referenced: The packages referenced by the generated stubs, if any were generated.
+        patterns: Extra packages to select.
+
+    Returns:
+        The referenced packages, those matched by `patterns` and the packages they import
+        from, or every package if neither is given.
+    """
+    if referenced is None and patterns is None:
+        return set(manifest_packages)
+
+    roots = [p for p in referenced or () if p in manifest_packages]
+    if patterns is not None:
+        roots.extend(p for p in manifest_packages if matches_package(patterns, p))
+    return package_closure(manifest_packages, roots)
+
+
+def read_package(bundle: zipfile.ZipFile, package: str, expected: str) -> bytes:
+    """
+    Reads a package's stub module from a bundle, verifying it against its manifest hash.
+
+    Args:
+        bundle: The bundle.
+        package: The dotted package name.
+        expected: The SHA-256 of the module, from the manifest.
+
+    Returns:
+        The stub module source.
+
+    Raises:
+        BundleIntegrityError: If the module does not match its hash.
+    """
+    source = bundle.read(f"packages/{package}.py")
+    if hashlib.sha256(source).hexdigest() != expected:
+        raise BundleIntegrityError(f"The package {package} in {bundle.filename} does not match its manifest hash.")
+    return source
+
+
+def install_stdlib(
+        version: str,
+        save_dir: str,
+        referenced: Optional[Iterable[str]] = None,
+        patterns: Optional[tree.PatternTrie] = None,
+        bundle_dir: str = STDLIB_DIR
+) -> Tuple[int, int]:
+    """
+    Unpacks the standard library stubs needed by a run from a prebuilt bundle.
+
+    Only the packages selected by `select_packages` are unpacked. Each package is verified
+    against the manifest hash before it is written, and packages that were already installed
+    from an identical bundle entry are skipped.
+
+    Args:
+        version: The JDK version of the bundle.
+        save_dir: The directory to unpack the stubs to.
+        referenced: The packages referenced by the generated stubs, if any were generated.
+        patterns: Extra packages to unpack.
+        bundle_dir: The directory holding the bundles.
+
+    Returns:
+        The number of packages unpacked and skipped.
+
+    Raises:
+        BundleIntegrityError: If the bundle is missing or fails its integrity check.
+    """
+    installed_path = os.path.join(save_dir, INSTALLED_FILE)
+    installed = {}
+    if os.path.isfile(installed_path):
+        with open(installed_path, "r") as f:
+            installed = json.load(f)
+
+    with open_bundle(version, bundle_dir) as bundle:
+        manifest_packages = read_manifest(bundle)["packages"]
+
+        unpacked = 0
+        skipped = 0
+        for package in sorted(select_packages(manifest_packages, referenced, patterns)):
+            expected = manifest_packages[package]["sha256"]
+            module_path = package_module_path(save_dir, package)
+            if installed.get(package) == expected and os.path.isfile(module_path):
+                skipped += 1
+                continue
+
+            write_package_module(save_dir, package, read_package(bundle, package, expected))
+            installed[package] = expected
+            unpacked += 1
+
+    with open(installed_path, "w") as f:
+        json.dump(installed, f, indent=1, sort_keys=True)
+    return unpacked, skipped
+
+
+def write_stdlib_archive(
+        version: str,
+        writer,
+        referenced: Optional[Iterable[str]] = None,
+        patterns: Optional[tree.PatternTrie] = None,
+        bundle_dir: str = STDLIB_DIR
+) -> int:
+    """
+    Adds the standard library stubs needed by a run to an output archive.
+
+    Packages already in the archive are left as they are.
+
+    Args:
+        version: The JDK version of the bundle.
+        writer: The archive writer, see `utils.stub_output`.
+        referenced: The packages referenced by the generated stubs, if any were generated.
+        patterns: Extra packages to add.
+        bundle_dir: The directory holding the bundles.
+
+    Returns:
+        The number of packages added.
+
+    Raises:
+        BundleIntegrityError: If the bundle is missing or fails its integrity check.
+    """
+    with open_bundle(version, bundle_dir) as bundle:
+        manifest_packages = read_manifest(bundle)["packages"]
+        added = 0
+        for package in sorted(select_packages(manifest_packages, referenced, patterns)):
+            # Packages generated from the input jars take precedence
+            if package_module_name(package) in writer.names:
+                continue
+            source = read_package(bundle, package, manifest_packages[package]["sha256"])
+            writer.write_package(package, source.decode("utf-8"))
+            added += 1
+    return added
+
+
+def write_package_module(save_dir: str, package: str, source: bytes) -> None:
+    """
+    Writes a package's stub module, creating empty modules for any missing parent packages.
+
+    Args:
+        save_dir: The root output directory.
+        package: The dotted package name.
+        source: The stub module source.
+    """
+    parts = package.split(".")
+    for i in range(1, len(parts)):
+        parent = os.path.join(save_dir, *parts[:i], "__init__.py")
+        if not os.path.exists(parent):
+            os.makedirs(os.path.dirname(parent), exist_ok=True)
+            open(parent, "w").close()
+
+    module_path = package_module_path(save_dir, package)
+    os.makedirs(os.path.dirname(module_path), exist_ok=True)
+    with open(module_path, "wb") as f:
+        f.write(source)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Build and inspect JASH standard library stub bundles.")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="Build the stub bundle of a JDK from its class files.")
+    build_parser.add_argument("--jdk", required=True, help="The JDK or JRE home directory.")
+    build_parser.add_argument("--version", required=True, help="The JDK version, e.g. 17.")
+    build_parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES, help="The modules to include, for JDK 9 and later.")
+    build_parser.add_argument("--packages", nargs="+", default=DEFAULT_PACKAGES, help="The packages to include, glob wildcards allowed.")
+    build_parser.add_argument("-o", "--output", help="The bundle to write. Defaults to the bundled stdlib directory.")
+
+    fetch_parser = commands.add_parser("fetch", help="Download the published bundle of a JDK version.")
+    fetch_parser.add_argument("--version", required=True, help="The JDK version.")
+    fetch_parser.add_argument("--bundle-dir", default=STDLIB_DIR, help="The directory to download the bundle to.")
+
+    list_parser = commands.add_parser("list", help="List the packages of a bundle.")
+    list_parser.add_argument("--version", required=True, help="The JDK version.")
+    list_parser.add_argument("--bundle-dir", default=STDLIB_DIR, help="The directory holding the bundles.")
+
+    args = arg_parser.parse_args()
+
+    if args.command == "build":
+        out_path = args.output or bundle_path(args.version)
+        count = build_bundle(args.jdk, args.version, out_path, args.modules, args.packages)
+        print(f"Wrote {count} packages to {out_path} ({os.path.getsize(out_path) / 1024 / 1024:.1f} MiB).")
+        print(f"To publish it, upload it and pin it in {BUNDLE_REGISTRY}:")
+        print(json.dumps({args.version: {"url": "<download URL>", "sha256": file_sha256(out_path)}}, indent=1))
+    elif args.command == "fetch":
+        path = fetch_bundle(args.version, args.bundle_dir)
+        print(f"Downloaded {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MiB), SHA-256 verified.")
+    else:
+        with zipfile.ZipFile(bundle_path(args.version, args.bundle_dir)) as bundle_file:
+            for name, info in sorted(read_manifest(bundle_file)["packages"].items()):
+                print(f"{name:<48}{info['classes']:>6} classes")
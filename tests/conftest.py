@@ -0,0 +1,38 @@
+import zipfile
+from typing import Dict, List
+
+import pytest
+
+import generator
+from benchmarks.synthetic_jar import SyntheticClass, SyntheticType
+
+
+@pytest.fixture
+def make_jar(tmp_path):
+    """
+    Writes jars of synthetic classes into the test's temp directory.
+
+    Each class is given by its fully qualified name and the fully qualified names of the types
+    of its fields, one field per type, so that tests control exactly which classes it references.
+    """
+    def make(name: str, classes: Dict[str, List[str]]) -> str:
+        path = str(tmp_path / name)
+        with zipfile.ZipFile(path, "w") as jar:
+            for fqn, field_types in classes.items():
+                package, _, class_name = fqn.rpartition(".")
+                synthetic = SyntheticClass(package, class_name, False, None)
+                for i, field_type in enumerate(field_types):
+                    synthetic.fields.append(
+                        (f"field{i}", SyntheticType(field_type.rpartition(".")[2], f"L{field_type.replace('.', '/')};"))
+                    )
+                jar.writestr(synthetic.internal_name + ".class", synthetic.class_file())
+        return path
+    return make
+
+
+@pytest.fixture(autouse=True)
+def reset_generator():
+    """Clears the module level state of the generator around every test."""
+    generator.reset()
+    yield
+    generator.reset()
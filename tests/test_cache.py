@@ -0,0 +1,80 @@
+import json
+import os
+
+import pytest
+
+from utils.cache import DecompileCache
+
+
+def decompiler(calls: list, content: str = "class A {}"):
+    def decompile(out_dir: str) -> None:
+        calls.append(out_dir)
+        with open(os.path.join(out_dir, "A.java"), "w") as f:
+            f.write(content)
+    return decompile
+
+
+def test_fetch_decompiles_once(make_jar, tmp_path):
+    jar = make_jar("a.jar", {"a.A": []})
+    cache = DecompileCache(str(tmp_path / "cache"), 1 << 20)
+    calls = []
+
+    sources = cache.fetch(jar, decompiler(calls))
+    assert cache.fetch(jar, decompiler(calls)) == sources
+    assert len(calls) == 1
+    assert os.listdir(sources) == ["A.java"]
+
+
+def test_variants_are_separate_entries(make_jar, tmp_path):
+    jar = make_jar("a.jar", {"a.A": [], "a.B": []})
+    cache = DecompileCache(str(tmp_path / "cache"), 1 << 20)
+    calls = []
+
+    assert cache.fetch(jar, decompiler(calls), "a") != cache.fetch(jar, decompiler(calls), "b")
+    assert len(calls) == 2
+
+
+def test_entry_with_stale_crcs_is_a_miss(make_jar, tmp_path):
+    jar = make_jar("a.jar", {"a.A": []})
+    cache = DecompileCache(str(tmp_path / "cache"), 1 << 20)
+    key = cache.key(jar)
+    cache.store(key, jar, decompiler([]))
+
+    manifest_path = os.path.join(cache.cache_dir, key, DecompileCache.MANIFEST)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest["entries"] = {"a/A.class": 0}
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+
+    assert cache.lookup(key, jar) is None
+    assert not os.path.exists(os.path.join(cache.cache_dir, key))
+
+
+def test_failed_decompile_leaves_no_entry(make_jar, tmp_path):
+    jar = make_jar("a.jar", {"a.A": []})
+    cache = DecompileCache(str(tmp_path / "cache"), 1 << 20)
+
+    def decompile(out_dir: str) -> None:
+        raise RuntimeError("jd-cli failed")
+
+    with pytest.raises(RuntimeError):
+        cache.fetch(jar, decompile)
+    assert os.listdir(cache.cache_dir) == []
+
+
+def test_store_never_evicts_and_evict_removes_least_recently_used(make_jar, tmp_path):
+    old = make_jar("old.jar", {"a.A": []})
+    new = make_jar("new.jar", {"b.B": []})
+    # Room for a single entry
+    cache = DecompileCache(str(tmp_path / "cache"), len("class A {}"))
+
+    old_sources = cache.fetch(old, decompiler([]))
+    os.utime(os.path.join(os.path.dirname(old_sources), DecompileCache.MANIFEST), (0, 0))
+    new_sources = cache.fetch(new, decompiler([]))
+
+    # Both entries stay readable while over the cap, until the caller evicts
+    assert os.path.isdir(old_sources) and os.path.isdir(new_sources)
+    cache.evict()
+    assert not os.path.exists(old_sources)
+    assert os.path.isdir(new_sources)
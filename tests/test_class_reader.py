@@ -0,0 +1,24 @@
+import pytest
+
+from utils.class_reader import ClassFormatError, parse_class_signature, parse_field_signature, parse_method_signature
+
+
+@pytest.mark.parametrize("parse, signature", [
+    (parse_class_signature, "<T"),
+    (parse_class_signature, "<T:Ljava/lang/Object;"),
+    (parse_field_signature, "Ljava/util/List<"),
+    (parse_field_signature, "Ljava/util/List<Ljava/lang/String;"),
+    (parse_method_signature, "(I"),
+])
+def test_truncated_signature_raises(parse, signature):
+    with pytest.raises(ClassFormatError):
+        parse(signature)
+
+
+def test_generic_class_signature():
+    type_parameters, super_type, interfaces = parse_class_signature(
+        "<T:Ljava/lang/Object;>Ljava/lang/Object;Ljava/lang/Comparable<TT;>;"
+    )
+    assert [p.name for p in type_parameters] == ["T"]
+    assert super_type.full_name == "java.lang.Object"
+    assert [i.full_name for i in interfaces] == ["java.lang.Comparable"]
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import closure
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_reachable_classes_cross_jars(make_jar):
+    api = make_jar("api.jar", {"org.api.Api": ["org.dep.Dep"], "org.api.Other": []})
+    dep = make_jar("dep.jar", {"org.dep.Dep": ["org.dep.Base"], "org.dep.Base": [], "org.dep.Unused": []})
+
+    reachable = closure.reachable_classes([(api, ["org/api/Api"]), (dep, [])])
+    assert reachable == [(["org/api/Api"], 2), (["org/dep/Dep", "org/dep/Base"], 3)]
+
+
+def test_reachable_classes_ignores_classes_outside_the_jars(make_jar):
+    jar = make_jar("a.jar", {"a.A": ["a.B", "java.util.List"], "a.B": ["a.A"]})
+
+    assert closure.reachable_classes([(jar, ["a/A"])]) == [(["a/A", "a/B"], 2)]
+
+
+def run_main(*arguments: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "main.py", *arguments], cwd=ROOT, capture_output=True, text=True)
+
+
+def test_closure_across_jars_end_to_end(make_jar, tmp_path):
+    api = make_jar("api.jar", {"org.api.Api": ["org.dep.Dep"], "org.api.Other": []})
+    dep = make_jar("dep.jar", {"org.dep.Dep": ["org.dep.Base"], "org.dep.Base": [], "org.dep.Unused": []})
+    out = tmp_path / "out"
+
+    result = run_main("--bytecode", "--closure", "-incl", "org.api.Api", "-i", api, dep, "-o", str(out))
+    assert result.returncode == 0, result.stderr
+    assert sorted(f for f in os.listdir(out) if f.endswith(".py")) == ["Api.py", "Base.py", "Dep.py"]
+    assert "from org.dep import Dep" in (out / "Api.py").read_text()
+
+
+def test_closure_root_missing_from_every_jar(make_jar, tmp_path):
+    api = make_jar("api.jar", {"org.api.Api": []})
+    dep = make_jar("dep.jar", {"org.dep.Dep": []})
+
+    result = run_main("--bytecode", "--closure", "-incl", "org.api.Api", "org.missing", "-i", api, dep,
+                      "-o", str(tmp_path / "out"))
+    assert result.returncode != 0
+    assert "The include path 'org.missing' does not exist in any input jar." in result.stderr
@@ -0,0 +1,128 @@
+import javalang
+import pytest
+
+import generator
+from utils import declaration_parser
+
+SOURCE = '''
+package org.example;
+
+import java.util.*;
+import java.util.function.Function;
+import static java.lang.Math.max;
+
+/** A class with { braces } in its comment. */
+@SuppressWarnings({"unchecked", "rawtypes"})
+public abstract class Sample<K extends Comparable<K>, V> extends AbstractMap<K, V> implements Runnable, Cloneable {
+    public static final String BRACES = "}{\\"'";
+    private static final char QUOTE = '"';
+    protected int[][] grid = new int[][] {{1, 2}, {3}};
+    private final Map<K, List<? super V>> index = new HashMap<>() {{ put(null, null); }};
+    Runnable task = () -> { if (true) { return; } };
+    long mask = 0xFF_FFL, bits = 0b1010;
+    double ratio = 1.5e-3;
+
+    static { System.out.println("static } initializer"); }
+    { grid[0][0] = max(1, 2); }
+
+    public Sample() { this(null); }
+    protected Sample(V value) { super(); }
+
+    @Override
+    public void run() {
+        Function<Integer, Integer> f = x -> x + 1;
+        new Thread(new Runnable() { public void run() { } }).start();
+        for (int i = 0; i < 10; i++) { /* } */ }
+    }
+
+    public abstract <T extends V> T convert(Class<T> type, K... keys) throws IllegalStateException, java.io.IOException;
+
+    public native int hash();
+
+    public enum Mode {
+        FAST("f") { int speed() { return 2; } },
+        SLOW("s");
+
+        private final String code;
+        Mode(String code) { this.code = code; }
+        int speed() { return 1; }
+    }
+
+    public interface Listener<E> {
+        void on(E event);
+        default boolean accepts(E event) { return event != null; }
+    }
+
+    private static class Node<T> {
+        T value;
+        Node<T> next;
+    }
+}
+
+interface Helper {
+    int LIMIT = 10 * (2 + 3);
+}
+'''
+
+
+def parse_with(parser: str, source: str):
+    generator.set_java_parser(parser)
+    try:
+        return generator.parse_java_source(source, "Sample")
+    finally:
+        generator.set_java_parser("declarations")
+
+
+def test_matches_javalang():
+    declarations = parse_with("declarations", SOURCE)
+    expected = parse_with("javalang", SOURCE)
+
+    assert list(declarations) == ["Sample", "Helper"]
+    assert generator.render_python_module(declarations) == generator.render_python_module(expected)
+
+
+def test_declarations_match_javalang_tree():
+    unit = declaration_parser.parse(SOURCE)
+    expected = javalang.parse.parse(SOURCE)
+
+    assert unit.package.name == expected.package.name
+    assert [(i.path, i.static, i.wildcard) for i in unit.imports] == \
+           [(i.path, i.static, i.wildcard) for i in expected.imports]
+    assert [t.name for t in unit.types] == [t.name for t in expected.types]
+
+    sample, expected_sample = unit.types[0], expected.types[0]
+    # Initializer blocks have no declarations, javalang keeps them as bare statement lists
+    assert [type(m).__name__ for m in sample.body] == \
+           [type(m).__name__ for m in expected_sample.body if not isinstance(m, list)]
+    run = next(m for m in sample.methods if m.name == "run")
+    assert run.body == []
+
+
+def test_skips_bodies_without_tokenizing_them():
+    # The method body holds characters javalang cannot tokenize
+    source = "class A { void f() { # } int g; }"
+    with pytest.raises(javalang.tokenizer.LexerError):
+        javalang.parse.parse(source)
+
+    unit = declaration_parser.parse(source)
+    assert [m.name for m in unit.types[0].methods] == ["f"]
+    assert unit.types[0].fields[0].declarators[0].name == "g"
+
+
+def test_skips_text_blocks():
+    source = 'class A { String block = """\n    text } with { braces\n    """; int after; }'
+    unit = declaration_parser.parse(source)
+    assert [f.declarators[0].name for f in unit.types[0].fields] == ["block", "after"]
+
+
+def test_syntax_errors_are_reported():
+    with pytest.raises(Exception, match="Syntax error encountered while parsing Broken.java"):
+        generator.parse_java_source("class Broken { void f( }", "Broken")
+
+
+def test_verify_falls_back_to_javalang(monkeypatch, capsys):
+    monkeypatch.setattr(declaration_parser, "parse", lambda data: javalang.parse.parse("class Other {}"))
+    classes = parse_with("verify", "class A {}")
+
+    assert list(classes) == ["A"]
+    assert "disagrees with javalang on Sample.java" in capsys.readouterr().err
@@ -0,0 +1,89 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import dedup
+import incremental
+from utils import tree
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def jars(make_jar):
+    """Two jars sharing an identical class and a class whose contents differ."""
+    first = make_jar("first.jar", {"a.Same": [], "a.Differs": [], "a.Differs$Inner": [], "a.OnlyFirst": []})
+    second = make_jar("second.jar", {"a.Same": [], "a.Differs": ["a.Same"], "a.OnlySecond": []})
+    return first, second
+
+
+def scan(*jars: str):
+    scanned = []
+    for jar in jars:
+        _, file_tree = tree.build_jar_file_tree(jar)
+        scanned.append((jar, *incremental.scan_jar(jar, file_tree)))
+    return scanned
+
+
+def test_identical_copies_are_kept_once(jars):
+    first, second = jars
+    dropped, report = dedup.plan_deduplication(scan(first, second), "last")
+
+    assert dropped == [{"a/Same", "a/Differs"}, set()]
+    assert report.identical == {"a/Same": (second, [first])}
+    assert report.conflicts == {"a/Differs": (second, [first])}
+    assert report.skipped_classes() == 2
+    # The dropped copy of a/Differs includes its nested class
+    assert report.skipped[first][:2] == [2, 3]
+
+
+def test_first_policy_keeps_class_path_order(jars):
+    first, second = jars
+    dropped, report = dedup.plan_deduplication(scan(first, second), "first")
+
+    assert dropped == [set(), {"a/Same", "a/Differs"}]
+    assert report.conflicts == {"a/Differs": (first, [second])}
+
+
+def test_error_policy(jars):
+    first, second = jars
+    with pytest.raises(dedup.DuplicateConflictError, match="a.Differs differs between"):
+        dedup.plan_deduplication(scan(first, second), "error")
+
+    # Identical copies are not conflicts
+    dropped, report = dedup.plan_deduplication(scan(first, first), "error")
+    assert dropped == [{"a/Same", "a/Differs", "a/OnlyFirst"}, set()]
+    assert not report.conflicts
+
+
+def test_unknown_policy(jars):
+    with pytest.raises(Exception, match="Unknown duplicate policy"):
+        dedup.plan_deduplication(scan(*jars), "newest")
+
+
+def test_report_json(jars, tmp_path):
+    _, report = dedup.plan_deduplication(scan(*jars), "last")
+    report.write(str(tmp_path / "report.json"))
+    written = json.loads((tmp_path / "report.json").read_text())
+
+    assert written["policy"] == "last"
+    assert written["skipped_classes"] == 2
+    assert written["conflicts"]["a/Differs"] == {"kept": jars[1], "dropped": [jars[0]]}
+    assert "Skipped 2 duplicate classes" in report.summary()
+
+
+def test_duplicates_end_to_end(jars, tmp_path):
+    first, second = jars
+    for policy, expected in (("last", True), ("first", False)):
+        out = tmp_path / policy
+        result = subprocess.run(
+            [sys.executable, "main.py", "--bytecode", "--duplicates", policy, "-i", first, second, "-o", str(out)],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        assert result.returncode == 0, result.stderr
+        assert "Skipped 2 duplicate classes" in result.stdout
+        assert sorted(f for f in os.listdir(out) if f.endswith(".py")) == ["Differs.py", "OnlyFirst.py", "OnlySecond.py", "Same.py"]
+        assert ("from a import Same" in (out / "Differs.py").read_text()) == expected
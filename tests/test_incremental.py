@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+
+import incremental
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_main(*arguments: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "main.py", *arguments], cwd=ROOT, capture_output=True, text=True)
+
+
+def test_changed_classes(tmp_path):
+    (tmp_path / "Same.py").write_text("")
+    (tmp_path / "Changed.py").write_text("")
+    signatures = {"a/Same": 1, "a/Changed": 2, "a/New": 3, "a/Missing": 4}
+    previous = {"a/Same": 1, "a/Changed": 1, "a/Missing": 4}
+
+    assert incremental.changed_classes(str(tmp_path), signatures, previous) == ["a/Changed", "a/New", "a/Missing"]
+
+
+def test_remove_stale_stubs(tmp_path):
+    for name in ("Kept.py", "Gone.py", "Shared.py"):
+        (tmp_path / name).write_text("")
+    previous = {"a/Kept": 1, "a/Gone": 2, "a/Shared": 3, "a/Deleted": 4}
+    # b/Shared is still generated into Shared.py, and Deleted.py was already removed by hand
+    current = {"a/Kept": 1, "b/Shared": 5}
+
+    assert incremental.remove_stale_stubs(str(tmp_path), previous, current) == 1
+    assert sorted(os.listdir(tmp_path)) == ["Kept.py", "Shared.py"]
+
+
+def test_manifest_round_trip(tmp_path):
+    assert incremental.read_manifest(str(tmp_path)) == {"format": incremental.MANIFEST_FORMAT, "options": None, "jars": {}}
+
+    incremental.write_manifest(str(tmp_path), incremental.run_options(True), {"a.jar": {"a/A": 1}})
+    assert incremental.read_manifest(str(tmp_path))["jars"] == {"a.jar": {"a/A": 1}}
+
+    (tmp_path / incremental.MANIFEST_FILE).write_text("{")
+    assert incremental.read_manifest(str(tmp_path))["jars"] == {}
+
+
+def test_scan_jar_signatures_follow_nested_classes(make_jar):
+    jar = make_jar("a.jar", {"a.A": [], "a.A$Inner": [], "a.B": []})
+    before, class_entries = incremental.scan_jar(jar, incremental.restrict_tree(["a/A", "a/B"])[1])
+    assert sorted(class_entries["a/A"]) == ["a/A$Inner.class", "a/A.class"]
+
+    jar = make_jar("a.jar", {"a.A": [], "a.A$Inner": ["a.B"], "a.B": []})
+    after, _ = incremental.scan_jar(jar, incremental.restrict_tree(["a/A", "a/B"])[1])
+    assert before["a/A"] != after["a/A"]
+    assert before["a/B"] == after["a/B"]
+
+
+def test_incremental_run_end_to_end(make_jar, tmp_path):
+    out = tmp_path / "out"
+    jar = make_jar("lib.jar", {"a.A": ["a.B"], "a.B": [], "a.C": []})
+    result = run_main("--bytecode", "--incremental", "-i", jar, "-o", str(out))
+    assert result.returncode == 0, result.stderr
+    assert sorted(f for f in os.listdir(out) if f.endswith(".py")) == ["A.py", "B.py", "C.py"]
+
+    # Backdate the stubs, so that a rewritten stub can be told apart
+    for name in ("A.py", "B.py"):
+        os.utime(out / name, ns=(0, 0))
+
+    # B gains a field and C is removed
+    make_jar("lib.jar", {"a.A": ["a.B"], "a.B": ["a.A"]})
+    result = run_main("--bytecode", "--incremental", "-i", jar, "-o", str(out))
+    assert result.returncode == 0, result.stderr
+    assert "1 of 2 files changed" in result.stdout
+    assert "Removed 1 stale stub file." in result.stdout
+
+    assert sorted(f for f in os.listdir(out) if f.endswith(".py")) == ["A.py", "B.py"]
+    assert os.stat(out / "A.py").st_mtime_ns == 0
+    assert os.stat(out / "B.py").st_mtime_ns != 0
+    # The unchanged class is still resolved from the previous run
+    assert "from a import A" in (out / "B.py").read_text()
+    assert "from a import B" in (out / "A.py").read_text()
@@ -0,0 +1,29 @@
+import gc
+
+import generator
+from java_model.jash_class import JashClass
+from java_model.jash_type import JashType
+from utils.utils import interned_tuples
+
+
+def test_imports_are_not_kept_in_the_shared_registry():
+    jash_class = JashClass("A", modifiers=["public"], package="a", imports=["b.B", "c.*"])
+    assert jash_class.imports == ("b.B", "c.*")
+    assert jash_class.imports not in interned_tuples
+    assert ("public",) in interned_tuples
+
+
+def test_reset_clears_the_shared_registry():
+    JashClass("A", modifiers=["public", "final"])
+    generator.reset()
+    assert not interned_tuples
+
+
+def test_unused_types_leave_the_registry():
+    jash_type = JashType("com.example.Unused")
+    assert JashType("com.example.Unused") is jash_type
+    count = len(JashType._registry)
+
+    del jash_type
+    gc.collect()
+    assert len(JashType._registry) < count
@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import generator
+import model_index
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOURCES = {
+    "Base": "package a; public abstract class Base implements Runnable { }",
+    "Impl": "package a.impl; import a.Base; public class Impl extends Base { public static class Node extends Impl { } }",
+    "Other": "package b; public class Other implements java.lang.Runnable, Comparable<Other> { }",
+    "Plain": "public class Plain { }",
+}
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    for file, source in SOURCES.items():
+        generator.store_java_data(file, generator.parse_java_source(source, file))
+    generator.propagate_java_data()
+    path = str(tmp_path / "model.idx")
+    assert model_index.write_index(path, generator.java_data) == os.path.getsize(path)
+    return path
+
+
+def test_files_and_classes(index_path):
+    with model_index.ModelIndex(index_path) as index:
+        assert list(index.files()) == list(generator.java_data)
+        assert list(index.class_names()) == ["Plain", "a.Base", "a.impl.Impl", "a.impl.Impl$Node", "b.Other"]
+        assert len(index) == 5
+        assert index.packages() == {"": 1, "a": 1, "a.impl": 1, "b": 1}
+
+
+def test_load_file(index_path):
+    with model_index.ModelIndex(index_path) as index:
+        for key, classes in generator.java_data.items():
+            assert generator.render_python_module(index.load_file(key)) == generator.render_python_module(classes)
+        assert index.load_file("a.Missing") is None
+        assert index.load_file("zzz") is None
+
+
+def test_find_class(index_path):
+    with model_index.ModelIndex(index_path) as index:
+        assert index.file_of("a.impl.Impl.Node") == "a.impl.Impl"
+        assert index.find_class("a.impl.Impl$Node").name == "Node"
+        assert index.find_class("a.impl.Impl.Node").extends.full_name == "Impl"
+        assert index.find_class("b.Other").fqn == "b.Other"
+        assert index.find_class("a.Missing") is None
+
+
+def test_subtypes(index_path):
+    with model_index.ModelIndex(index_path) as index:
+        assert index.subtypes("java.lang.Runnable") == ["a.Base", "b.Other"]
+        assert index.subtypes("java.lang.Runnable", transitive=True) == ["a.Base", "a.impl.Impl", "a.impl.Impl$Node", "b.Other"]
+        assert index.subtypes("a.impl.Impl") == ["a.impl.Impl$Node"]
+        assert index.subtypes("b.Other") == []
+
+
+def test_rejects_other_files(index_path, tmp_path):
+    (tmp_path / "empty").write_bytes(b"")
+    (tmp_path / "other").write_bytes(b"not an index" * 10)
+    for name in ("empty", "other"):
+        with pytest.raises(model_index.IndexFormatError, match="is not a model index"):
+            model_index.ModelIndex(str(tmp_path / name))
+
+    data = bytearray(open(index_path, "rb").read())
+    data[len(model_index.INDEX_MAGIC)] += 1
+    (tmp_path / "newer").write_bytes(bytes(data))
+    with pytest.raises(model_index.IndexFormatError, match="unsupported version"):
+        model_index.ModelIndex(str(tmp_path / "newer"))
+
+
+def test_from_index_end_to_end(make_jar, tmp_path):
+    jar = make_jar("lib.jar", {"a.A": ["a.B"], "a.B": [], "c.C": ["a.A"]})
+    index = str(tmp_path / "lib.idx")
+
+    def run(*arguments: str) -> str:
+        result = subprocess.run([sys.executable, "main.py", *arguments], cwd=ROOT, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        return result.stdout
+
+    run("--bytecode", "-i", jar, "-o", str(tmp_path / "jar"), "--write-index", index)
+    run("--from-index", index, "-o", str(tmp_path / "index"))
+
+    stubs = sorted(f for f in os.listdir(tmp_path / "jar") if f.endswith(".py"))
+    assert stubs == ["A.py", "B.py", "C.py"]
+    assert sorted(f for f in os.listdir(tmp_path / "index") if f.endswith(".py")) == stubs
+    for name in stubs:
+        assert (tmp_path / "index" / name).read_text() == (tmp_path / "jar" / name).read_text()
+
+    query = subprocess.run([sys.executable, "model_index.py", index, "show", "a.A"], cwd=ROOT, capture_output=True, text=True)
+    assert query.returncode == 0 and "class A" in query.stdout
@@ -0,0 +1,48 @@
+import socket
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import serve
+from utils import tree
+
+
+def test_fetch_from_server(make_jar):
+    jar = make_jar("a.jar", {"org.a.A": ["org.a.B"], "org.a.B": []})
+    index = serve.StubIndex([(jar, tree.build_jar_file_tree(jar)[1])])
+    handler = type("BoundStubRequestHandler", (serve.StubRequestHandler,), {"index": index})
+    with ThreadingHTTPServer(("127.0.0.1", 0), handler) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            fetch = serve.fetch_from_url(f"http://127.0.0.1:{server.server_port}")
+            assert "class A" in fetch("org.a")
+            assert fetch("org.missing") is None
+        finally:
+            server.shutdown()
+            index.close()
+
+
+def test_unreachable_server_falls_through():
+    # Bound but never listening, so connections are refused
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        fetch = serve.fetch_from_url(f"http://127.0.0.1:{sock.getsockname()[1]}")
+        assert fetch("org.a") is None
+
+
+def test_unresponsive_server_times_out_once():
+    # Listening but never answering, like a host dropping packets after the handshake
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        fetch = serve.fetch_from_url(f"http://127.0.0.1:{sock.getsockname()[1]}", timeout=0.2)
+
+        start = time.perf_counter()
+        assert fetch("org.a") is None
+        assert time.perf_counter() - start < 2
+
+        # The server is not asked again until the retry interval passes
+        start = time.perf_counter()
+        assert fetch("org.b") is None
+        assert time.perf_counter() - start < 0.1
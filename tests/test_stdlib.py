@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import stdlib
+
+
+def test_shipped_bundle_matches_its_manifest():
+    with stdlib.open_bundle("17") as bundle:
+        packages = stdlib.read_manifest(bundle)["packages"]
+        assert {"java.lang", "java.util", "javax.swing"} <= packages.keys()
+        for package, info in packages.items():
+            stdlib.read_package(bundle, package, info["sha256"])
+
+
+def test_install_referenced_packages_and_their_requirements(tmp_path):
+    unpacked, skipped = stdlib.install_stdlib("17", str(tmp_path), ["java.util"])
+    assert skipped == 0
+    assert os.path.isfile(stdlib.package_module_path(str(tmp_path), "java.util"))
+    assert os.path.isfile(stdlib.package_module_path(str(tmp_path), "java.lang"))
+    assert not os.path.exists(stdlib.package_module_path(str(tmp_path), "javax.swing"))
+
+    assert stdlib.install_stdlib("17", str(tmp_path), ["java.util"]) == (0, unpacked)
+
+
+def test_missing_bundle_explains_how_to_get_one(tmp_path):
+    with pytest.raises(stdlib.BundleIntegrityError, match="python stdlib.py build"):
+        stdlib.open_bundle("8", str(tmp_path))
+
+
+def test_missing_bundle_is_a_cli_error(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "main.py", "--stdlib", "8", "--stdlib-dir", str(tmp_path), "-o", str(tmp_path / "out")],
+        cwd=root, capture_output=True, text=True
+    )
+    assert result.returncode == 1
+    assert "No standard library bundle for JDK 8" in result.stderr
+    assert "Traceback" not in result.stderr
+    assert not (tmp_path / "out").exists()
@@ -0,0 +1,108 @@
+import base64
+import hashlib
+import os
+import sys
+import zipfile
+
+import pytest
+
+from utils import stub_output
+
+
+def write_stubs(writer) -> None:
+    writer.write("org/example/Foo.py", "class Foo: pass\n")
+    writer.write_package("org", "ROOT = 1\n")
+    writer.write("Top.py", "class Top: pass\n")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_directory_writer(tmp_path, workers):
+    with stub_output.DirectoryWriter(str(tmp_path), batch_bytes=1, workers=workers) as writer:
+        write_stubs(writer)
+
+    assert (tmp_path / "org" / "example" / "Foo.py").read_text() == "class Foo: pass\n"
+    assert (tmp_path / "org" / "__init__.py").read_text() == "ROOT = 1\n"
+    assert (tmp_path / "org" / "example" / "__init__.py").read_text() == ""
+    assert (tmp_path / "Top.py").exists()
+    assert writer.files == 4
+
+
+def test_directory_writer_keeps_existing_package_modules(tmp_path):
+    (tmp_path / "org").mkdir()
+    (tmp_path / "org" / "__init__.py").write_text("KEPT = 1\n")
+    with stub_output.DirectoryWriter(str(tmp_path), layout=["org/Foo.py"]) as writer:
+        writer.write("org/Foo.py", "")
+
+    assert (tmp_path / "org" / "__init__.py").read_text() == "KEPT = 1\n"
+
+
+def test_archive_writer(tmp_path):
+    path = tmp_path / "stubs.zip"
+    with stub_output.open_archive(str(path)) as writer:
+        assert type(writer) is stub_output.ArchiveWriter
+        write_stubs(writer)
+
+    with zipfile.ZipFile(path) as archive:
+        assert sorted(archive.namelist()) == ["Top.py", "org/__init__.py", "org/example/Foo.py", "org/example/__init__.py"]
+        assert archive.read("org/example/__init__.py") == b""
+        assert {i.date_time for i in archive.infolist()} == {stub_output.ARCHIVE_DATE_TIME}
+
+    # The archive is importable as is
+    sys.path.insert(0, str(path))
+    try:
+        import org
+        from org.example import Foo
+        assert org.ROOT == 1 and Foo.Foo.__name__ == "Foo"
+    finally:
+        sys.path.remove(str(path))
+        for module in ("org", "org.example", "org.example.Foo"):
+            sys.modules.pop(module, None)
+
+
+def test_archives_are_reproducible(tmp_path):
+    contents = []
+    for name in ("a.zip", "b.zip"):
+        with stub_output.open_archive(str(tmp_path / name)) as writer:
+            write_stubs(writer)
+        contents.append((tmp_path / name).read_bytes())
+    assert contents[0] == contents[1]
+
+
+def test_archive_writer_rejects_duplicates(tmp_path):
+    with stub_output.open_archive(str(tmp_path / "stubs.zip")) as writer:
+        writer.write("A.py", "")
+        with pytest.raises(Exception, match="Duplicate archive entry A.py"):
+            writer.write("A.py", "")
+
+
+def test_wheel_writer(tmp_path):
+    path = tmp_path / "java_stubs-1.0-py3-none-any.whl"
+    with stub_output.open_archive(str(path)) as writer:
+        assert type(writer) is stub_output.WheelWriter
+        write_stubs(writer)
+
+    dist_info = "java_stubs-1.0.dist-info"
+    with zipfile.ZipFile(path) as wheel:
+        names = wheel.namelist()
+        assert {f"{dist_info}/{n}" for n in ("METADATA", "WHEEL", "top_level.txt", "RECORD")} <= set(names)
+        assert wheel.read(f"{dist_info}/top_level.txt") == b"org\n"
+        assert b"Name: java_stubs\nVersion: 1.0\n" in wheel.read(f"{dist_info}/METADATA")
+
+        record = {}
+        for line in wheel.read(f"{dist_info}/RECORD").decode("utf-8").splitlines():
+            name, digest, size = line.split(",")
+            record[name] = (digest, size)
+        assert record.keys() == set(names)
+        assert record[f"{dist_info}/RECORD"] == ("", "")
+        for name in names:
+            if name == f"{dist_info}/RECORD":
+                continue
+            data = wheel.read(name)
+            digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b"=").decode("ascii")
+            assert record[name] == (f"sha256={digest}", str(len(data)))
+
+
+def test_wheel_name_is_validated(tmp_path):
+    with pytest.raises(Exception, match="must be named"):
+        stub_output.open_archive(str(tmp_path / "stubs.whl"))
+    assert not os.path.exists(tmp_path / "stubs.whl")
@@ -0,0 +1,79 @@
+import generator
+from utils.symbols import SymbolIndex, split_imports
+
+
+def index_of(*names: str) -> SymbolIndex:
+    index = SymbolIndex()
+    for name in names:
+        index.add(name, name.split("$")[0])
+    return index
+
+
+def test_split_imports():
+    assert split_imports(["a.b.C", "d.e.*", "f.G"]) == ({"C": "a.b.C", "G": "f.G"}, ("d.e",))
+
+
+def test_resolve_precedence():
+    index = index_of("a.Name", "b.Name", "c.Name", "java.lang.Name")
+    assert index.resolve("Name", "b", {"Name": "a.Name"}, ("c",)) == "a.Name"
+    assert index.resolve("Name", "b", {}, ("c",)) == "b.Name"
+    assert index.resolve("Name", "x", {}, ("c",)) == "c.Name"
+    assert index.resolve("Name", "x", {}, ("y",)) == "java.lang.Name"
+
+
+def test_resolve_fallbacks():
+    index = index_of("a.A", "a.A$Inner")
+    assert "a.A$Inner" in index
+    # Nested classes are not resolvable by their simple name alone
+    assert index.resolve("Inner", "b", {}, ("a",)) is None
+    assert index.resolve("String", "b", {}, ("a",)) == "java.lang.String"
+    assert index.resolve("Missing", "b", {}, ()) == "b.Missing"
+    assert index.resolve("Missing", "b", {}, ("a",)) is None
+
+
+def store(source: str, file: str) -> None:
+    generator.store_java_data(file, generator.parse_java_source(source, file))
+
+
+def test_propagate_qualifies_collected_classes():
+    store("package a; import b.*; public class A { B b; Unknown u; }", "A")
+    store("package b; public class B {}", "B")
+
+    assert generator.propagate_java_data() == (1, 1)
+    assert generator.java_data["a.A"]["A"].body[0].type.full_name == "b.B"
+    assert "from b import B" in generator.render_python_module(generator.java_data["a.A"])
+
+
+def test_propagate_patches_emitted_modules(tmp_path):
+    generator.enable_streaming_emission(str(tmp_path))
+    store("package a; import b.*; public class A { B b; }", "A")
+    store("package b; public class B {}", "B")
+
+    assert generator.propagate_java_data() == (1, 0)
+    assert "from b import B" in (tmp_path / "A.py").read_text()
+
+
+def test_propagate_skips_overwritten_flat_modules(tmp_path, capsys):
+    generator.enable_streaming_emission(str(tmp_path))
+    store("package a; public class Util { Helper helper; }", "Util")
+    store("package a; public class Helper {}", "Helper")
+    store("package b; public class Util { }", "Util")
+
+    generator.propagate_java_data()
+    # The module now holds b.Util, which must not receive the imports resolved for a.Util
+    assert "Helper" not in (tmp_path / "Util.py").read_text()
+
+    generator.generate_python_files(str(tmp_path))
+    assert "1 file overwritten" in capsys.readouterr().err
+    assert generator.symbol_summary["a.Util"] == "a.Util"
+    assert generator.symbol_summary["b.Util"] == "b.Util"
+
+
+def test_flat_collisions_are_reported(tmp_path, capsys):
+    store("package a; public class Util {}", "Util")
+    store("package b; public class Util {}", "Util")
+    store("package c; public class Other {}", "Other")
+
+    generator.generate_python_files(str(tmp_path))
+    assert "1 file overwritten by a file of the same name from another package" in capsys.readouterr().err
+    assert "package b" not in (tmp_path / "Util.py").read_text()
@@ -0,0 +1,77 @@
+from utils import tree
+
+
+def build(*paths: str) -> tree.Tree:
+    _, file_tree = tree.build_class_file_tree(path + ".class" for path in paths)
+    return file_tree
+
+
+def files(file_tree: tree.Tree) -> set:
+    return {"/".join(path + [file]) for path, file in tree.iter_tree_files(file_tree)}
+
+
+PATHS = (
+    "org/jd/core/Loader",
+    "org/jd/core/internal/Util",
+    "org/jd/gui/App",
+    "org/slf4j/Logger",
+    "com/vendor/a/internal/Secret",
+    "com/vendor/a/Api",
+    "com/vendor/b/c/internal/Hidden",
+)
+
+
+def test_include_literal():
+    file_tree = build(*PATHS)
+    matched = tree.filter_tree(file_tree, tree.PatternTrie(["org.jd.core"]), None)
+    assert files(file_tree) == {"org/jd/core/Loader", "org/jd/core/internal/Util"}
+    assert matched == {"org.jd.core"}
+
+
+def test_include_single_segment_wildcard():
+    file_tree = build(*PATHS)
+    matched = tree.filter_tree(file_tree, tree.PatternTrie(["com.vendor.*.internal"]), None)
+    assert files(file_tree) == {"com/vendor/a/internal/Secret"}
+    assert matched == {"com.vendor.*.internal"}
+
+
+def test_include_globstar():
+    file_tree = build(*PATHS)
+    matched = tree.filter_tree(file_tree, tree.PatternTrie(["com.**.internal"]), None)
+    assert files(file_tree) == {"com/vendor/a/internal/Secret", "com/vendor/b/c/internal/Hidden"}
+    assert matched == {"com.**.internal"}
+
+
+def test_overlapping_includes_all_match():
+    file_tree = build(*PATHS)
+    matched = tree.filter_tree(file_tree, tree.PatternTrie(["org", "org.jd", "org.jd.gui.App"]), None)
+    assert files(file_tree) == {"org/jd/core/Loader", "org/jd/core/internal/Util", "org/jd/gui/App", "org/slf4j/Logger"}
+    assert matched == {"org", "org.jd", "org.jd.gui.App"}
+
+
+def test_overlapping_include_missing_is_unmatched():
+    file_tree = build(*PATHS)
+    matched = tree.filter_tree(file_tree, tree.PatternTrie(["org", "org.missing"]), None)
+    assert matched == {"org"}
+
+
+def test_overlapping_globstar_includes():
+    file_tree = build(*PATHS)
+    matched = tree.filter_tree(file_tree, tree.PatternTrie(["com", "com.**.internal"]), None)
+    assert len(files(file_tree)) == 3
+    assert matched == {"com", "com.**.internal"}
+
+
+def test_exclude_inside_include():
+    file_tree = build(*PATHS)
+    matched = tree.filter_tree(file_tree, tree.PatternTrie(["org.jd"]), tree.PatternTrie(["**.internal"]))
+    assert files(file_tree) == {"org/jd/core/Loader", "org/jd/gui/App"}
+    assert matched == {"org.jd", "**.internal"}
+
+
+def test_exclude_only():
+    file_tree = build(*PATHS)
+    matched = tree.filter_tree(file_tree, None, tree.PatternTrie(["org.jd.*", "com.vendor.Api*"]))
+    assert files(file_tree) == {"org/slf4j/Logger", "com/vendor/a/internal/Secret", "com/vendor/a/Api",
+                                "com/vendor/b/c/internal/Hidden"}
+    assert matched == {"org.jd.*"}
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from utils.zip_directory import ZipDirectory
+
+# Bump whenever the layout of cached output changes, invalidating every existing entry
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_SIZE = 2048  # MiB
+
+
+def default_cache_dir() -> str:
+    """
+    Gets the default decompile cache directory, honouring `XDG_CACHE_HOME` when set.
+
+    Returns:
+        The default cache directory path.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "jash")
+
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Computes the SHA-256 digest of a file's contents.
+
+    Args:
+        path: The file to hash.
+        block_size: The number of bytes read at a time.
+
+    Returns:
+        The hex digest of the file.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def jar_entry_crcs(jar: str) -> Dict[str, int]:
+    """
+    Reads the CRC-32 of every class entry from a jar's central directory.
+
+    Args:
+        jar: The jar to read.
+
+    Returns:
+        A mapping of entry name to CRC-32.
+    """
+    with ZipDirectory(jar) as jar_file:
+        return {name: crc for name, crc in jar_file.crcs() if name.endswith(".class")}
+
+
+def selection_variant(entries: Iterable[str]) -> str:
+    """
+    Computes a cache key variant identifying a subset of a jar's entries.
+
+    Args:
+        entries: The selected entry names.
+
+    Returns:
+        The hex digest of the sorted entry names.
+    """
+    return hashlib.sha256("\n".join(sorted(entries)).encode()).hexdigest()
+
+
+def directory_size(path: str) -> int:
+    """
+    Recursively sums the size of all files in a directory.
+
+    Args:
+        path: The directory to measure.
+
+    Returns:
+        The total size in bytes.
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            total += os.path.getsize(os.path.join(root, file))
+    return total
+
+
+class DecompileCache:
+    """
+    An on-disk, size-capped LRU cache of decompiled jar sources.
+
+    Entries are keyed by the SHA-256 of the jar's contents. Each entry directory holds the
+    decompiled sources under `src/` and a `manifest.json` recording the entry size and the
+    CRC-32 of every class entry in the jar. The manifest's modification time doubles as the
+    entry's last use time for eviction.
+
+    Storing an entry never evicts others, as several jars may be fetched and read at once.
+    Call `evict` once every fetched entry has been read, to bring the cache back under its cap.
+    """
+
+    MANIFEST = "manifest.json"
+    SOURCES = "src"
+
+    def __init__(self, cache_dir: str, max_size: int):
+        """
+        Creates a new DecompileCache instance.
+
+        Args:
+            cache_dir: The directory holding all cache entries.
+            max_size: The maximum total size of all entries, in bytes.
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, jar: str, variant: str = "") -> str:
+        """
+        Computes the cache key of a jar.
+
+        Args:
+            jar: The jar to compute the key for.
+            variant: Extra data distinguishing different decompilations of the same jar.
+
+        Returns:
+            The cache key.
+        """
+        digest = hashlib.sha256(f"v{CACHE_VERSION}:{hash_file(jar)}:{variant}".encode())
+        return digest.hexdigest()
+
+    def lookup(self, key: str, jar: str) -> Optional[str]:
+        """
+        Looks up the decompiled sources for a key, marking the entry as recently used.
+
+        An entry is only considered a hit if its recorded entry CRCs still match the jar.
+
+        Args:
+            key: The cache key, as returned by `key`.
+            jar: The jar the key was computed from.
+
+        Returns:
+            The path to the decompiled sources, or None on a miss.
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        manifest_path = os.path.join(entry_dir, self.MANIFEST)
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if manifest.get("entries") != jar_entry_crcs(jar):
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+
+        os.utime(manifest_path)
+        return os.path.join(entry_dir, self.SOURCES)
+
+    def store(self, key: str, jar: str, decompile: Callable[[str], None]) -> str:
+        """
+        Decompiles a jar into a new cache entry.
+
+        Decompilation happens in a staging directory that is only moved into place once it
+        succeeds, so interrupted runs never leave partial entries behind.
+
+        Args:
+            key: The cache key, as returned by `key`.
+            jar: The jar being decompiled.
+            decompile: Called with the output directory to perform the decompilation.
+
+        Returns:
+            The path to the decompiled sources.
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        staging_dir = f"{entry_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        os.makedirs(os.path.join(staging_dir, self.SOURCES))
+
+        try:
+            decompile(os.path.join(staging_dir, self.SOURCES))
+            manifest = {
+                "jar": os.path.basename(jar),
+                "created": time.time(),
+                "size": directory_size(staging_dir),
+                "entries": jar_entry_crcs(jar)
+            }
+            with open(os.path.join(staging_dir, self.MANIFEST), "w") as f:
+                json.dump(manifest, f)
+
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(staging_dir, entry_dir)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+        return os.path.join(entry_dir, self.SOURCES)
+
+    def fetch(self, jar: str, decompile: Callable[[str], None], variant: str = "") -> str:
+        """
+        Gets the decompiled sources of a jar, decompiling only on a cache miss.
+
+        Args:
+            jar: The jar to get the sources of.
+            decompile: Called with the output directory to perform the decompilation.
+            variant: Extra data distinguishing different decompilations of the same jar.
+
+        Returns:
+            The path to the decompiled sources.
+        """
+        key = self.key(jar, variant)
+        sources = self.lookup(key, jar)
+        if sources is None:
+            sources = self.store(key, jar, decompile)
+        return sources
+
+    def evict(self) -> None:
+        """
+        Removes least recently used entries until the cache fits within `max_size`.
+
+        Entries are deleted even if their sources are still being read, so this must only be
+        called once every entry fetched is no longer needed.
+        """
+        entries = []
+        total = 0
+        for key in os.listdir(self.cache_dir):
+            manifest_path = os.path.join(self.cache_dir, key, self.MANIFEST)
+            try:
+                with open(manifest_path, "r") as f:
+                    size = json.load(f).get("size", 0)
+                last_used = os.path.getmtime(manifest_path)
+            except (OSError, ValueError):
+                continue
+            entries.append((last_used, key, size))
+            total += size
+
+        for _, key, size in sorted(entries):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+            total -= size
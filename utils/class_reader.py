@@ -0,0 +1,429 @@
+import struct
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from java_model.jash_type import JashType, WILDCARD
+from java_model.jash_type_parameter import JashTypeParameter
+
+CLASS_MAGIC = 0xCAFEBABE
+
+# Access flags shared by classes, fields and methods
+ACC_PUBLIC = 0x0001
+ACC_PRIVATE = 0x0002
+ACC_PROTECTED = 0x0004
+ACC_STATIC = 0x0008
+ACC_FINAL = 0x0010
+ACC_SYNCHRONIZED = 0x0020
+ACC_BRIDGE = 0x0040
+ACC_VARARGS = 0x0080
+ACC_NATIVE = 0x0100
+ACC_INTERFACE = 0x0200
+ACC_ABSTRACT = 0x0400
+ACC_SYNTHETIC = 0x1000
+ACC_ANNOTATION = 0x2000
+ACC_ENUM = 0x4000
+
+MODIFIER_FLAGS = [
+    (ACC_PUBLIC, "public"),
+    (ACC_PRIVATE, "private"),
+    (ACC_PROTECTED, "protected"),
+    (ACC_STATIC, "static"),
+    (ACC_FINAL, "final"),
+    (ACC_ABSTRACT, "abstract"),
+]
+
+BASE_TYPES = {
+    "B": "byte",
+    "C": "char",
+    "D": "double",
+    "F": "float",
+    "I": "int",
+    "J": "long",
+    "S": "short",
+    "Z": "boolean",
+    "V": "void",
+}
+
+# Constant pool tag -> size in bytes of the entry body, for entries that are skipped
+CONSTANT_UTF8 = 1
+CONSTANT_LONG = 5
+CONSTANT_DOUBLE = 6
+CONSTANT_CLASS = 7
+CONSTANT_SIZES = {3: 4, 4: 4, 5: 8, 6: 8, 7: 2, 8: 2, 9: 4, 10: 4, 11: 4, 12: 4, 15: 3, 16: 2, 17: 4, 18: 4, 19: 2, 20: 2}
+
+
+class ClassFormatError(Exception):
+    """Raised when a class file is malformed or uses an unsupported constant."""
+    pass
+
+
+class MemberInfo(NamedTuple):
+    """A field or method read from a class file."""
+    access_flags: int
+    name: str
+    descriptor: str
+    attributes: Dict[str, Any]
+
+
+class ClassInfo(NamedTuple):
+    """The declaration-level contents of a class file."""
+    access_flags: int
+    name: str
+    super_name: Optional[str]
+    interfaces: List[str]
+    fields: List[MemberInfo]
+    methods: List[MemberInfo]
+    attributes: Dict[str, Any]
+
+
+def modifiers_from_flags(flags: int) -> List[str]:
+    """
+    Converts access flags into Java modifier keywords.
+
+    Args:
+        flags: The access flags.
+
+    Returns:
+        The modifiers, in Java declaration order.
+    """
+    return [name for flag, name in MODIFIER_FLAGS if flags & flag]
+
+
+def decode_modified_utf8(data: bytes) -> str:
+    """
+    Decodes the modified UTF-8 encoding used by class file constant pools.
+
+    Args:
+        data: The encoded string.
+
+    Returns:
+        The decoded string.
+    """
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        text = data.replace(b"\xc0\x80", b"\x00").decode("utf-8", "surrogatepass")
+        return text.encode("utf-16", "surrogatepass").decode("utf-16")
+
+
+class ClassReader:
+    """
+    Reads the declarations of a class file: its names, members and their signatures.
+
+    Method bodies and other attributes that only matter at runtime are skipped over
+    without being decoded.
+    """
+
+    def __init__(self, data: bytes):
+        """
+        Creates a new ClassReader instance.
+
+        Args:
+            data: The raw bytes of the class file.
+        """
+        self.data = data
+        self.offset = 0
+        self.pool: List[Any] = []
+
+    def u1(self) -> int:
+        value = self.data[self.offset]
+        self.offset += 1
+        return value
+
+    def u2(self) -> int:
+        value, = struct.unpack_from(">H", self.data, self.offset)
+        self.offset += 2
+        return value
+
+    def u4(self) -> int:
+        value, = struct.unpack_from(">I", self.data, self.offset)
+        self.offset += 4
+        return value
+
+    def utf8(self, index: int) -> str:
+        return self.pool[index]
+
+    def class_name(self, index: int) -> Optional[str]:
+        if index == 0:
+            return None
+        return self.pool[self.pool[index][1]].replace("/", ".")
+
+    def read(self) -> ClassInfo:
+        """
+        Reads the class file.
+
+        Returns:
+            The declaration-level contents of the class.
+
+        Raises:
+            ClassFormatError: If the data is not a valid class file.
+        """
+        try:
+            if self.u4() != CLASS_MAGIC:
+                raise ClassFormatError("Invalid class file magic.")
+            self.offset += 4  # minor and major version
+            self.read_constant_pool()
+
+            access_flags = self.u2()
+            name = self.class_name(self.u2())
+            super_name = self.class_name(self.u2())
+            interfaces = [self.class_name(self.u2()) for _ in range(self.u2())]
+            fields = [self.read_member() for _ in range(self.u2())]
+            methods = [self.read_member() for _ in range(self.u2())]
+            attributes = self.read_attributes()
+        except (IndexError, struct.error, TypeError) as e:
+            raise ClassFormatError(f"Truncated or malformed class file: {e}")
+
+        return ClassInfo(access_flags, name, super_name, interfaces, fields, methods, attributes)
+
+    def read_constant_pool(self) -> None:
+        count = self.u2()
+        self.pool = [None] * count
+        i = 1
+        while i < count:
+            tag = self.u1()
+            if tag == CONSTANT_UTF8:
+                length = self.u2()
+                self.pool[i] = decode_modified_utf8(self.data[self.offset:self.offset + length])
+                self.offset += length
+            elif tag == CONSTANT_CLASS:
+                self.pool[i] = (tag, self.u2())
+            elif tag in CONSTANT_SIZES:
+                self.offset += CONSTANT_SIZES[tag]
+            else:
+                raise ClassFormatError(f"Unknown constant pool tag {tag}.")
+
+            # Longs and doubles take up two constant pool slots
+            i += 2 if tag in (CONSTANT_LONG, CONSTANT_DOUBLE) else 1
+
+    def read_member(self) -> MemberInfo:
+        access_flags = self.u2()
+        name = self.utf8(self.u2())
+        descriptor = self.utf8(self.u2())
+        return MemberInfo(access_flags, name, descriptor, self.read_attributes())
+
+    def read_attributes(self) -> Dict[str, Any]:
+        attributes = {}
+        for _ in range(self.u2()):
+            name = self.utf8(self.u2())
+            length = self.u4()
+            end = self.offset + length
+
+            if name == "Signature":
+                attributes[name] = self.utf8(self.u2())
+            elif name == "Exceptions":
+                attributes[name] = [self.class_name(self.u2()) for _ in range(self.u2())]
+            elif name == "MethodParameters":
+                parameters = []
+                for _ in range(self.u1()):
+                    name_index = self.u2()
+                    self.offset += 2  # access flags
+                    parameters.append(self.utf8(name_index) if name_index else None)
+                attributes[name] = parameters
+            elif name == "InnerClasses":
+                inner_classes = []
+                for _ in range(self.u2()):
+                    inner_name = self.class_name(self.u2())
+                    outer_name = self.class_name(self.u2())
+                    simple_name_index = self.u2()
+                    simple_name = self.utf8(simple_name_index) if simple_name_index else None
+                    inner_classes.append((inner_name, outer_name, simple_name, self.u2()))
+                attributes[name] = inner_classes
+            elif name == "Deprecated":
+                attributes[name] = True
+            elif name == "RuntimeVisibleAnnotations":
+                attributes[name] = [self.read_annotation() for _ in range(self.u2())]
+
+            self.offset = end
+        return attributes
+
+    def read_annotation(self) -> str:
+        type_name = self.utf8(self.u2())
+        for _ in range(self.u2()):
+            self.offset += 2  # element name
+            self.skip_element_value()
+        return parse_field_signature(type_name).full_name
+
+    def skip_element_value(self) -> None:
+        tag = chr(self.u1())
+        if tag == "e":
+            self.offset += 4
+        elif tag == "@":
+            self.read_annotation()
+        elif tag == "[":
+            for _ in range(self.u2()):
+                self.skip_element_value()
+        else:
+            self.offset += 2
+
+
+def read_class(data: bytes) -> ClassInfo:
+    """
+    Reads the declaration-level contents of a class file.
+
+    Args:
+        data: The raw bytes of the class file.
+
+    Returns:
+        The class contents.
+    """
+    return ClassReader(data).read()
+
+
+class SignatureParser:
+    """
+    Parses descriptors and generic signatures (JVMS §4.3, §4.7.9.1) into Jash types.
+    """
+
+    def __init__(self, signature: str):
+        self.signature = signature
+        self.offset = 0
+
+    def peek(self) -> str:
+        return self.signature[self.offset] if self.offset < len(self.signature) else ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ClassFormatError(f"Expected '{char}' at {self.offset} in signature '{self.signature}'.")
+        self.offset += 1
+
+    def check_not_at_end(self) -> None:
+        if self.offset >= len(self.signature):
+            raise ClassFormatError(f"Unexpected end of signature '{self.signature}'.")
+
+    def identifier(self, terminators: str) -> str:
+        start = self.offset
+        while self.peek() and self.peek() not in terminators:
+            self.offset += 1
+        return self.signature[start:self.offset]
+
+    def type_parameters(self) -> List[JashTypeParameter]:
+        if self.peek() != "<":
+            return []
+        self.offset += 1
+        parameters = []
+        while self.peek() != ">":
+            self.check_not_at_end()
+            name = self.identifier(":")
+            bounds = []
+            while self.peek() == ":":
+                self.offset += 1
+                # The class bound may be empty when only interface bounds are given
+                if self.peek() not in ":>":
+                    bounds.append(self.field_type())
+            parameters.append(JashTypeParameter(name, [b for b in bounds if b.full_name != "java.lang.Object"]))
+        self.offset += 1
+        return parameters
+
+    def field_type(self) -> JashType:
+        char = self.peek()
+        if char in BASE_TYPES:
+            self.offset += 1
+            return JashType(BASE_TYPES[char])
+        if char == "[":
+            self.offset += 1
+            return self.field_type().with_dimensions(1)
+        if char == "T":
+            self.offset += 1
+            name = self.identifier(";")
+            self.expect(";")
+            return JashType(name)
+        if char == "L":
+            return self.class_type()
+        raise ClassFormatError(f"Unexpected '{char}' at {self.offset} in signature '{self.signature}'.")
+
+    def class_type(self) -> JashType:
+        self.expect("L")
+        name = self.identifier("<.;").replace("/", ".")
+        arguments = self.type_arguments()
+        # Member classes of parameterised types, e.g. Outer<T>.Inner<U>
+        while self.peek() == ".":
+            self.offset += 1
+            name += "$" + self.identifier("<.;")
+            arguments = self.type_arguments()
+        self.expect(";")
+        return JashType(name, parameters=arguments)
+
+    def type_arguments(self) -> List[JashType]:
+        if self.peek() != "<":
+            return []
+        self.offset += 1
+        arguments = []
+        while self.peek() != ">":
+            self.check_not_at_end()
+            char = self.peek()
+            if char == "*":
+                self.offset += 1
+                arguments.append(JashType(WILDCARD))
+            elif char == "+":
+                self.offset += 1
+                arguments.append(JashType(WILDCARD, implements=self.field_type(), modifiers=["extends"]))
+            elif char == "-":
+                self.offset += 1
+                self.field_type()
+                arguments.append(JashType(WILDCARD, modifiers=["super"]))
+            else:
+                arguments.append(self.field_type())
+        self.offset += 1
+        return arguments
+
+    def class_signature(self) -> Tuple[List[JashTypeParameter], JashType, List[JashType]]:
+        type_parameters = self.type_parameters()
+        super_type = self.class_type()
+        interfaces = []
+        while self.peek():
+            interfaces.append(self.class_type())
+        return type_parameters, super_type, interfaces
+
+    def method_signature(self) -> Tuple[List[JashTypeParameter], List[JashType], JashType, List[JashType]]:
+        type_parameters = self.type_parameters()
+        self.expect("(")
+        parameters = []
+        while self.peek() != ")":
+            self.check_not_at_end()
+            parameters.append(self.field_type())
+        self.offset += 1
+        return_type = self.field_type()
+        throws = []
+        while self.peek() == "^":
+            self.offset += 1
+            throws.append(self.field_type())
+        return type_parameters, parameters, return_type, throws
+
+
+def parse_field_signature(signature: str) -> JashType:
+    """
+    Parses a field descriptor or generic field signature.
+
+    Args:
+        signature: The descriptor or signature.
+
+    Returns:
+        The field type.
+    """
+    return SignatureParser(signature).field_type()
+
+
+def parse_class_signature(signature: str) -> Tuple[List[JashTypeParameter], JashType, List[JashType]]:
+    """
+    Parses a generic class signature.
+
+    Args:
+        signature: The signature.
+
+    Returns:
+        The type parameters, superclass and interfaces of the class.
+    """
+    return SignatureParser(signature).class_signature()
+
+
+def parse_method_signature(signature: str) -> Tuple[List[JashTypeParameter], List[JashType], JashType, List[JashType]]:
+    """
+    Parses a method descriptor or generic method signature.
+
+    Args:
+        signature: The descriptor or signature.
+
+    Returns:
+        The type parameters, parameter types, return type and thrown types of the method.
+    """
+    return SignatureParser(signature).method_signature()
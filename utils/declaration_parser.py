@@ -0,0 +1,294 @@
+"""
+A declaration-level front end for javalang.
+
+Stubs only need declarations, yet a full parse builds the AST of every statement and
+expression in every method body. This module tokenizes a source with a single regular
+expression and, while doing so, jumps over method, constructor and initializer bodies, field
+initializers and anonymous class bodies by bracket matching, without tokenizing them. The
+remaining tokens, with each body left empty and each initializer replaced by `null`, are
+handed to javalang's own parser, so the resulting declarations are identical to a full parse.
+"""
+
+import re
+from typing import Iterator, List, Tuple
+
+import javalang.parser
+import javalang.tree
+from javalang.tokenizer import (Annotation, BinaryInteger, Boolean, DecimalFloatingPoint, DecimalInteger,
+                                HexFloatingPoint, HexInteger, Identifier, JavaToken, JavaTokenizer, Keyword,
+                                LexerError, Null, OctalInteger, Operator, Position, Separator, String, BasicType,
+                                Modifier)
+
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>\"\"\"(?:[^\\]|\\.)*?\"\"\"|"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<number>0[xX][0-9a-fA-F_]*(?:\.[0-9a-fA-F_]*)?(?:[pP][+-]?[0-9_]+)?[lLfFdD]?
+      | 0[bB][01_]+[lL]?
+      | (?:[0-9][0-9_]*(?:\.(?![.])[0-9_]*)?|\.[0-9][0-9_]*)(?:[eE][+-]?[0-9_]+)?[lLfFdD]?)
+  | (?P<identifier>(?:[^\W\d]|\$)[\w$]*)
+  | (?P<operator>>>>=|>>=|<<=|\.\.\.|->|::|\+\+|--|&&|\|\||[=!<>+\-*/%&|^]=|<<|[=<>!~?:+\-*/&|^%])
+  | (?P<separator>[(){}\[\];,.])
+  | (?P<annotation>@)
+""", re.VERBOSE | re.DOTALL)
+
+# Only the brackets, and the literals and comments that may hide them, matter inside a skipped region
+SKIPPED_LITERALS = r"""\"\"\"(?:[^\\]|\\.)*?\"\"\"|"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'|//[^\n]*|/\*.*?\*/"""
+SKIP_PATTERN = re.compile(SKIPPED_LITERALS + r"|[(){}\[\];,]", re.DOTALL)
+BLOCK_PATTERN = re.compile(SKIPPED_LITERALS + r"|[{}]", re.DOTALL)
+
+WORD_TYPES = {}
+for _token_type in (Keyword, Modifier, BasicType):
+    WORD_TYPES.update(dict.fromkeys(_token_type.VALUES, _token_type))
+WORD_TYPES.update(dict.fromkeys(Boolean.VALUES, Boolean))
+WORD_TYPES["null"] = Null
+
+# Pattern group -> a function of the matched text giving its javalang token type
+TOKEN_TYPES = {
+    "identifier": lambda value: WORD_TYPES.get(value, Identifier),
+    "separator": lambda value: Separator,
+    "operator": lambda value: Operator,
+    "string": lambda value: String,
+    "number": lambda value: number_type(value),
+    "annotation": lambda value: Annotation,
+}
+
+TYPE_KEYWORDS = frozenset(["class", "interface", "enum"])
+OPENING = frozenset("([{")
+CLOSING = frozenset(")]}")
+
+
+def number_type(value: str) -> type:
+    """Gets the javalang literal type of a number, as its tokenizer would."""
+    if value[:2] in ("0x", "0X"):
+        return HexFloatingPoint if any(c in value for c in ".pP") else HexInteger
+    if value[:2] in ("0b", "0B"):
+        return BinaryInteger
+    if any(c in value for c in ".eE") or (value[-1] in "fFdD"):
+        return DecimalFloatingPoint
+    if len(value) > 1 and value[0] == "0" and value.rstrip("lL").isdigit():
+        return OctalInteger
+    return DecimalInteger
+
+
+def skip_block(data: str, pos: int) -> int:
+    """
+    Finds the end of a brace-delimited block.
+
+    Args:
+        data: The source.
+        pos: The position just after the block's opening brace.
+
+    Returns:
+        The position of the block's closing brace.
+
+    Raises:
+        LexerError: If the block is never closed.
+    """
+    depth = 1
+    for match in BLOCK_PATTERN.finditer(data, pos):
+        char = match.group()
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if not depth:
+                return match.start()
+    raise LexerError("Unterminated block")
+
+
+def skip_expression(data: str, pos: int) -> Tuple[int, bool]:
+    """
+    Finds the end of an initializer or default value.
+
+    Args:
+        data: The source.
+        pos: The position the expression starts at.
+
+    Returns:
+        The position of the `;` ending the expression, and whether a comma was found outside
+        of any brackets, in which case the expression may be followed by more declarators.
+
+    Raises:
+        LexerError: If the expression is never ended.
+    """
+    depth = 0
+    comma = False
+    for match in SKIP_PATTERN.finditer(data, pos):
+        char = match.group()
+        if char in OPENING:
+            depth += 1
+        elif char in CLOSING:
+            depth -= 1
+            if depth < 0:
+                break
+        elif not depth:
+            if char == ";":
+                return match.start(), comma
+            if char == ",":
+                comma = True
+    raise LexerError("Unterminated initializer")
+
+
+class Member:
+    """The declaration being read in a class body, or at the top level of a file."""
+    __slots__ = ("annotation", "constants", "parentheses", "type_keyword", "closed_parameters")
+
+    def __init__(self, type_keyword: str = None):
+        """
+        Creates a new Member, the state of the declarations read in a single body.
+
+        Args:
+            type_keyword: The keyword of the type declaration the body belongs to, if any.
+        """
+        # Only annotation types have default values, and only enums start with their constants
+        self.annotation = type_keyword == "@interface"
+        self.constants = type_keyword == "enum"
+        self.reset()
+
+    def reset(self) -> None:
+        self.parentheses = 0
+        self.type_keyword = None
+        self.closed_parameters = False
+
+
+def tokenize(data: str) -> List[JavaToken]:
+    """
+    Tokenizes a Java source, leaving out everything but its declarations.
+
+    Bodies are replaced by an empty `{ }`, and initializers and annotation default values by
+    `null`, unless an initializer may be followed by more declarators of the same field, in
+    which case it is kept as is.
+
+    Args:
+        data: The Java source.
+
+    Returns:
+        The tokens, as javalang's tokenizer would have produced them for the reduced source.
+
+    Raises:
+        LexerError: If the source cannot be tokenized.
+    """
+    if "\\u" in data:
+        # Unicode escapes may appear anywhere, even in identifiers, so they are decoded first
+        tokenizer = JavaTokenizer(data)
+        tokenizer.pre_tokenize()
+        data = tokenizer.data
+
+    tokens = []
+    append = tokens.append
+    members = [Member()]
+    member = members[0]
+    javadoc = None
+    line = 1
+    line_start = -1
+    last = 0
+    pos = 0
+    length = len(data)
+    match_token = TOKEN_PATTERN.match
+
+    def position(start: int) -> Position:
+        nonlocal line, line_start, last
+        newlines = data.count("\n", last, start)
+        if newlines:
+            line += newlines
+            line_start = data.rfind("\n", last, start)
+        last = start
+        return Position(line, start - line_start)
+
+    while pos < length:
+        match = match_token(data, pos)
+        if match is None:
+            raise LexerError(f"Could not process token at \"{data[pos]}\", line {position(pos).line}")
+        kind = match.lastgroup
+        value = match.group()
+        start = pos
+        pos = match.end()
+
+        if kind == "space":
+            continue
+        if kind == "comment":
+            if value.startswith("/**"):
+                javadoc = value
+            continue
+
+        token_type = TOKEN_TYPES[kind](value)
+        append(token_type(value, position(start), javadoc))
+        javadoc = None
+
+        if token_type is Separator:
+            if value == "(":
+                member.parentheses += 1
+            elif value == ")":
+                member.parentheses -= 1
+                member.closed_parameters = True
+            elif member.parentheses:
+                continue
+            elif value == "{":
+                if member.type_keyword is not None:
+                    member = Member(member.type_keyword)
+                    members.append(member)
+                    continue
+
+                # A method, constructor or initializer body, or the body of an enum constant
+                end = skip_block(data, pos)
+                append(Separator("}", position(end), None))
+                pos = end + 1
+                if not member.constants:
+                    member.reset()
+            elif value == "}":
+                members.pop()
+                if not members:
+                    raise LexerError(f"Unbalanced '}}', line {position(start).line}")
+                member = members[-1]
+                member.reset()
+            elif value == ";":
+                member.constants = False
+                member.reset()
+        elif member.parentheses:
+            continue
+        elif token_type is Keyword and value in TYPE_KEYWORDS:
+            member.type_keyword = "@interface" if len(tokens) > 1 and tokens[-2].value == "@" else value
+        elif (value == "=" and token_type is Operator) or (value == "default" and member.annotation and member.closed_parameters):
+            end, more_declarators = skip_expression(data, pos)
+            if more_declarators:
+                # The expression may hide further declarators, so it is kept for the parser
+                for token in tokenize_plain(data, pos, end, position):
+                    append(token)
+            else:
+                append(Null("null", position(pos), None))
+            pos = end
+
+    return tokens
+
+
+def tokenize_plain(data: str, pos: int, end: int, position) -> Iterator[JavaToken]:
+    """Tokenizes part of a source without skipping anything."""
+    while pos < end:
+        match = TOKEN_PATTERN.match(data, pos)
+        if match is None:
+            raise LexerError(f"Could not process token at \"{data[pos]}\"")
+        kind = match.lastgroup
+        value = match.group()
+        start = pos
+        pos = match.end()
+        if kind == "space" or kind == "comment":
+            continue
+        yield TOKEN_TYPES[kind](value)(value, position(start), None)
+
+
+def parse(data: str) -> javalang.tree.CompilationUnit:
+    """
+    Parses the declarations of a Java source.
+
+    Args:
+        data: The Java source.
+
+    Returns:
+        The compilation unit, with empty method bodies and without initializers.
+
+    Raises:
+        LexerError: If the source cannot be tokenized.
+        javalang.parser.JavaSyntaxError: If the declarations cannot be parsed.
+    """
+    return javalang.parser.Parser(tokenize(data)).parse()
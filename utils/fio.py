@@ -1,7 +1,18 @@
+import contextlib
+import io
 import os
+import shutil
 import subprocess
+import tempfile
+import threading
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import CompletedProcess
-from typing import List, Tuple
+from typing import Iterable, List, Optional, Tuple
+
+from utils import profiling
+from utils.zip_directory import ZipDirectory
 
 
 class FileTypeMismatchError(Exception):
@@ -14,6 +25,11 @@ class FileAccessError(Exception):
     pass
 
 
+class DecompileError(Exception):
+    """Raised when jd-cli fails to decompile a jar."""
+    pass
+
+
 def set_conversion(obj):
     """
     Recursively convert sets to lists for JSON serialization.
@@ -58,5 +74,242 @@ def run_command(cmd: List[str]) -> Tuple[int, str]:
     Returns:
         The process's exit code and stdout.
     """
-    result: CompletedProcess[str] = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    with profiling.command(" ".join(os.path.basename(c) for c in cmd[:3])):
+        result: CompletedProcess[str] = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
     return result.returncode, result.stdout
+
+
+JD_CLI_PATH = "./third-party/jd-cli.jar"
+
+
+def decompile_jar(jar: str, out_dir: str) -> None:
+    """
+    Decompiles a jar into a directory of java sources using jd-cli.
+
+    Args:
+        jar: The jar to decompile.
+        out_dir: The directory to write the decompiled sources to.
+
+    Raises:
+        DecompileError: If jd-cli exits with a non-zero code.
+    """
+    code, output = run_command(["java", "-jar", JD_CLI_PATH, jar, "-od", out_dir])
+    if code != 0:
+        raise DecompileError(decompile_failure_message(jar, output))
+
+
+def decompile_failure_message(jar: str, output: str, max_lines: int = 5) -> str:
+    """
+    Builds the error message for a failed jd-cli run, including the end of its output.
+
+    Args:
+        jar: The jar that failed to decompile.
+        output: The output of the jd-cli process.
+        max_lines: The maximum number of output lines to include.
+
+    Returns:
+        The error message.
+    """
+    tail = [line for line in output.strip().splitlines() if line.strip()][-max_lines:]
+    return '\n\t- '.join([f"Failed to decompile {jar}."] + tail)
+
+
+def write_sub_jar(jar: str, entries: Iterable[str], out_path: str, archive: Optional[ZipDirectory] = None) -> None:
+    """
+    Writes a new jar containing only the given entries of an existing jar.
+
+    Entries are stored uncompressed, as the sub jar is only read back once by the decompiler.
+
+    Args:
+        jar: The jar to copy entries from.
+        entries: The names of the entries to copy.
+        out_path: The path of the new jar.
+        archive: The jar, already open, e.g. when it is split into many sub jars.
+    """
+    if archive is not None:
+        with zipfile.ZipFile(out_path, "w", zipfile.ZIP_STORED) as target:
+            for entry in entries:
+                target.writestr(entry, archive.read(entry))
+        return
+
+    with zipfile.ZipFile(jar) as source, zipfile.ZipFile(out_path, "w", zipfile.ZIP_STORED) as target:
+        for entry in entries:
+            target.writestr(source.getinfo(entry), source.read(entry), zipfile.ZIP_STORED)
+
+
+def decompile_jar_to_memory(jar: str) -> bytes:
+    """
+    Decompiles a jar into an in-memory jar of java sources using jd-cli.
+
+    jd-cli writes its sources jar into a named pipe that is drained straight into memory,
+    so no decompiled source ever touches the disk. Platforms without named pipes fall back
+    to a single temporary sources jar that is read back and deleted.
+
+    Args:
+        jar: The jar to decompile.
+
+    Returns:
+        The bytes of the decompiled sources jar.
+
+    Raises:
+        DecompileError: If jd-cli exits with a non-zero code.
+    """
+    pipe_dir = tempfile.mkdtemp(prefix="jash-")
+    out_path = os.path.join(pipe_dir, "sources.jar")
+
+    try:
+        if not hasattr(os, "mkfifo"):
+            code, output = run_command(["java", "-jar", JD_CLI_PATH, jar, "-oj", out_path])
+            if code != 0:
+                raise DecompileError(decompile_failure_message(jar, output))
+            with open(out_path, "rb") as f:
+                return f.read()
+
+        os.mkfifo(out_path)
+        chunks = []
+
+        def drain() -> None:
+            with open(out_path, "rb") as pipe:
+                for chunk in iter(lambda: pipe.read(1 << 20), b""):
+                    chunks.append(chunk)
+
+        reader = threading.Thread(target=drain, daemon=True)
+        reader.start()
+        code, output = run_command(["java", "-jar", JD_CLI_PATH, jar, "-oj", out_path])
+
+        # If jd-cli exited without ever opening the pipe, open it ourselves to release the reader
+        if reader.is_alive():
+            try:
+                os.close(os.open(out_path, os.O_WRONLY | os.O_NONBLOCK))
+            except OSError:
+                pass
+        reader.join()
+
+        if code != 0:
+            raise DecompileError(decompile_failure_message(jar, output))
+        return b"".join(chunks)
+    finally:
+        shutil.rmtree(pipe_dir, ignore_errors=True)
+
+
+def plan_shards(jar: str, entries: Iterable[str], shard_count: int, archive: Optional[ZipDirectory] = None) -> List[List[str]]:
+    """
+    Splits the class entries of a jar into shards of roughly equal uncompressed size.
+
+    Entries are kept together by package. Packages larger than an even share are split
+    further by top-level class, so that a single huge package cannot unbalance the shards,
+    while a class and its nested classes always stay in the same shard.
+
+    Args:
+        jar: The jar containing the entries.
+        entries: The class entries to shard.
+        shard_count: The maximum number of shards.
+        archive: The jar, already open.
+
+    Returns:
+        The non-empty shards, largest first.
+    """
+    packages = defaultdict(lambda: defaultdict(list))
+    with contextlib.nullcontext(archive) if archive is not None else ZipDirectory(jar) as jar_file:
+        sizes = {}
+        for entry in entries:
+            sizes[entry] = jar_file.getinfo(entry).file_size
+            directory, _, file = entry.rpartition("/")
+            packages[directory][file.split("$", 1)[0]].append(entry)
+
+    target = sum(sizes.values()) / max(shard_count, 1)
+    units = []
+    for classes in packages.values():
+        package_entries = [e for group in classes.values() for e in group]
+        if sum(sizes[e] for e in package_entries) > target:
+            units.extend(classes.values())
+        else:
+            units.append(package_entries)
+
+    # Greedily place the largest units into the least loaded shard
+    shards = [[0, []] for _ in range(max(shard_count, 1))]
+    for unit in sorted(units, key=lambda u: sum(sizes[e] for e in u), reverse=True):
+        shard = min(shards, key=lambda s: s[0])
+        shard[0] += sum(sizes[e] for e in unit)
+        shard[1].extend(unit)
+
+    return [entries for _, entries in sorted(shards, key=lambda s: s[0], reverse=True) if entries]
+
+
+def decompile_jar_sharded(
+        jar: str,
+        entries: Iterable[str],
+        work_dir: str,
+        workers: int,
+        out_dir: Optional[str] = None,
+        archive: Optional[ZipDirectory] = None
+) -> Optional[bytes]:
+    """
+    Decompiles the given entries of a jar with several concurrent jd-cli processes.
+
+    The entries are split into balanced shards by `plan_shards`, each shard is written to
+    its own sub jar in `work_dir`, and one jd-cli process is run per shard. A class and its
+    nested classes always stay in one shard, so no two shards decompile the same source
+    file, but a large package may be split across shards. When decompiling into memory,
+    entries that several shards produce, such as `META-INF/MANIFEST.MF`, are merged from
+    the first shard producing them.
+
+    Args:
+        jar: The jar to decompile.
+        entries: The class entries to decompile.
+        work_dir: The directory to write shard jars to.
+        workers: The number of shards, and of concurrent jd-cli processes.
+        out_dir: The directory to write the decompiled sources to. If None, the sources are
+            decompiled into memory instead.
+        archive: The jar, already open.
+
+    Returns:
+        The bytes of a merged sources jar when decompiling into memory, otherwise None.
+
+    Raises:
+        DecompileError: If any shard fails, describing every failed shard.
+    """
+    shards = plan_shards(jar, entries, workers, archive)
+    shard_jars = []
+    for i, shard in enumerate(shards):
+        shard_jar = os.path.join(work_dir, f"shard-{i}.jar")
+        write_sub_jar(jar, shard, shard_jar, archive)
+        shard_jars.append(shard_jar)
+
+    def decompile_shard(shard_jar: str) -> Optional[bytes]:
+        if out_dir is None:
+            return decompile_jar_to_memory(shard_jar)
+        decompile_jar(shard_jar, out_dir)
+        return None
+
+    with ThreadPoolExecutor(max_workers=len(shard_jars) or 1) as executor:
+        futures = [executor.submit(decompile_shard, shard_jar) for shard_jar in shard_jars]
+
+    failures = []
+    results = []
+    for i, (shard, future) in enumerate(zip(shards, futures)):
+        error = future.exception()
+        if error is not None:
+            packages = sorted({e.rpartition("/")[0].replace("/", ".") or "<default>" for e in shard})
+            failures.append(f"Shard {i + 1}/{len(shards)} ({len(shard)} classes in {', '.join(packages[:3])}"
+                            f"{', ...' if len(packages) > 3 else ''}): {error}")
+        else:
+            results.append(future.result())
+
+    if failures:
+        raise DecompileError(f"Failed to decompile {len(failures)} of {len(shards)} shards of {jar}.\n" + '\n'.join(failures))
+
+    if out_dir is not None:
+        return None
+
+    merged = io.BytesIO()
+    written = set()
+    with zipfile.ZipFile(merged, "w", zipfile.ZIP_STORED) as target:
+        for result in results:
+            with zipfile.ZipFile(io.BytesIO(result)) as source:
+                for info in source.infolist():
+                    if info.filename in written:
+                        continue
+                    written.add(info.filename)
+                    target.writestr(info, source.read(info), zipfile.ZIP_STORED)
+    return merged.getvalue()
@@ -0,0 +1,165 @@
+import mmap
+import struct
+import sys
+import zlib
+from typing import Dict, List, Tuple
+
+IMAGE_MAGIC = 0xCAFEDADA
+RESOURCE_MAGIC = 0xCAFEFAFA
+MAJOR_VERSION = 1
+
+# Magic, version, flags, resource count, table length, locations size, strings size
+HEADER_FORMAT = "7I"
+# Magic, compressed size, uncompressed size, decompressor name offset, decompressor config offset, is terminal
+RESOURCE_HEADER_FORMAT = "IQQIIB"
+
+# The kinds of the attributes of a location, see `JImage.location`
+ATTRIBUTE_END = 0
+ATTRIBUTE_MODULE = 1
+ATTRIBUTE_PARENT = 2
+ATTRIBUTE_BASE = 3
+ATTRIBUTE_EXTENSION = 4
+ATTRIBUTE_OFFSET = 5
+ATTRIBUTE_COMPRESSED = 6
+ATTRIBUTE_UNCOMPRESSED = 7
+ATTRIBUTE_COUNT = 8
+
+
+class JImageError(Exception):
+    """Raised when a file is not a readable runtime image."""
+    pass
+
+
+class JImage:
+    """
+    A read-only view of a Java runtime image, the `lib/modules` file of JDK 9 and later.
+
+    Runtime images hold the classes of every module of a JDK or JRE, named
+    `/<module>/<package path>/<class>.class`. Like `ZipDirectory`, only the names are read
+    up front, and resources are read and decompressed on demand. Resources compressed with
+    jlink's `zip` plugin are supported, those compressed by string sharing are not.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens a runtime image and reads the names of its resources.
+
+        Args:
+            path: The path of the image.
+
+        Raises:
+            JImageError: If the file is not a runtime image, or of an unsupported version.
+        """
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.read_index()
+        except (struct.error, ValueError) as e:
+            self.close()
+            raise JImageError(f"Malformed runtime image '{path}': {e}")
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> "JImage":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if hasattr(self, "data"):
+            self.data.close()
+        self.file.close()
+
+    def read_index(self) -> None:
+        # Images are written in the byte order of the platform they were built for
+        for order in "<>":
+            header = struct.unpack_from(order + HEADER_FORMAT, self.data)
+            if header[0] == IMAGE_MAGIC:
+                break
+        else:
+            raise JImageError(f"The file '{self.path}' is not a runtime image.")
+        self.order = order
+
+        _, version, _, _, table_length, locations_size, strings_size = header
+        if version >> 16 != MAJOR_VERSION:
+            raise JImageError(f"The runtime image '{self.path}' is of unsupported version {version >> 16}.")
+
+        offsets_start = struct.calcsize(HEADER_FORMAT) + table_length * 4
+        self.locations_start = offsets_start + table_length * 4
+        self.strings_start = self.locations_start + locations_size
+        self.resources_start = self.strings_start + strings_size
+
+        # Name -> (offset, compressed size, uncompressed size)
+        self.records: Dict[str, Tuple[int, int, int]] = {}
+        for location_offset in struct.unpack_from(f"{order}{table_length}I", self.data, offsets_start):
+            attributes = self.location(location_offset)
+            module = self.string(attributes[ATTRIBUTE_MODULE])
+            parent = self.string(attributes[ATTRIBUTE_PARENT])
+            base = self.string(attributes[ATTRIBUTE_BASE])
+            extension = self.string(attributes[ATTRIBUTE_EXTENSION])
+
+            name = f"/{module}/" if module else "/"
+            name += f"{parent}/" if parent else ""
+            name += f"{base}.{extension}" if extension else base
+            self.records[name] = (
+                attributes[ATTRIBUTE_OFFSET], attributes[ATTRIBUTE_COMPRESSED], attributes[ATTRIBUTE_UNCOMPRESSED]
+            )
+
+    def location(self, offset: int) -> List[int]:
+        """
+        Decodes the attributes of a location.
+
+        Each attribute is a byte holding its kind in the upper five bits and its length minus
+        one in the lower three, followed by its big-endian value.
+        """
+        attributes = [0] * ATTRIBUTE_COUNT
+        position = self.locations_start + offset
+        while True:
+            byte = self.data[position]
+            kind = byte >> 3
+            if kind == ATTRIBUTE_END:
+                return attributes
+            length = (byte & 0x7) + 1
+            attributes[kind] = int.from_bytes(self.data[position + 1:position + 1 + length], "big")
+            position += length + 1
+
+    def string(self, offset: int) -> str:
+        start = self.strings_start + offset
+        return sys.intern(self.data[start:self.data.find(b"\0", start)].decode("utf-8"))
+
+    def namelist(self) -> List[str]:
+        return list(self.records)
+
+    def read(self, name: str) -> bytes:
+        """
+        Reads and decompresses a resource.
+
+        Args:
+            name: The name of the resource, e.g. `/java.base/java/lang/Object.class`.
+
+        Returns:
+            The resource's data.
+
+        Raises:
+            KeyError: If there is no such resource.
+            JImageError: If the resource uses an unsupported compression.
+        """
+        offset, compressed_size, uncompressed_size = self.records[name]
+        start = self.resources_start + offset
+        if not compressed_size:
+            return self.data[start:start + uncompressed_size]
+
+        # Compressed resources are wrapped in a header per compression applied, outermost first
+        data = self.data[start:start + compressed_size]
+        header = struct.Struct(self.order + RESOURCE_HEADER_FORMAT)
+        while len(data) >= header.size:
+            magic, size, _, decompressor, _, _ = header.unpack_from(data)
+            if magic != RESOURCE_MAGIC:
+                break
+            if self.string(decompressor) != "zip":
+                raise JImageError(f"The resource '{name}' uses unsupported compression '{self.string(decompressor)}'.")
+            data = zlib.decompress(data[header.size:header.size + size])
+        return data
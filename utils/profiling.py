@@ -0,0 +1,329 @@
+import cProfile
+import contextlib
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Set by `enable`, in which case spans are recorded
+active: Optional["Profiler"] = None
+
+_disabled = contextlib.nullcontext()
+
+
+def current_rss() -> int:
+    """
+    Gets the resident set size of this process.
+
+    Returns:
+        The current RSS in bytes where the platform exposes it, otherwise the peak RSS so far,
+        or 0 if neither is available.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    return 0
+
+
+def children_cpu() -> float:
+    """Gets the CPU time used by all waited-for child processes, in seconds."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class PhaseStats:
+    """The accumulated timings of every span of a single phase."""
+
+    __slots__ = ("wall", "cpu", "peak_rss", "count")
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_rss = 0
+        self.count = 0
+
+
+class Profiler:
+    """
+    Records wall time, CPU time and peak memory of the phases and files of a run.
+
+    Phases may overlap across threads, e.g. the decompiling of one jar with the collecting of
+    another, so CPU time is measured per thread and a background sampler tracks the peak RSS
+    of each phase while it is open. Spans measuring child processes, such as jd-cli, count
+    the CPU time of waited-for children instead, which is approximate when they overlap.
+    """
+
+    def __init__(self, pstats_path: str = None, trace_path: str = None, sample_interval: float = 0.05):
+        """
+        Creates a new Profiler.
+
+        Args:
+            pstats_path: The file to dump cProfile statistics to, if any.
+            trace_path: The file to write a Chrome trace-event JSON to, if any.
+            sample_interval: The interval between RSS samples, in seconds.
+        """
+        self.origin = time.perf_counter()
+        self.pstats_path = pstats_path
+        self.trace_path = trace_path
+        self.sample_interval = sample_interval
+
+        self.lock = threading.Lock()
+        self.phases: Dict[str, PhaseStats] = defaultdict(PhaseStats)
+        self.files: List[Tuple[float, float, str, str]] = []
+        self.overheads: Dict[str, PhaseStats] = defaultdict(PhaseStats)
+        self.events: List[Dict[str, Any]] = []
+        self.open_phases: Dict[int, int] = {}
+        self.phase_ids = itertools.count()
+
+        self.cprofile = cProfile.Profile() if pstats_path else None
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self.sample, name="jash-rss-sampler", daemon=True)
+        self.sampler.start()
+
+    def sample(self) -> None:
+        while not self.stopped.wait(self.sample_interval):
+            self.update_peaks()
+
+    def update_peaks(self) -> None:
+        rss = current_rss()
+        with self.lock:
+            for key, peak in self.open_phases.items():
+                if rss > peak:
+                    self.open_phases[key] = rss
+
+    def event(self, name: str, category: str, start: float, wall: float, cpu: float, tid: int, args: dict = None) -> None:
+        if self.trace_path is None:
+            return
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - self.origin) * 1e6,
+            "dur": wall * 1e6,
+            "pid": os.getpid(),
+            "tid": tid,
+            "args": {"cpu_ms": cpu * 1e3, **(args or {})},
+        })
+
+    @contextlib.contextmanager
+    def phase(self, name: str, detail: str = None, cprofile: bool = False):
+        with self.lock:
+            key = next(self.phase_ids)
+            self.open_phases[key] = current_rss()
+
+        profile = self.cprofile if cprofile else None
+        if profile is not None:
+            profile.enable()
+        start = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            cpu = time.thread_time() - start_cpu
+            if profile is not None:
+                profile.disable()
+            self.update_peaks()
+            with self.lock:
+                peak = self.open_phases.pop(key)
+                stats = self.phases[name]
+                stats.wall += wall
+                stats.cpu += cpu
+                stats.peak_rss = max(stats.peak_rss, peak)
+                stats.count += 1
+                self.event(name, "phase", start, wall, cpu, threading.get_ident(), {"detail": detail} if detail else None)
+
+    @contextlib.contextmanager
+    def command(self, name: str):
+        start = time.perf_counter()
+        start_cpu = children_cpu()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            cpu = children_cpu() - start_cpu
+            with self.lock:
+                stats = self.overheads[f"run_command ({name})"]
+                stats.wall += wall
+                stats.cpu += cpu
+                stats.count += 1
+                self.event(name, "command", start, wall, cpu, threading.get_ident())
+
+    def file(self, name: str, category: str, wall: float, cpu: float, tid: int = None) -> None:
+        with self.lock:
+            self.files.append((wall, cpu, category, name))
+            self.event(name, category, time.perf_counter() - wall, wall, cpu, tid or threading.get_ident())
+
+    def overhead(self, name: str, wall: float, cpu: float) -> None:
+        with self.lock:
+            stats = self.overheads[name]
+            stats.wall += wall
+            stats.cpu += cpu
+            stats.count += 1
+
+    def report(self, top: int = 10) -> str:
+        """
+        Formats the recorded timings.
+
+        Args:
+            top: The number of slowest files to list.
+
+        Returns:
+            The report, listing every phase, the overheads and the slowest files.
+        """
+        lines = [f"{'phase':<36}{'wall':>10}{'cpu':>10}{'peak rss':>12}{'spans':>7}"]
+        for name, stats in self.phases.items():
+            lines.append(f"{name:<36}{stats.wall:>9.3f}s{stats.cpu:>9.3f}s{stats.peak_rss / 1024 / 1024:>8.1f} MiB{stats.count:>7}")
+
+        if self.overheads:
+            lines.append("")
+            lines.append(f"{'overhead':<36}{'wall':>10}{'cpu':>10}{'calls':>12}")
+            for name, stats in sorted(self.overheads.items()):
+                lines.append(f"{name:<36}{stats.wall:>9.3f}s{stats.cpu:>9.3f}s{stats.count:>12}")
+
+        if self.files and top > 0:
+            lines.append("")
+            lines.append(f"Slowest {min(top, len(self.files))} of {len(self.files)} files:")
+            for wall, cpu, category, name in sorted(self.files, reverse=True)[:top]:
+                lines.append(f"{wall * 1e3:>10.1f}ms{cpu * 1e3:>10.1f}ms cpu  {category:<8}{name}")
+        return "\n".join(lines)
+
+    def finish(self) -> None:
+        """Stops sampling and writes the cProfile statistics and trace, if requested."""
+        self.stopped.set()
+        self.sampler.join()
+
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(self.pstats_path)
+        if self.trace_path is not None:
+            with open(self.trace_path, "w") as f:
+                json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+
+def enable(pstats_path: str = None, trace_path: str = None) -> Profiler:
+    """
+    Starts profiling the run.
+
+    Args:
+        pstats_path: The file to dump cProfile statistics to, if any.
+        trace_path: The file to write a Chrome trace-event JSON to, if any.
+
+    Returns:
+        The active profiler.
+    """
+    global active
+    active = Profiler(pstats_path, trace_path)
+    return active
+
+
+def phase(name: str, detail: str = None, cprofile: bool = False):
+    """
+    Times a phase of the run, when profiling.
+
+    Args:
+        name: The name of the phase. Spans of the same name are accumulated.
+        detail: Extra detail on this span, e.g. the jar being processed.
+        cprofile: Whether to run cProfile during the phase. Only phases that never overlap
+            each other may be profiled, as a single profiler is shared between threads.
+
+    Returns:
+        A context manager timing the phase.
+    """
+    return active.phase(name, detail, cprofile) if active is not None else _disabled
+
+
+def command(name: str):
+    """
+    Times an external command, when profiling.
+
+    Args:
+        name: The name of the command.
+
+    Returns:
+        A context manager timing the command.
+    """
+    return active.command(name) if active is not None else _disabled
+
+
+@contextlib.contextmanager
+def _file_span(name: str, category: str):
+    start = time.perf_counter()
+    start_cpu = time.thread_time()
+    try:
+        yield
+    finally:
+        active.file(name, category, time.perf_counter() - start, time.thread_time() - start_cpu)
+
+
+def file(name: str, category: str):
+    """
+    Times the processing of a single file, when profiling.
+
+    Args:
+        name: The path of the file.
+        category: What is done with the file, e.g. `parse` or `write`.
+
+    Returns:
+        A context manager timing the file.
+    """
+    return _file_span(name, category) if active is not None else _disabled
+
+
+def record_file(name: str, category: str, timing: Tuple[float, float, int]) -> None:
+    """
+    Records the timing of a file processed elsewhere, e.g. in a worker process.
+
+    Args:
+        name: The path of the file.
+        category: What was done with the file.
+        timing: The wall time, CPU time and process id, as returned by `timed_call`.
+    """
+    if active is not None:
+        wall, cpu, pid = timing
+        active.file(name, category, wall, cpu, pid)
+
+
+def timed_call(function: Callable, *args) -> Tuple[Any, Tuple[float, float, int]]:
+    """
+    Calls a function and measures it, for use in worker processes.
+
+    Args:
+        function: The function to call.
+        *args: The arguments to call it with.
+
+    Returns:
+        The result, and the wall time, CPU time and process id of the call.
+    """
+    start = time.perf_counter()
+    start_cpu = time.thread_time()
+    result = function(*args)
+    return result, (time.perf_counter() - start, time.thread_time() - start_cpu, os.getpid())
+
+
+def overhead(name: str, start: float, start_cpu: float) -> None:
+    """
+    Accumulates time spent in a recurring overhead, e.g. redrawing progress, when profiling.
+
+    Args:
+        name: The name of the overhead.
+        start: The `time.perf_counter` value when the overhead started.
+        start_cpu: The `time.thread_time` value when the overhead started.
+    """
+    if active is not None:
+        active.overhead(name, time.perf_counter() - start, time.thread_time() - start_cpu)
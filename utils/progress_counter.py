@@ -1,25 +1,141 @@
 import sys
+import threading
+import time
+from typing import Optional, TextIO
+
+from utils import profiling
+
+# Seconds between redraws of the progress line on a terminal, and between log lines otherwise
+TTY_INTERVAL = 0.1
+LOG_INTERVAL = 10.0
+
+# Set in worker processes by `attach`, the counter shared with the parent process
+worker_value = None
+
+
+def attach(value) -> None:
+    """
+    Makes `worker_increment` count towards a parent's counter, used to initialise worker processes.
+
+    Args:
+        value: The shared value, from `ProgressCounter.shared`.
+    """
+    global worker_value
+    worker_value = value
+
+
+def worker_increment(step: int = 1) -> None:
+    """Increments the counter attached to this worker process, if any."""
+    if worker_value is not None:
+        with worker_value.get_lock():
+            worker_value.value += step
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Formats a duration for display.
+
+    Args:
+        seconds: The duration in seconds.
+
+    Returns:
+        The duration, e.g. `42s`, `3m07s` or `1h05m`.
+    """
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
 
 
 class ProgressCounter:
-    def __init__(self, max_value: int):
+    def __init__(self, max_value: int, label: str = "Progress", stream: Optional[TextIO] = None):
+        """
+        Creates a new ProgressCounter, reporting the progress, rate and ETA of a single phase.
+
+        Increments only update a counter, and may come from any thread or, through `shared`,
+        from worker processes. The progress is drawn by a background thread at a fixed rate:
+        rewriting a single line on a terminal, or as periodic log lines when the output is
+        redirected.
+
+        Args:
+            max_value: The total number of items of the phase.
+            label: The name of the phase.
+            stream: The stream to report to, stdout by default.
+        """
         if max_value <= 0:
             raise ValueError("max_value must be greater than 0")
         self.max_value = max_value
+        self.label = label
+        self.stream = stream or sys.stdout
+        self.tty = self.stream.isatty()
         self.current = 0
+        self.lock = threading.Lock()
+        self.shared_value = None
+        self.start_time = time.perf_counter()
+        self.line_length = 0
+
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"progress-{label}", daemon=True)
+        self.thread.start()
+
+    def shared(self):
+        """
+        Gets a counter that worker processes can increment, through `attach` and `worker_increment`.
+
+        Returns:
+            The shared value, counted towards this counter's progress.
+        """
+        if self.shared_value is None:
+            import multiprocessing
+            self.shared_value = multiprocessing.Value("q", 0)
+        return self.shared_value
 
     def increment(self, step: int = 1):
-        self.current += step
-        if self.current > self.max_value:
-            self.current = self.max_value
-        self._display()
+        with self.lock:
+            self.current += step
 
-    def _display(self):
-        percent = (self.current / self.max_value) * 100
-        sys.stdout.write(f"\rProgress: {percent:.2f}%")
-        sys.stdout.flush()
+    def value(self) -> int:
+        """Gets the number of items completed so far, capped at the total."""
+        current = self.current
+        if self.shared_value is not None:
+            current += self.shared_value.value
+        return min(current, self.max_value)
+
+    def _run(self):
+        interval = TTY_INTERVAL if self.tty else LOG_INTERVAL
+        while not self.stopped.wait(interval):
+            self._display()
+
+    def _display(self, final: bool = False):
+        start, start_cpu = time.perf_counter(), time.thread_time()
+        current = self.value()
+        elapsed = start - self.start_time
+        rate = current / elapsed if elapsed > 0 else 0.0
+
+        line = f"{self.label}: {current / self.max_value * 100:.2f}% ({current}/{self.max_value}), {rate:,.0f} files/s"
+        if final:
+            line += f", done in {format_duration(elapsed)}"
+        elif rate > 0:
+            line += f", ETA {format_duration((self.max_value - current) / rate)}"
+
+        if self.tty:
+            # Pad with spaces to clear what remains of a longer previous line
+            self.stream.write(f"\r{line}{' ' * max(0, self.line_length - len(line))}")
+            self.line_length = len(line)
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+        profiling.overhead("progress_counter", start, start_cpu)
 
     def complete(self):
-        self.current = self.max_value
-        self._display()
-        sys.stdout.write("\n")
+        self.stopped.set()
+        self.thread.join()
+        with self.lock:
+            self.current = self.max_value
+        if self.shared_value is not None:
+            self.shared_value.value = 0
+        self._display(final=True)
+        if self.tty:
+            self.stream.write("\n")
@@ -0,0 +1,298 @@
+import base64
+import hashlib
+import os
+import re
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils import profiling
+
+# The bytes of rendered stubs held in memory before a directory writer flushes them to disk
+DEFAULT_BATCH_BYTES = 8 * 1024 * 1024
+# The threads writing each batch of a directory writer. Creating files is mostly bound by the
+# file system, so more threads only pay off where file creation has a high latency
+DEFAULT_WRITE_WORKERS = 1
+
+# Archive entries get a fixed timestamp, so that the same stubs always produce the same archive
+ARCHIVE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+WHEEL_NAME_PATTERN = re.compile(r"^(?P<name>[A-Za-z0-9_.]+)-(?P<version>[A-Za-z0-9_.!+]+)(?:-\d[^-]*)?-py3-none-any\.whl$")
+
+
+def package_module_name(package: str) -> str:
+    """Gets the archive path of a package's stub module, `java/util/__init__.py` for `java.util`."""
+    return "/".join(package.split(".") + ["__init__.py"])
+
+
+class DirectoryWriter:
+    """
+    Writes stub modules to a directory in batches.
+
+    Rendered modules are encoded and buffered in memory until a batch is full, then written
+    back to back with a single unbuffered write each. With several workers, a full batch is
+    split across a thread pool and written while the next batch is rendered, so at most two
+    batches are held at once. When the layout of the modules is known up front, every
+    directory is created in a single pass before the first write, otherwise directories are
+    created the first time a batch writes into them.
+
+    Every package that holds a written module gets an `__init__.py`, empty unless the
+    package's own stub module was written, so that package stubs are importable.
+    """
+
+    def __init__(
+            self,
+            root: str,
+            batch_bytes: int = DEFAULT_BATCH_BYTES,
+            workers: int = 1,
+            layout: Optional[Iterable[str]] = None
+    ):
+        """
+        Creates a new DirectoryWriter.
+
+        Args:
+            root: The directory to write to.
+            batch_bytes: The number of bytes to buffer before writing.
+            workers: The number of threads writing each batch.
+            layout: The path of every module that will be written, to create their directories up front.
+        """
+        self.root = root
+        self.batch_bytes = batch_bytes
+        self.pending: List[Tuple[str, bytes]] = []
+        self.pending_bytes = 0
+        self.directories: Set[str] = set()
+        self.names: Set[str] = set()
+        self.packages: Set[str] = set()
+        self.files = 0
+
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jash-writer") if workers > 1 else None
+        self.writing: List[Future] = []
+        if layout is not None:
+            self.create_directories(layout)
+
+    def __enter__(self) -> "DirectoryWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def create_directories(self, names: Iterable[str]) -> None:
+        """
+        Creates the directories of the given modules in a single pass, parents first.
+
+        Args:
+            names: The paths of the modules relative to the root, with `/` separators.
+        """
+        directories = {os.path.join(self.root, *name.split("/")[:-1]) for name in names} - self.directories
+        for directory in sorted(directories):
+            os.makedirs(directory, exist_ok=True)
+        self.directories.update(directories)
+
+    def write(self, name: str, source: str) -> None:
+        """
+        Queues a module for writing.
+
+        Args:
+            name: The path of the module relative to the root, with `/` separators.
+            source: The module source.
+        """
+        data = source.encode("utf-8")
+        self.pending.append((name, data))
+        self.pending_bytes += len(data)
+        self.names.add(name)
+
+        parts = name.split("/")[:-1]
+        for i in range(1, len(parts) + 1):
+            self.packages.add(".".join(parts[:i]))
+
+        if self.pending_bytes >= self.batch_bytes:
+            self.flush()
+
+    def write_package(self, package: str, source: str) -> None:
+        self.write(package_module_name(package), source)
+
+    def flush(self) -> None:
+        """Starts writing every queued module, once the previous batch is written."""
+        self.wait()
+        batch = self.pending
+        if self.executor is None or len(batch) < 2:
+            self.write_batch(batch)
+        else:
+            self.writing = [self.executor.submit(self.write_batch, batch[i::self.workers]) for i in range(self.workers)]
+
+        self.files += len(batch)
+        self.pending = []
+        self.pending_bytes = 0
+
+    def wait(self) -> None:
+        """Waits for the batch being written, raising the first error of any of its threads."""
+        writing, self.writing = self.writing, []
+        for future in writing:
+            future.result()
+
+    def write_batch(self, batch: List[Tuple[str, bytes]]) -> None:
+        for name, data in batch:
+            path = os.path.join(self.root, *name.split("/"))
+            directory = os.path.dirname(path)
+            if directory not in self.directories:
+                os.makedirs(directory, exist_ok=True)
+                self.directories.add(directory)
+
+            with profiling.file(path, "write"):
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+                try:
+                    view = memoryview(data)
+                    while view:
+                        view = view[os.write(fd, view):]
+                finally:
+                    os.close(fd)
+
+    def close(self) -> None:
+        for package in sorted(self.packages):
+            name = package_module_name(package)
+            if name not in self.names and not os.path.exists(os.path.join(self.root, *name.split("/"))):
+                self.write(name, "")
+        self.flush()
+        self.wait()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+class ArchiveWriter:
+    """
+    Writes stub modules straight into a zip archive that `zipimport` can import from.
+
+    Every package that holds a written module or package gets an `__init__.py`, empty unless
+    the package's own stub module was written.
+    """
+
+    def __init__(self, path: str):
+        """
+        Creates a new ArchiveWriter, replacing any existing archive.
+
+        Args:
+            path: The path of the archive.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.archive = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        self.names: Set[str] = set()
+        self.packages: Set[str] = set()
+        self.files = 0
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def write(self, name: str, source: str) -> None:
+        """
+        Adds a module to the archive.
+
+        Args:
+            name: The path of the module within the archive, with `/` separators.
+            source: The module source.
+        """
+        with profiling.file(f"{self.path}!{name}", "write"):
+            self.write_entry(name, source.encode("utf-8"))
+        self.files += 1
+
+        parts = name.split("/")[:-1]
+        for i in range(1, len(parts) + 1):
+            self.packages.add(".".join(parts[:i]))
+
+    def write_package(self, package: str, source: str) -> None:
+        self.write(package_module_name(package), source)
+
+    def write_entry(self, name: str, data: bytes) -> None:
+        if name in self.names:
+            raise Exception(f"Duplicate archive entry {name} in {self.path}.")
+        self.names.add(name)
+        info = zipfile.ZipInfo(name, ARCHIVE_DATE_TIME)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        self.archive.writestr(info, data)
+
+    def close(self) -> None:
+        if self.archive.fp is None:
+            return
+        for package in sorted(self.packages):
+            name = package_module_name(package)
+            if name not in self.names:
+                self.write_entry(name, b"")
+        self.finish()
+        self.archive.close()
+
+    def finish(self) -> None:
+        """Adds any entries that must come after every module, before the archive is closed."""
+        pass
+
+
+class WheelWriter(ArchiveWriter):
+    """
+    Writes stub modules into an installable wheel, named and versioned after its file name.
+
+    The stubs are installed as top-level packages, along with the wheel metadata and a
+    RECORD of the hash and size of every file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Creates a new WheelWriter, replacing any existing wheel.
+
+        Args:
+            path: The path of the wheel, e.g. `java_stubs-1.0-py3-none-any.whl`.
+
+        Raises:
+            Exception: If the file name is not a valid pure Python wheel name.
+        """
+        match = WHEEL_NAME_PATTERN.match(os.path.basename(path))
+        if match is None:
+            raise Exception(f"The wheel {path} must be named <name>-<version>-py3-none-any.whl, e.g. java_stubs-1.0-py3-none-any.whl.")
+        self.name = match.group("name")
+        self.version = match.group("version")
+        self.dist_info = f"{self.name}-{self.version}.dist-info"
+        self.record: Dict[str, Tuple[str, int]] = {}
+        super().__init__(path)
+
+    def write_entry(self, name: str, data: bytes) -> None:
+        super().write_entry(name, data)
+        digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b"=").decode("ascii")
+        self.record[name] = (f"sha256={digest}", len(data))
+
+    def finish(self) -> None:
+        top_level = sorted({name.split("/")[0] for name in self.names if "/" in name})
+        self.write_entry(f"{self.dist_info}/METADATA", (
+            "Metadata-Version: 2.1\n"
+            f"Name: {self.name}\n"
+            f"Version: {self.version}\n"
+            "Summary: Python stubs of Java packages, generated by JASH\n"
+        ).encode("utf-8"))
+        self.write_entry(f"{self.dist_info}/WHEEL", (
+            "Wheel-Version: 1.0\n"
+            "Generator: jash\n"
+            "Root-Is-Purelib: true\n"
+            "Tag: py3-none-any\n"
+        ).encode("utf-8"))
+        self.write_entry(f"{self.dist_info}/top_level.txt", "".join(f"{t}\n" for t in top_level).encode("utf-8"))
+
+        lines = [f"{name},{digest},{size}" for name, (digest, size) in self.record.items()]
+        lines.append(f"{self.dist_info}/RECORD,,")
+        super().write_entry(f"{self.dist_info}/RECORD", ("\n".join(lines) + "\n").encode("utf-8"))
+
+
+def open_archive(path: str) -> ArchiveWriter:
+    """
+    Opens the archive writer for an output path, a wheel for `.whl` files and a zip archive otherwise.
+
+    Args:
+        path: The path of the archive.
+
+    Returns:
+        The archive writer.
+    """
+    return WheelWriter(path) if path.lower().endswith(".whl") else ArchiveWriter(path)
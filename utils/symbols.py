@@ -0,0 +1,123 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+# Public types of java.lang, which every Java file imports implicitly
+JAVA_LANG_TYPES = frozenset({
+    "AbstractMethodError", "Appendable", "ArithmeticException", "ArrayIndexOutOfBoundsException",
+    "ArrayStoreException", "AssertionError", "AutoCloseable", "Boolean", "BootstrapMethodError", "Byte",
+    "CharSequence", "Character", "Class", "ClassCastException", "ClassCircularityError", "ClassFormatError",
+    "ClassLoader", "ClassNotFoundException", "ClassValue", "CloneNotSupportedException", "Cloneable",
+    "Comparable", "Deprecated", "Double", "Enum", "EnumConstantNotPresentException", "Error", "Exception",
+    "ExceptionInInitializerError", "Float", "FunctionalInterface", "IllegalAccessError",
+    "IllegalAccessException", "IllegalArgumentException", "IllegalCallerException",
+    "IllegalMonitorStateException", "IllegalStateException", "IllegalThreadStateException",
+    "IncompatibleClassChangeError", "IndexOutOfBoundsException", "InheritableThreadLocal", "InstantiationError",
+    "InstantiationException", "Integer", "InternalError", "InterruptedException", "Iterable",
+    "LayerInstantiationException", "LinkageError", "Long", "Math", "Module", "ModuleLayer",
+    "NegativeArraySizeException", "NoClassDefFoundError", "NoSuchFieldError", "NoSuchFieldException",
+    "NoSuchMethodError", "NoSuchMethodException", "NullPointerException", "Number", "NumberFormatException",
+    "Object", "OutOfMemoryError", "Override", "Package", "Process", "ProcessBuilder", "ProcessHandle",
+    "Readable", "Record", "ReflectiveOperationException", "Runnable", "Runtime", "RuntimeException",
+    "RuntimePermission", "SafeVarargs", "SecurityException", "SecurityManager", "Short", "StackOverflowError",
+    "StackTraceElement", "StackWalker", "StrictMath", "String", "StringBuffer", "StringBuilder",
+    "StringIndexOutOfBoundsException", "SuppressWarnings", "System", "Thread", "ThreadDeath", "ThreadGroup",
+    "ThreadLocal", "Throwable", "TypeNotPresentException", "UnknownError", "UnsatisfiedLinkError",
+    "UnsupportedClassVersionError", "UnsupportedOperationException", "VerifyError", "VirtualMachineError",
+    "Void",
+})
+
+JAVA_LANG = "java.lang"
+
+
+def split_imports(imports: Iterable[str]) -> Tuple[Dict[str, str], Tuple[str, ...]]:
+    """
+    Splits the import declarations of a Java file into single-type and on-demand imports.
+
+    Args:
+        imports: The imported names, with on-demand imports ending in `.*`.
+
+    Returns:
+        A mapping of simple name to fully qualified name for single-type imports, and the
+        packages (or classes) imported on demand.
+    """
+    single = {}
+    on_demand = []
+    for name in imports:
+        if name.endswith(".*"):
+            on_demand.append(name[:-2])
+        else:
+            single[name.rpartition(".")[2]] = name
+    return single, tuple(on_demand)
+
+
+class SymbolIndex:
+    """
+    An index of every known class by fully qualified name, across all input jars.
+
+    Besides the set of fully qualified names, a per-package table maps the simple names of
+    the top-level classes of each package to their fully qualified names. These tables back
+    both same-package and import-on-demand resolution, so resolving a simple name costs one
+    hashed lookup per candidate package.
+    """
+
+    def __init__(self):
+        self.classes: Dict[str, str] = {}
+        self.packages: Dict[str, Dict[str, str]] = defaultdict(dict)
+
+    def add(self, fqn: str, file: str) -> None:
+        """
+        Adds a class to the index.
+
+        Args:
+            fqn: The fully qualified name of the class, with nested classes separated by `$`.
+            file: The fully qualified name of the file the class was declared in.
+        """
+        self.classes[fqn] = file
+        if "$" not in fqn:
+            package, _, name = fqn.rpartition(".")
+            self.packages[package][name] = fqn
+
+    def __contains__(self, fqn: str) -> bool:
+        return fqn in self.classes
+
+    def resolve(
+            self,
+            name: str,
+            package: str,
+            single_imports: Dict[str, str],
+            on_demand_imports: Tuple[str, ...]
+    ) -> Optional[str]:
+        """
+        Resolves a simple type name as the Java compiler would from within a file.
+
+        Single-type imports take precedence, followed by the file's own package, then its
+        on-demand imports and finally the implicit `java.lang` import. Names that are not
+        indexed fall back to `java.lang` for its well known types, and to the file's own
+        package when the file has no on-demand imports the name could come from instead.
+
+        Args:
+            name: The simple name to resolve.
+            package: The package of the file referencing the name.
+            single_imports: The single-type imports of the file.
+            on_demand_imports: The on-demand imports of the file.
+
+        Returns:
+            The fully qualified name, or None if the name cannot be resolved.
+        """
+        if name in single_imports:
+            return single_imports[name]
+
+        fqn = self.packages.get(package, {}).get(name)
+        if fqn is not None:
+            return fqn
+
+        for imported in on_demand_imports + (JAVA_LANG,):
+            fqn = self.packages.get(imported, {}).get(name)
+            if fqn is not None:
+                return fqn
+
+        if name in JAVA_LANG_TYPES:
+            return f"{JAVA_LANG}.{name}"
+        if not on_demand_imports and package:
+            return f"{package}.{name}"
+        return None
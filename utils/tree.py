@@ -1,18 +1,222 @@
+import fnmatch
 import os
-from collections import defaultdict
-from typing import Any, List, Tuple, Dict, Iterator
+import re
+import zipfile
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-Tree = Dict[str, Any]
+
+class Tree:
+    """
+    A trie of package paths, where each node holds its sub-packages and the files directly in it.
+
+    Children are indexed by name, so lookups, insertions and removals along a path cost
+    one dictionary access per path segment. Files are kept in an insertion ordered dict,
+    used as an ordered set.
+    """
+
+    __slots__ = ("children", "files")
+
+    def __init__(self):
+        self.children: Dict[str, Tree] = {}
+        self.files: Dict[str, None] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.children) or bool(self.files)
+
+
+class PatternNode:
+    """
+    A node of a compiled pattern trie.
+
+    Literal segments are indexed by name, wildcard segments are kept as compiled regexes,
+    and a `**` segment is represented by a separate child that loops on itself.
+    """
+
+    __slots__ = ("literals", "wildcards", "globstar", "is_globstar", "terminals")
+
+    def __init__(self, is_globstar: bool = False):
+        self.literals: Dict[str, PatternNode] = {}
+        self.wildcards: List[Tuple[re.Pattern, str, PatternNode]] = []
+        self.globstar: Optional[PatternNode] = None
+        self.is_globstar = is_globstar
+        self.terminals: List[str] = []
 
 
-def nested_defaultdict() -> defaultdict[str, Any]:
+class PatternTrie:
     """
-    Creates a nested defaultdict structure that provides default nested defaultdicts indefinitely.
+    A set of compiled path patterns, matched against a Tree in a single pass.
+
+    Patterns are dotted package paths matched as prefixes, so a pattern matching a package
+    also matches everything inside it. Segments may use glob wildcards: `*` and `?` match
+    within a single segment (`com.vendor.*.internal`, `com.vendor.Foo*`), and a `**`
+    segment matches any number of segments (`com.**.internal`).
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.root = PatternNode()
+        self.patterns: List[str] = []
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, pattern: str) -> None:
+        """
+        Compiles a pattern into the trie.
+
+        Args:
+            pattern: The dotted path pattern.
+        """
+        node = self.root
+        for segment in pattern.split("."):
+            if segment == "**":
+                if node.globstar is None:
+                    node.globstar = PatternNode(is_globstar=True)
+                node = node.globstar
+            elif any(c in segment for c in "*?["):
+                for regex, source, child in node.wildcards:
+                    if source == segment:
+                        node = child
+                        break
+                else:
+                    child = PatternNode()
+                    node.wildcards.append((re.compile(fnmatch.translate(segment)), segment, child))
+                    node = child
+            else:
+                node = node.literals.setdefault(segment, PatternNode())
+        node.terminals.append(pattern)
+        self.patterns.append(pattern)
+
+    def start(self) -> Set[PatternNode]:
+        """
+        Gets the match states before any segment has been consumed.
+
+        Returns:
+            The initial set of active pattern nodes.
+        """
+        return closure({self.root})
+
+
+def closure(states: Iterable[PatternNode]) -> Set[PatternNode]:
+    """
+    Expands a set of pattern states with the `**` nodes reachable without consuming a segment.
+
+    Args:
+        states: The pattern nodes to expand.
 
     Returns:
-        A nested defaultdict providing other nested defaultdicts as default values.
+        The expanded set of pattern nodes.
     """
-    return defaultdict(nested_defaultdict)
+    result = set()
+    for state in states:
+        while state is not None and state not in result:
+            result.add(state)
+            state = state.globstar
+    return result
+
+
+def advance(states: Set[PatternNode], segment: str) -> Set[PatternNode]:
+    """
+    Advances a set of pattern states over a single path segment.
+
+    Args:
+        states: The active pattern nodes.
+        segment: The path segment to consume.
+
+    Returns:
+        The active pattern nodes after consuming the segment.
+    """
+    if not states:
+        return states
+
+    next_states = []
+    for state in states:
+        literal = state.literals.get(segment)
+        if literal is not None:
+            next_states.append(literal)
+        for regex, _, child in state.wildcards:
+            if regex.match(segment):
+                next_states.append(child)
+        if state.is_globstar:
+            next_states.append(state)
+    return closure(next_states)
+
+
+def matched_patterns(states: Set[PatternNode]) -> List[str]:
+    """
+    Gets the patterns fully matched by a set of pattern states.
+
+    Args:
+        states: The active pattern nodes.
+
+    Returns:
+        The matched patterns.
+    """
+    return [pattern for state in states for pattern in state.terminals]
+
+
+def filter_tree(tree: Tree, includes: Optional[PatternTrie], excludes: Optional[PatternTrie]) -> Set[str]:
+    """
+    Modifies `tree` in-place, applying all include and exclude patterns in a single pass.
+
+    A file is kept if it lies under a path matched by any include pattern (or there are no
+    include patterns) and not under a path matched by any exclude pattern. Subtrees that
+    no pattern can match anymore are kept or dropped whole, without being visited.
+
+    Args:
+        tree: The tree to filter.
+        includes: The include patterns, or None to include everything.
+        excludes: The exclude patterns, or None to exclude nothing.
+
+    Returns:
+        The patterns that matched at least one path in the tree.
+    """
+    matched = set()
+    include_start = includes.start() if includes is not None else set()
+    exclude_start = excludes.start() if excludes is not None else set()
+    include_patterns = set(includes.patterns) if includes is not None else set()
+
+    def advance_includes(include_states: Set[PatternNode], segment: str, included: bool) -> Set[PatternNode]:
+        # Below an included path, includes only need to be followed until every pattern has matched,
+        # so that patterns nested under another pattern, like `org.jd` under `org`, are still found
+        if not include_states or (included and include_patterns <= matched):
+            return set()
+        return advance(include_states, segment)
+
+    def visit(node: Tree, include_states: Set[PatternNode], exclude_states: Set[PatternNode], included: bool) -> None:
+        for file in list(node.files):
+            hits = matched_patterns(advance_includes(include_states, file, included))
+            matched.update(hits)
+            file_included = included or bool(hits)
+
+            hits = matched_patterns(advance(exclude_states, file))
+            matched.update(hits)
+            if not file_included or hits:
+                del node.files[file]
+
+        for name, child in list(node.children.items()):
+            child_excludes = advance(exclude_states, name)
+            hits = matched_patterns(child_excludes)
+            if hits:
+                matched.update(hits)
+                del node.children[name]
+                continue
+
+            child_includes = advance_includes(include_states, name, included)
+            hits = matched_patterns(child_includes)
+            matched.update(hits)
+            child_included = included or bool(hits)
+
+            if not child_included and not child_includes:
+                del node.children[name]
+                continue
+
+            # Nothing left to decide below a fully included subtree without active patterns
+            if not (child_included and not child_excludes and not child_includes):
+                visit(child, child_includes, child_excludes, child_included)
+            if not child:
+                del node.children[name]
+
+    visit(tree, include_start, exclude_start, includes is None)
+    return matched
 
 
 def insert_into_tree(tree: Tree, path_parts: List[str], filename: str) -> None:
@@ -25,17 +229,36 @@ def insert_into_tree(tree: Tree, path_parts: List[str], filename: str) -> None:
         filename: The filename to insert.
     """
     for part in path_parts:
-        if part not in tree:
-            tree[part] = {}
-        tree = tree[part]
-    tree.setdefault("_files", []).append(filename)
+        child = tree.children.get(part)
+        if child is None:
+            child = tree.children[part] = Tree()
+        tree = child
+    tree.files[filename] = None
+
+
+def find_node(tree: Tree, path_parts: List[str]) -> Optional[Tree]:
+    """
+    Finds the node at a path in a tree.
+
+    Args:
+        tree: The tree to search.
+        path_parts: The path of the node.
+
+    Returns:
+        The node, or None if the path is not a directory in the tree.
+    """
+    for part in path_parts:
+        tree = tree.children.get(part)
+        if tree is None:
+            return None
+    return tree
 
 
 def remove_from_tree(tree: Tree, path_parts: List[str]) -> bool:
     """
     Removes the last element in path_parts from the tree.
 
-    If the last element is a filename, removes it from the "files" list in the parent directory.
+    If the last element is a filename, removes it from the files of the parent directory.
     If the last element is a directory, removes that directory subtree.
 
     Args:
@@ -48,62 +271,42 @@ def remove_from_tree(tree: Tree, path_parts: List[str]) -> bool:
     if not path_parts:
         return False  # Nothing to remove
 
-    # Traverse down to the parent of the target
-    node = tree
-    for part in path_parts[:-1]:
-        if part not in node or not isinstance(node[part], dict):
-            return False
-        node = node[part]
+    node = find_node(tree, path_parts[:-1])
+    if node is None:
+        return False
 
     last_part = path_parts[-1]
-
-    # Try removing file
-    files = node.get("_files", [])
-    if last_part in files:
-        files.remove(last_part)
+    if last_part in node.files:
+        del node.files[last_part]
         return True
-
-    # Try removing directory
-    if last_part in node:
-        del node[last_part]
+    if last_part in node.children:
+        del node.children[last_part]
         return True
-
     return False
 
 
-def ensure_files_keys(t: Tree) -> None:
-    """
-    Ensures each node in a tree has a "files" key.
-
-    Args:
-        t: The tree to walk through.
-    """
-    for v in t.values():
-        if isinstance(v, dict):
-            v.setdefault("_files", [])
-            ensure_files_keys(v)
-
-
 def tree_len(tree: Tree) -> int:
     """
-    Recursively counts the number of files in the tree.
+    Counts the number of files in the tree.
 
     Args:
-        tree: The nested file tree.
+        tree: The file tree.
 
     Returns:
         The total number of files in the tree.
     """
-    total = len(tree.get("_files", []))
-    for key, value in tree.items():
-        if isinstance(value, dict):
-            total += tree_len(value)
+    total = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        total += len(node.files)
+        stack.extend(node.children.values())
     return total
 
 
 def path_exists(tree: Tree, path_parts: List[str]) -> bool:
     """
-    Checks if a path exists in a tree.
+    Checks if a path, to either a directory or a file, exists in a tree.
 
     Args:
         tree: The tree to check.
@@ -112,14 +315,10 @@ def path_exists(tree: Tree, path_parts: List[str]) -> bool:
     Returns:
         Whether the path exists in the tree.
     """
-    node = tree
-    for part in path_parts:
-        if part == "_files":
-            continue
-        if part not in node or not isinstance(node[part], dict):
-            return False
-        node = node[part]
-    return True
+    if not path_parts:
+        return True
+    node = find_node(tree, path_parts[:-1])
+    return node is not None and (path_parts[-1] in node.children or path_parts[-1] in node.files)
 
 
 def keep_only_included(tree: Tree, includes: List[List[str]]) -> None:
@@ -127,46 +326,20 @@ def keep_only_included(tree: Tree, includes: List[List[str]]) -> None:
     Modifies `tree` in-place, keeping only paths that start with one of the include prefixes.
     Removes all other entries.
     """
-
-    def path_starts_with_any(path: List[str], prefixes: List[List[str]]) -> bool:
-        return any(path[:len(prefix)] == prefix for prefix in prefixes)
-
-    def filter_tree(node: Tree, current_path: List[str]) -> bool:
-        # Filter files
-        if "_files" in node:
-            node["_files"] = [f for f in node["_files"] if path_starts_with_any(current_path + [f], includes)]
-
-        # Filter subdirectories recursively
-        to_delete = []
-        for key, subnode in node.items():
-            if key == "_files":
-                continue
-            if not filter_tree(subnode, current_path + [key]):
-                to_delete.append(key)
-
-        for key in to_delete:
-            del node[key]
-
-        # Keep this node only if it has any files or subdirectories left
-        return bool(node.get("_files")) or any(k != "_files" for k in node.keys())
-
-    filter_tree(tree, [])
+    filter_tree(tree, PatternTrie(".".join(p) for p in includes), None)
 
 
 def build_java_file_tree(root_dir: str) -> Tuple[int, Tree]:
     """
     Recursively builds a file tree of all java files in a directory.
 
-    The tree is structured as a nested dictionary where each node represents a directory.
-    Each node also has a "files" key that contains a list of files in that directory.
-
     Args:
         root_dir: The root directory to start the walk from.
 
     Returns:
         The number of java files found and the file tree.
     """
-    tree: Tree = {}
+    tree = Tree()
     file_count: int = 0
 
     for root, dirs, files in os.walk(root_dir):
@@ -181,25 +354,77 @@ def build_java_file_tree(root_dir: str) -> Tuple[int, Tree]:
     return file_count, tree
 
 
+def build_jar_file_tree(jar: str) -> Tuple[int, Tree]:
+    """
+    Builds a file tree of all top-level classes in a jar, read from its central directory.
+
+    The tree has the same structure as one built by `build_java_file_tree` from the jar's
+    decompiled sources, with nested classes folded into their top-level class.
+
+    Args:
+        jar: The jar to read.
+
+    Returns:
+        The number of top-level classes found and the file tree.
+    """
+    with zipfile.ZipFile(jar) as zf:
+        return build_class_file_tree(zf.namelist())
+
+
+def build_class_file_tree(names: Iterable[str]) -> Tuple[int, Tree]:
+    """
+    Builds a file tree of all top-level classes among the entry names of a jar.
+
+    Args:
+        names: The entry names of the jar.
+
+    Returns:
+        The number of top-level classes found and the file tree.
+    """
+    tree = Tree()
+    file_count: int = 0
+    # Entries of a directory are usually listed together, so each directory is looked up once
+    nodes = {"": tree}
+
+    for name in names:
+        if not name.endswith(".class") or name.startswith("META-INF/"):
+            continue
+        directory, _, file = name[:-6].rpartition("/")
+        if "$" in file or file in ("module-info", "package-info"):
+            continue
+
+        node = nodes.get(directory)
+        if node is None:
+            node = tree
+            for part in directory.split("/"):
+                child = node.children.get(part)
+                if child is None:
+                    child = node.children[part] = Tree()
+                node = child
+            nodes[directory] = node
+        node.files[file] = None
+        file_count += 1
+
+    return file_count, tree
+
+
 def iter_tree_files(tree: Tree, path=None) -> Iterator[Tuple[List[str], str]]:
     """
     Iterates over all files in the tree, yielding each file and its path as a list of strings.
 
     Args:
-        tree: The nested tree to iterate.
-        path: The current path (used internally during recursion).
+        tree: The tree to iterate.
+        path: The path of `tree` itself, if it is not the root.
 
     Yields:
         Tuples of (path, filename), where `path` is a list of strings representing directories.
     """
-    if path is None:
-        path = []
-
-    for filename in tree.get("_files", []):
-        yield path, filename
-
-    for key, subtree in tree.items():
-        if key == "_files":
-            continue
-        if isinstance(subtree, dict):
-            yield from iter_tree_files(subtree, path + [key])
+    stack = [(tree, list(path or []))]
+    while stack:
+        node, node_path = stack.pop()
+        for filename in node.files:
+            yield node_path, filename
+
+        # Pushed in reverse, so that children are visited in insertion order
+        for key, child in reversed(node.children.items()):
+            stack.append((child, node_path + [key]))
@@ -1,4 +1,8 @@
-from typing import Any
+import sys
+from typing import Any, Iterable, Optional, TextIO, Tuple
+
+# Shared tuples of interned strings, e.g. modifier lists, keyed by their contents, cleared by `generator.reset`
+interned_tuples: dict[Tuple[str, ...], Tuple[str, ...]] = {}
 
 
 def default(var: Any, val: Any, check_str: bool = False):
@@ -17,3 +21,65 @@ def default(var: Any, val: Any, check_str: bool = False):
     if check_str:
         return var if var not in [None, "None"] else val
     return var if var is not None else val
+
+
+def format_docstring(documentation: str) -> str:
+    """
+    Converts a Java documentation comment into the body of a python docstring.
+
+    Args:
+        documentation: The documentation comment, with or without its comment delimiters.
+
+    Returns:
+        The cleaned documentation text, safe to place between triple quotes.
+    """
+    if not documentation:
+        return ""
+
+    text = documentation.strip()
+    if text.startswith("/**"):
+        text = text[3:]
+    elif text.startswith("/*"):
+        text = text[2:]
+    if text.endswith("*/"):
+        text = text[:-2]
+
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("*"):
+            line = line[1:].removeprefix(" ")
+        lines.append(line.rstrip())
+
+    return '\n'.join(lines).strip().replace("\\", "\\\\").replace('"""', '\\"\\"\\"')
+
+
+def write_docstring(out: TextIO, doc: str, indent: str) -> None:
+    """
+    Writes a docstring body formatted by `format_docstring`, between triple quotes.
+
+    Blank lines are left unindented, as `textwrap.indent` would.
+
+    Args:
+        out: The stream to write to.
+        doc: The docstring body.
+        indent: The indentation of the quotes and of every non-blank line.
+    """
+    for line in f'"""\n{doc}\n"""'.splitlines(True):
+        out.write(indent + line if line.strip() else line)
+
+
+def intern_strings(values: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """
+    Converts strings into a shared tuple of interned strings.
+
+    Identical sequences, such as the modifiers of most members, share a single tuple.
+
+    Args:
+        values: The strings to intern, or None.
+
+    Returns:
+        The shared tuple.
+    """
+    values = tuple(sys.intern(v) for v in values or ())
+    return interned_tuples.setdefault(values, values)
@@ -0,0 +1,208 @@
+import struct
+import threading
+import zipfile
+import zlib
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+EOCD_SIGNATURE = b"PK\x05\x06"
+EOCD_FORMAT = "<4sHHHHIIH"
+ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+ZIP64_LOCATOR_FORMAT = "<4sIQI"
+ZIP64_EOCD_FORMAT = "<4sQHHIIQQQQ"
+CENTRAL_HEADER_SIGNATURE = b"PK\x01\x02"
+CENTRAL_HEADER_FORMAT = "<4s6H3I5HII"
+LOCAL_HEADER_FORMAT = "<4s5H3I2H"
+
+ZIP64_EXTRA_ID = 0x0001
+FLAG_ENCRYPTED = 0x1
+FLAG_UTF8 = 0x800
+MAX_COMMENT_SIZE = 0xFFFF
+
+
+class ZipEntry(NamedTuple):
+    """The central directory record of a single zip entry."""
+    method: int
+    flags: int
+    crc: int
+    compressed_size: int
+    file_size: int
+    header_offset: int
+
+
+class ZipDirectory:
+    """
+    A read-only view of a zip archive, built from its central directory alone.
+
+    Unlike `zipfile.ZipFile`, no ZipInfo is created per entry: the central directory is read
+    in a single call and only the name, sizes and offset of each entry are unpacked, into
+    plain tuples laid out as `ZipEntry`. Entry data is read and decompressed on demand, so
+    listing and sizing a jar of hundreds of thousands of classes costs a fraction of opening
+    it with `zipfile`. Reads are serialised by a lock, so a single instance can be shared
+    between threads.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens a zip archive and reads its central directory.
+
+        Args:
+            path: The path of the archive.
+
+        Raises:
+            zipfile.BadZipFile: If the file is not a zip archive.
+        """
+        self.file = open(path, "rb")
+        self.lock = threading.Lock()
+        try:
+            self.records: Dict[str, Tuple[int, int, int, int, int, int]] = {}
+            self.base = 0
+            self.read_central_directory()
+        except (struct.error, ValueError) as e:
+            self.file.close()
+            raise zipfile.BadZipFile(f"Malformed zip file '{path}': {e}")
+        except BaseException:
+            self.file.close()
+            raise
+
+    def __enter__(self) -> "ZipDirectory":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def read_central_directory(self) -> None:
+        f = self.file
+        f.seek(0, 2)
+        size = f.tell()
+        tail_offset = max(0, size - struct.calcsize(EOCD_FORMAT) - MAX_COMMENT_SIZE - struct.calcsize(ZIP64_LOCATOR_FORMAT))
+        f.seek(tail_offset)
+        tail = f.read()
+
+        eocd = tail.rfind(EOCD_SIGNATURE)
+        if eocd < 0:
+            raise zipfile.BadZipFile("File is not a zip file.")
+        _, _, _, _, count, directory_size, directory_offset, _ = struct.unpack_from(EOCD_FORMAT, tail, eocd)
+        eocd_position = tail_offset + eocd
+
+        locator = eocd - struct.calcsize(ZIP64_LOCATOR_FORMAT)
+        if locator >= 0 and tail[locator:locator + 4] == ZIP64_LOCATOR_SIGNATURE:
+            _, _, zip64_offset, _ = struct.unpack_from(ZIP64_LOCATOR_FORMAT, tail, locator)
+            f.seek(zip64_offset)
+            record = f.read(struct.calcsize(ZIP64_EOCD_FORMAT))
+            _, _, _, _, _, _, _, count, directory_size, directory_offset = struct.unpack(ZIP64_EOCD_FORMAT, record)
+            eocd_position = tail_offset + locator - struct.calcsize(ZIP64_EOCD_FORMAT)
+
+        # Data prepended to the archive, e.g. a launcher script, shifts every offset
+        self.base = eocd_position - directory_size - directory_offset
+        f.seek(directory_offset + self.base)
+        directory = f.read(directory_size)
+
+        header_size = struct.calcsize(CENTRAL_HEADER_FORMAT)
+        unpack = struct.Struct(CENTRAL_HEADER_FORMAT).unpack_from
+        offset = 0
+        for _ in range(count):
+            (signature, _, _, flags, method, _, _, crc, compressed_size, file_size,
+             name_length, extra_length, comment_length, _, _, _, header_offset) = unpack(directory, offset)
+            if signature != CENTRAL_HEADER_SIGNATURE:
+                raise zipfile.BadZipFile("Bad central directory header signature.")
+
+            start = offset + header_size
+            raw_name = directory[start:start + name_length]
+            if raw_name.isascii():
+                name = raw_name.decode("ascii")
+            else:
+                name = raw_name.decode("utf-8" if flags & FLAG_UTF8 else "cp437")
+
+            if 0xFFFFFFFF in (compressed_size, file_size, header_offset):
+                extra = directory[start + name_length:start + name_length + extra_length]
+                file_size, compressed_size, header_offset = read_zip64_extra(extra, file_size, compressed_size, header_offset)
+
+            self.records[name] = (method, flags, crc, compressed_size, file_size, header_offset)
+            offset = start + name_length + extra_length + comment_length
+
+    def namelist(self) -> List[str]:
+        return list(self.records)
+
+    def getinfo(self, name: str) -> ZipEntry:
+        """
+        Gets the central directory record of an entry.
+
+        Raises:
+            KeyError: If there is no such entry.
+        """
+        return ZipEntry(*self.records[name])
+
+    def file_sizes(self) -> Iterator[Tuple[str, int]]:
+        """Iterates over the name and uncompressed size of every entry."""
+        for name, record in self.records.items():
+            yield name, record[4]
+
+    def crcs(self) -> Iterator[Tuple[str, int]]:
+        """Iterates over the name and CRC-32 of every entry."""
+        for name, record in self.records.items():
+            yield name, record[2]
+
+    def read(self, name: str) -> bytes:
+        """
+        Reads and decompresses an entry.
+
+        Args:
+            name: The name of the entry.
+
+        Returns:
+            The entry's data.
+
+        Raises:
+            KeyError: If there is no such entry.
+            zipfile.BadZipFile: If the entry is encrypted or uses an unsupported compression method.
+        """
+        entry = self.getinfo(name)
+        if entry.flags & FLAG_ENCRYPTED:
+            raise zipfile.BadZipFile(f"The entry '{name}' is encrypted.")
+
+        with self.lock:
+            self.file.seek(entry.header_offset + self.base)
+            header = self.file.read(struct.calcsize(LOCAL_HEADER_FORMAT))
+            _, _, _, _, _, _, _, _, _, name_length, extra_length = struct.unpack(LOCAL_HEADER_FORMAT, header)
+            self.file.seek(name_length + extra_length, 1)
+            data = self.file.read(entry.compressed_size)
+
+        if entry.method == zipfile.ZIP_STORED:
+            return data
+        if entry.method == zipfile.ZIP_DEFLATED:
+            return zlib.decompress(data, -15)
+        raise zipfile.BadZipFile(f"The entry '{name}' uses unsupported compression method {entry.method}.")
+
+
+def read_zip64_extra(extra: bytes, file_size: int, compressed_size: int, header_offset: int) -> tuple[int, int, int]:
+    """
+    Reads the 64-bit sizes and offset of an entry from its zip64 extra field.
+
+    Only the values saturated at 0xFFFFFFFF in the central directory record are present in
+    the extra field, in this order.
+
+    Args:
+        extra: The extra field data of the entry.
+        file_size: The uncompressed size from the central directory record.
+        compressed_size: The compressed size from the central directory record.
+        header_offset: The local header offset from the central directory record.
+
+    Returns:
+        The uncompressed size, compressed size and local header offset.
+    """
+    values = [file_size, compressed_size, header_offset]
+    offset = 0
+    while offset + 4 <= len(extra):
+        field_id, length = struct.unpack_from("<HH", extra, offset)
+        if field_id == ZIP64_EXTRA_ID:
+            position = offset + 4
+            for i, value in enumerate(values):
+                if value == 0xFFFFFFFF:
+                    values[i], = struct.unpack_from("<Q", extra, position)
+                    position += 8
+            break
+        offset += 4 + length
+    return values[0], values[1], values[2]